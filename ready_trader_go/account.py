@@ -15,61 +15,173 @@
 #     You should have received a copy of the GNU Affero General Public
 #     License along with Ready Trader Go.  If not, see
 #     <https://www.gnu.org/licenses/>.
+from typing import Any, Union
+
 from .types import Instrument, Side
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
-class CompetitorAccount(object):
-    """A competitors account."""
+
+ACCOUNT_COLUMNS = ("account_balance", "buy_volume", "etf_position", "future_position", "max_drawdown", "max_profit",
+                   "profit_or_loss", "sell_volume", "total_fees")
+INITIAL_ACCOUNT_CAPACITY = 8
+
+
+class AccountBook(object):
+    """The accounts of every competitor in a match, held a column at a time.
+
+    Each field of the accounts is held in a column with a row for each
+    account: a NumPy array if NumPy is installed, or a list if it is not. All
+    of the accounts are marked to market on each tick by a single call to
+    update, which with NumPy is one vectorised calculation however many
+    competitors there are. A CompetitorAccount is a view of one row.
+    """
 
     def __init__(self, tick_size: float, etf_clamp: float):
-        """Initialise a new instance of the CompetitorAccount class."""
-        self.account_balance: int = 0
-        self.buy_volume: int = 0
+        """Initialise a new instance of the AccountBook class."""
+        self.count: int = 0
         self.etf_clamp: float = etf_clamp
-        self.etf_position: int = 0
-        self.future_position: int = 0
-        self.max_drawdown: int = 0
-        self.max_profit: int = 0
-        self.profit_or_loss: int = 0
-        self.sell_volume: int = 0
         self.tick_size: int = int(tick_size * 100.0)
-        self.total_fees: int = 0
 
-    def transact(self, instrument: Instrument, side: Side, price: float, volume: int, fee: int) -> None:
-        """Update this account with the specified transaction."""
+        self.account_balance: Any = self.__new_column()
+        self.buy_volume: Any = self.__new_column()
+        self.etf_position: Any = self.__new_column()
+        self.future_position: Any = self.__new_column()
+        self.max_drawdown: Any = self.__new_column()
+        self.max_profit: Any = self.__new_column()
+        self.profit_or_loss: Any = self.__new_column()
+        self.sell_volume: Any = self.__new_column()
+        self.total_fees: Any = self.__new_column()
+
+    @staticmethod
+    def __new_column() -> Any:
+        """Return a new, empty column."""
+        return numpy.zeros(INITIAL_ACCOUNT_CAPACITY, numpy.int64) if numpy is not None else list()
+
+    def clamp_etf_price(self, future_price: Union[int, float], etf_price: Union[int, float]) -> Union[int, float]:
+        """Return the ETF price clamped to within the ETF clamp of the future price."""
+        delta: int = round(self.etf_clamp * future_price)
+        delta -= delta % self.tick_size
+        min_price = future_price - delta
+        max_price = future_price + delta
+        return min_price if etf_price < min_price else max_price if etf_price > max_price else etf_price
+
+    def create(self) -> "CompetitorAccount":
+        """Add a new account to the book and return a view of it."""
+        if numpy is None:
+            for name in ACCOUNT_COLUMNS:
+                getattr(self, name).append(0)
+        elif self.count == len(self.account_balance):
+            for name in ACCOUNT_COLUMNS:
+                column = getattr(self, name)
+                setattr(self, name, numpy.concatenate((column, numpy.zeros(len(column), numpy.int64))))
+        self.count += 1
+        return CompetitorAccount(self, self.count - 1)
+
+    def transact(self, index: int, instrument: Instrument, side: Side, price: float, volume: int, fee: int) -> None:
+        """Update the account in the given row with the specified transaction."""
         if side == Side.SELL:
-            self.account_balance += round(price * volume)
+            self.account_balance[index] += round(price * volume) - fee
         else:
-            self.account_balance -= round(price * volume)
-
-        self.account_balance -= fee
-        self.total_fees += fee
+            self.account_balance[index] -= round(price * volume) + fee
+        self.total_fees[index] += fee
 
         if instrument == Instrument.FUTURE:
-            if side == Side.SELL:
-                self.future_position -= volume
-            else:
-                self.future_position += volume
+            self.future_position[index] += -volume if side == Side.SELL else volume
+        elif side == Side.SELL:
+            self.sell_volume[index] += volume
+            self.etf_position[index] -= volume
         else:
-            if side == Side.SELL:
-                self.sell_volume += volume
-                self.etf_position -= volume
-            else:
-                self.buy_volume += volume
-                self.etf_position += volume
+            self.buy_volume[index] += volume
+            self.etf_position[index] += volume
+
+    def update(self, future_price: int, etf_price: int) -> None:
+        """Update every account in the book using the specified prices.
+
+        The prices are whole numbers of cents. They are rounded before the
+        vectorised calculation so that it stays within the integer columns.
+        """
+        clamped = self.clamp_etf_price(future_price, etf_price)
+        if numpy is None:
+            for index in range(self.count):
+                self.__mark(index, future_price, clamped)
+            return
+
+        future_price = round(future_price)
+        clamped = round(clamped)
+        count = self.count
+        profit_or_loss = self.profit_or_loss[:count]
+        max_profit = self.max_profit[:count]
+        numpy.add(self.account_balance[:count], self.future_position[:count] * future_price, out=profit_or_loss)
+        profit_or_loss += self.etf_position[:count] * clamped
+        numpy.maximum(max_profit, profit_or_loss, out=max_profit)
+        numpy.maximum(self.max_drawdown[:count], max_profit - profit_or_loss, out=self.max_drawdown[:count])
+
+    def update_account(self, index: int, future_price: Union[int, float], etf_price: Union[int, float]) -> None:
+        """Update the account in the given row using the specified prices."""
+        self.__mark(index, future_price, self.clamp_etf_price(future_price, etf_price))
+
+    def __mark(self, index: int, future_price: Union[int, float], clamped: Union[int, float]) -> None:
+        """Mark the account in the given row to market at the given future and clamped ETF prices."""
+        profit_or_loss = round(self.account_balance[index] + self.future_position[index] * future_price
+                               + self.etf_position[index] * clamped)
+        self.profit_or_loss[index] = profit_or_loss
+        if profit_or_loss > self.max_profit[index]:
+            self.max_profit[index] = profit_or_loss
+        if self.max_profit[index] - profit_or_loss > self.max_drawdown[index]:
+            self.max_drawdown[index] = self.max_profit[index] - profit_or_loss
+
+
+def _column_property(name: str) -> property:
+    """Return a property for the named column of the account's row in its book."""
+    def get(account: "CompetitorAccount") -> int:
+        return int(getattr(account.book, name)[account.index])
+
+    def set_(account: "CompetitorAccount", value: int) -> None:
+        getattr(account.book, name)[account.index] = value
+
+    return property(get, set_)
+
+
+class CompetitorAccount(object):
+    """A competitors account, which is a view of a row of an account book."""
+    __slots__ = ("book", "index")
+
+    account_balance = _column_property("account_balance")
+    buy_volume = _column_property("buy_volume")
+    etf_position = _column_property("etf_position")
+    future_position = _column_property("future_position")
+    max_drawdown = _column_property("max_drawdown")
+    max_profit = _column_property("max_profit")
+    profit_or_loss = _column_property("profit_or_loss")
+    sell_volume = _column_property("sell_volume")
+    total_fees = _column_property("total_fees")
+
+    def __init__(self, book: AccountBook, index: int):
+        """Initialise a new instance of the CompetitorAccount class."""
+        self.book: AccountBook = book
+        self.index: int = index
+
+    @property
+    def etf_clamp(self) -> float:
+        """Return the ETF clamp of the account book."""
+        return self.book.etf_clamp
+
+    @property
+    def tick_size(self) -> int:
+        """Return the tick size, in cents, of the account book."""
+        return self.book.tick_size
+
+    def transact(self, instrument: Instrument, side: Side, price: float, volume: int, fee: int) -> None:
+        """Update this account with the specified transaction."""
+        self.book.transact(self.index, instrument, side, price, volume, fee)
 
     def update(self, future_price: int, etf_price: int) -> None:
         """Update this account using the specified prices."""
-        delta: int = round(self.etf_clamp * future_price)
-        delta -= delta % self.tick_size
-        min_price: int = future_price - delta
-        max_price: int = future_price + delta
-        clamped: int = min_price if etf_price < min_price else max_price if etf_price > max_price else etf_price
-        self.profit_or_loss = self.account_balance + self.future_position * future_price + self.etf_position * clamped
-        if self.profit_or_loss > self.max_profit:
-            self.max_profit = self.profit_or_loss
-        if self.max_profit - self.profit_or_loss > self.max_drawdown:
-            self.max_drawdown = self.max_profit - self.profit_or_loss
+        self.book.update_account(self.index, future_price, etf_price)
 
 
 class AccountFactory:
@@ -77,9 +189,14 @@ class AccountFactory:
 
     def __init__(self, etf_clamp: float, tick_size: float):
         """Initialise a new instance of the AccountFactory class."""
+        self.book: AccountBook = AccountBook(tick_size, etf_clamp)
         self.etf_clamp: float = etf_clamp
         self.tick_size: float = tick_size
 
     def create(self) -> CompetitorAccount:
-        """Return a new instance of the CompetitorAccount class."""
-        return CompetitorAccount(self.tick_size, self.etf_clamp)
+        """Return a new account in this factory's account book."""
+        return self.book.create()
+
+    def create_book(self) -> AccountBook:
+        """Return a new, empty account book with this factory's tick size and ETF clamp."""
+        return AccountBook(self.tick_size, self.etf_clamp)
@@ -0,0 +1,444 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import bisect
+import collections
+import csv
+import json
+import sys
+
+from typing import Any, Deque, Dict, Iterable, List, Optional, TextIO, Tuple
+
+from .instrumentation import LatencyHistogram
+from .order_book import IOrderListener, Order, OrderBook
+from .types import Instrument, Lifespan, Side
+
+
+DEFAULT_MARKOUT_HORIZONS: Tuple[float, ...] = (1.0, 5.0, 10.0, 30.0)
+
+# Upper bounds of the bands of absolute ETF position in the inventory profile
+POSITION_BANDS: Tuple[int, ...] = (0, 25, 50, 75, 100)
+POSITION_BAND_NAMES: Tuple[str, ...] = ("0", "1-25", "26-50", "51-75", "76-100", ">100")
+
+LIFETIME_PERCENTILES: Tuple[float, ...] = (50.0, 90.0, 99.0)
+READ_BUFFER_SIZE: int = 1 << 20
+
+
+class OpenOrders(IOrderListener):
+    """The orders of one team that are still in the order books."""
+
+    def __init__(self):
+        """Initialise a new instance of the OpenOrders class."""
+        self.orders: Dict[int, Order] = dict()
+
+    def on_order_amended(self, now: float, order: Order, volume_removed: int) -> None:
+        """Called when the order is amended."""
+        if order.remaining_volume == 0:
+            self.orders.pop(order.client_order_id, None)
+
+    def on_order_cancelled(self, now: float, order: Order, volume_removed: int) -> None:
+        """Called when the order is cancelled."""
+        self.orders.pop(order.client_order_id, None)
+
+    def on_order_filled(self, now: float, order: Order, price: int, volume: int, fee: int) -> None:
+        """Called when the order is partially or completely filled."""
+        if order.remaining_volume == 0:
+            self.orders.pop(order.client_order_id, None)
+
+    def on_order_replaced(self, now: float, order: Order, old_price: int, old_remaining_volume: int) -> None:
+        """Called when the order's price or remaining volume is replaced."""
+        if order.remaining_volume == 0:
+            self.orders.pop(order.client_order_id, None)
+
+
+class TeamStatistics:
+    """Running totals for the orders, trades and hedges of one team."""
+
+    def __init__(self, start_time: float, horizon_count: int):
+        """Initialise a new instance of the TeamStatistics class."""
+        self.orders: int = 0
+        self.order_volume: int = 0
+        self.filled_orders: int = 0
+        self.traded_volume: int = 0
+
+        self.markout_totals: List[float] = [0.0] * horizon_count
+        self.markout_volumes: List[int] = [0] * horizon_count
+
+        self.etf_position: int = 0
+        self.future_position: int = 0
+        self.maximum_position: int = 0
+        self.position_time: float = 0.0
+        self.absolute_position_time: float = 0.0
+        self.absolute_net_position_time: float = 0.0
+        self.band_times: List[float] = [0.0] * len(POSITION_BAND_NAMES)
+        self.first_time: float = start_time
+        self.last_time: float = start_time
+
+        self.hedges: int = 0
+        self.hedge_volume: int = 0
+        self.hedge_slippage: float = 0.0
+        self.hedge_priced_volume: int = 0
+
+        self.maker_volume: int = 0
+        self.maker_fees: int = 0
+        self.taker_volume: int = 0
+        self.taker_fees: int = 0
+
+        # Live orders map an order id to its insert time, remaining volume and whether it has traded
+        self.live_orders: Dict[int, List[Any]] = dict()
+        self.lifetimes: LatencyHistogram = LatencyHistogram()
+
+    def advance(self, now: float) -> None:
+        """Accumulate the time spent at the current position up to the given time."""
+        elapsed = now - self.last_time
+        if elapsed > 0.0:
+            position = self.etf_position
+            absolute = position if position >= 0 else -position
+            self.position_time += position * elapsed
+            self.absolute_position_time += absolute * elapsed
+            self.absolute_net_position_time += abs(position + self.future_position) * elapsed
+            self.band_times[bisect.bisect_left(POSITION_BANDS, absolute)] += elapsed
+            self.last_time = now
+
+    def end_order(self, now: float, order_id: int) -> None:
+        """Record the lifetime of an order that has left the market."""
+        live = self.live_orders.pop(order_id, None)
+        if live is not None:
+            self.lifetimes.record(round((now - live[0]) * 1e6))
+
+    def report(self, horizons: Iterable[float]) -> Dict[str, Any]:
+        """Return a summary of these statistics (with prices in dollars and times in seconds)."""
+        duration = self.last_time - self.first_time
+        lifetimes = self.lifetimes
+        return {
+            "fills": {"orders": self.orders,
+                      "filled_orders": self.filled_orders,
+                      "order_volume": self.order_volume,
+                      "traded_volume": self.traded_volume,
+                      "fill_rate": self.traded_volume / self.order_volume if self.order_volume else 0.0},
+            "markouts": {"%g" % h: {"volume": v, "per_lot": t / v / 100.0 if v else None, "total": t / 100.0}
+                         for h, t, v in zip(horizons, self.markout_totals, self.markout_volumes)},
+            "inventory": {"mean_position": self.position_time / duration if duration else 0.0,
+                          "mean_absolute_position": self.absolute_position_time / duration if duration else 0.0,
+                          "mean_absolute_net_position": (self.absolute_net_position_time / duration
+                                                         if duration else 0.0),
+                          "maximum_absolute_position": self.maximum_position,
+                          "time_fractions": {n: t / duration if duration else 0.0
+                                             for n, t in zip(POSITION_BAND_NAMES, self.band_times)}},
+            "hedges": {"count": self.hedges,
+                       "volume": self.hedge_volume,
+                       "slippage_per_lot": (self.hedge_slippage / self.hedge_priced_volume / 100.0
+                                            if self.hedge_priced_volume else None),
+                       "slippage": self.hedge_slippage / 100.0},
+            "fees": {"maker_volume": self.maker_volume,
+                     "maker_fees": self.maker_fees / 100.0,
+                     "taker_volume": self.taker_volume,
+                     "taker_fees": self.taker_fees / 100.0,
+                     "total_fees": (self.maker_fees + self.taker_fees) / 100.0},
+            "lifetimes": {"count": lifetimes.count,
+                          "mean": lifetimes.mean / 1e6,
+                          **{"p%g" % p: lifetimes.value_at_percentile(p) / 1e6 for p in LIFETIME_PERCENTILES},
+                          "max": lifetimes.maximum / 1e6,
+                          "open": len(self.live_orders)},
+        }
+
+
+class MatchEventsAnalysis:
+    """Per-team statistics of a match, computed from its match events in a single pass.
+
+    The order books are rebuilt as the events are applied so that trades and
+    hedges can be compared with the midpoint price of the market. Only the
+    live orders and the trades still waiting for their markout horizons are
+    held in memory, so the memory used does not grow with the length of the
+    match.
+    """
+
+    def __init__(self, horizons: Iterable[float] = DEFAULT_MARKOUT_HORIZONS):
+        """Initialise a new instance of the MatchEventsAnalysis class."""
+        self.horizons: Tuple[float, ...] = tuple(sorted(set(horizons)))
+        self.last_time: float = 0.0
+        self.teams: Dict[str, TeamStatistics] = dict()
+
+        self.__books: Tuple[OrderBook, ...] = tuple(OrderBook(i, 0.0, 0.0) for i in Instrument)
+        self.__open_orders: Dict[str, OpenOrders] = {"": OpenOrders()}
+        # Trades waiting for each markout horizon: (due time, team, sign, price, volume)
+        self.__pending: Tuple[Deque[Tuple[float, TeamStatistics, int, int, int]], ...] = tuple(
+            collections.deque() for _ in self.horizons)
+
+    def __midpoint_price(self, instrument: Instrument) -> Optional[float]:
+        """Return the midpoint price of an order book, or its last traded price if either side is empty."""
+        book = self.__books[instrument]
+        midpoint_price = book.midpoint_price()
+        return midpoint_price if midpoint_price is not None else book.last_traded_price()
+
+    def __settle_markouts(self, now: float) -> None:
+        """Mark the trades whose horizons have passed to the current ETF midpoint price."""
+        midpoint_price = None
+        for i, pending in enumerate(self.__pending):
+            if pending and pending[0][0] <= now:
+                if midpoint_price is None:
+                    midpoint_price = self.__midpoint_price(Instrument.ETF)
+                    if midpoint_price is None:
+                        return
+                while pending and pending[0][0] <= now:
+                    _, stats, sign, price, volume = pending.popleft()
+                    stats.markout_totals[i] += sign * (midpoint_price - price) * volume
+                    stats.markout_volumes[i] += volume
+
+    def apply(self, row: List[str]) -> None:
+        """Apply a row of the match events file."""
+        tm = float(row[0])
+        team: str = row[1]
+        operation: str = row[2]
+        order_id: int = int(row[3])
+
+        self.last_time = tm
+        if self.__pending:
+            self.__settle_markouts(tm)
+
+        open_orders = self.__open_orders.get(team)
+        if open_orders is None:
+            open_orders = self.__open_orders[team] = OpenOrders()
+            self.teams[team] = TeamStatistics(tm, len(self.horizons))
+        orders = open_orders.orders
+        stats = self.teams.get(team)
+
+        if operation == "Insert":
+            order = Order(order_id, Instrument(int(row[4])), Lifespan[row[8]], Side[row[5]], int(row[7]),
+                          int(row[6]), open_orders)
+            orders[order_id] = order
+            if stats is not None:
+                stats.orders += 1
+                stats.order_volume += order.volume
+                stats.live_orders[order_id] = [tm, order.volume, False]
+            self.__books[order.instrument].insert(tm, order)
+        elif operation == "Amend":
+            volume_delta = int(row[6])
+            order = orders.get(order_id)
+            if order is not None:
+                self.__books[order.instrument].amend(tm, order, order.volume + volume_delta)
+            if stats is not None:
+                live = stats.live_orders.get(order_id)
+                if live is not None:
+                    live[1] += volume_delta
+                    if live[1] <= 0:
+                        stats.end_order(tm, order_id)
+        elif operation == "Cancel":
+            order = orders.get(order_id)
+            if order is not None:
+                self.__books[order.instrument].cancel(tm, order)
+            if stats is not None:
+                stats.end_order(tm, order_id)
+        elif operation == "Replace":
+            volume = int(row[6])
+            order = orders.get(order_id)
+            if order is not None:
+                self.__books[order.instrument].replace(tm, order, int(row[7]), volume)
+            if stats is not None:
+                live = stats.live_orders.get(order_id)
+                if live is not None:
+                    live[1] = volume
+                    if volume <= 0:
+                        stats.end_order(tm, order_id)
+        elif stats is not None:  # operation is "Hedge" or "Trade"
+            instrument = Instrument(int(row[4]))
+            sign = 1 if Side[row[5]] == Side.BUY else -1
+            volume = int(row[6])
+            stats.advance(tm)
+            if operation == "Trade":
+                price = int(row[7])
+                fee = int(row[9]) if row[9] else 0
+                if fee > 0:
+                    stats.taker_volume += volume
+                    stats.taker_fees += fee
+                else:
+                    stats.maker_volume += volume
+                    stats.maker_fees += fee
+                stats.traded_volume += volume
+                if instrument == Instrument.ETF:
+                    stats.etf_position += sign * volume
+                else:
+                    stats.future_position += sign * volume
+                for i, horizon in enumerate(self.horizons):
+                    self.__pending[i].append((tm + horizon, stats, sign, price, volume))
+
+                live = stats.live_orders.get(order_id)
+                if live is not None:
+                    if not live[2]:
+                        live[2] = True
+                        stats.filled_orders += 1
+                    live[1] -= volume
+                    if live[1] <= 0:
+                        stats.end_order(tm, order_id)
+            else:
+                midpoint_price = self.__midpoint_price(instrument)
+                if midpoint_price is not None:
+                    stats.hedge_slippage += sign * (float(row[7]) - midpoint_price) * volume
+                    stats.hedge_priced_volume += volume
+                stats.hedges += 1
+                stats.hedge_volume += volume
+                stats.future_position += sign * volume
+            if abs(stats.etf_position) > stats.maximum_position:
+                stats.maximum_position = abs(stats.etf_position)
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Return a summary of the statistics of each team."""
+        for stats in self.teams.values():
+            stats.advance(self.last_time)
+        return {team: stats.report(self.horizons) for team, stats in sorted(self.teams.items())}
+
+
+class ScoreBoardAnalysis:
+    """The final score and largest drawdown of each team, computed from a score board file.
+
+    The score board records amounts in cents, but they are reported in dollars.
+    """
+
+    def __init__(self):
+        """Initialise a new instance of the ScoreBoardAnalysis class."""
+        self.teams: Dict[str, Dict[str, Any]] = dict()
+
+    def apply(self, record: Dict[str, str]) -> None:
+        """Apply a record of the score board file."""
+        team = record["Team"]
+        profit_or_loss = float(record["ProfitOrLoss"]) / 100.0
+        result = self.teams.get(team)
+        if result is None:
+            result = self.teams[team] = {"maximum_profit": profit_or_loss, "maximum_drawdown": 0.0, "status": None}
+        if profit_or_loss > result["maximum_profit"]:
+            result["maximum_profit"] = profit_or_loss
+        elif result["maximum_profit"] - profit_or_loss > result["maximum_drawdown"]:
+            result["maximum_drawdown"] = result["maximum_profit"] - profit_or_loss
+        result["profit_or_loss"] = profit_or_loss
+        result["buy_volume"] = int(record["BuyVolume"])
+        result["sell_volume"] = int(record["SellVolume"])
+        result["etf_position"] = int(record["EtfPosition"])
+        result["future_position"] = int(record["FuturePosition"])
+        result["total_fees"] = float(record["TotalFees"]) / 100.0
+        # A breach or disconnection is kept even though later ticks may report the team as OK
+        if record["Operation"] != "Tick":
+            result["status"] = record["Operation"]
+        elif record["Status"] and result["status"] in (None, "OK"):
+            result["status"] = record["Status"]
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Return the score of each team."""
+        return dict(sorted(self.teams.items()))
+
+
+def analyze_match_events(match_events: TextIO,
+                         horizons: Iterable[float] = DEFAULT_MARKOUT_HORIZONS) -> Dict[str, Dict[str, Any]]:
+    """Return the statistics of each team in a match events file."""
+    analysis = MatchEventsAnalysis(horizons)
+    reader = csv.reader(match_events)
+    next(reader)  # Skip header
+    apply = analysis.apply
+    for row in reader:
+        apply(row)
+    return analysis.report()
+
+
+def analyze_score_board(score_board: TextIO) -> Dict[str, Dict[str, Any]]:
+    """Return the score of each team in a score board file."""
+    analysis = ScoreBoardAnalysis()
+    apply = analysis.apply
+    for record in csv.DictReader(score_board):
+        apply(record)
+    return analysis.report()
+
+
+def print_report(report: Dict[str, Any], output: TextIO = sys.stdout) -> None:
+    """Print a compact report of the statistics of each team."""
+    teams = report.get("teams", {})
+    horizons = report.get("horizons", ())
+
+    print("%-20s %8s %8s %10s %10s %8s" % ("Fills", "Orders", "Filled", "Volume", "Traded", "Rate(%)"),
+          file=output)
+    for team, result in teams.items():
+        fills = result["fills"]
+        print("%-20s %8d %8d %10d %10d %8.1f" % (team, fills["orders"], fills["filled_orders"],
+                                                  fills["order_volume"], fills["traded_volume"],
+                                                  fills["fill_rate"] * 100.0), file=output)
+
+    print("\n%-20s %10s" % ("Markouts($/lot)", "Volume") + "".join(" %9s" % ("+%gs" % h) for h in horizons),
+          file=output)
+    for team, result in teams.items():
+        markouts = [result["markouts"]["%g" % h] for h in horizons]
+        print("%-20s %10d" % (team, markouts[0]["volume"] if markouts else 0)
+              + "".join(" %9s" % ("-" if m["per_lot"] is None else "%.4f" % m["per_lot"]) for m in markouts),
+              file=output)
+
+    print("\n%-20s %8s %9s %8s %9s" % ("Inventory", "Mean", "Mean|Pos|", "Max|Pos|", "Mean|Net|")
+          + "".join(" %8s" % ("%s(%%)" % n if n != "0" else "Flat(%)") for n in POSITION_BAND_NAMES), file=output)
+    for team, result in teams.items():
+        inventory = result["inventory"]
+        print("%-20s %8.1f %9.1f %8d %9.1f" % (team, inventory["mean_position"], inventory["mean_absolute_position"],
+                                                inventory["maximum_absolute_position"],
+                                                inventory["mean_absolute_net_position"])
+              + "".join(" %8.1f" % (f * 100.0) for f in inventory["time_fractions"].values()), file=output)
+
+    print("\n%-20s %8s %10s %12s %12s" % ("Hedges", "Count", "Volume", "Slip($/lot)", "Slippage($)"), file=output)
+    for team, result in teams.items():
+        hedges = result["hedges"]
+        print("%-20s %8d %10d %12s %12.2f" % (team, hedges["count"], hedges["volume"],
+                                              "-" if hedges["slippage_per_lot"] is None
+                                              else "%.4f" % hedges["slippage_per_lot"], hedges["slippage"]),
+              file=output)
+
+    print("\n%-20s %10s %10s %10s %10s %10s" % ("Fees", "MakerLots", "Maker($)", "TakerLots", "Taker($)",
+                                                "Total($)"), file=output)
+    for team, result in teams.items():
+        fees = result["fees"]
+        print("%-20s %10d %10.2f %10d %10.2f %10.2f" % (team, fees["maker_volume"], fees["maker_fees"],
+                                                        fees["taker_volume"], fees["taker_fees"],
+                                                        fees["total_fees"]), file=output)
+
+    print("\n%-20s %8s %9s" % ("Lifetimes(s)", "Orders", "Mean")
+          + "".join(" %9s" % ("P%g" % p) for p in LIFETIME_PERCENTILES) + " %9s %6s" % ("Max", "Open"), file=output)
+    for team, result in teams.items():
+        lifetimes = result["lifetimes"]
+        print("%-20s %8d %9.3f" % (team, lifetimes["count"], lifetimes["mean"])
+              + "".join(" %9.3f" % lifetimes["p%g" % p] for p in LIFETIME_PERCENTILES)
+              + " %9.3f %6d" % (lifetimes["max"], lifetimes["open"]), file=output)
+
+    scores = report.get("scores")
+    if scores:
+        print("\n%-20s %12s %12s %8s %8s %10s %-10s" % ("Scores", "Profit($)", "Drawdown($)", "EtfPos", "FutPos",
+                                                        "Fees($)", "Status"), file=output)
+        for team, score in scores.items():
+            print("%-20s %12.2f %12.2f %8d %8d %10.2f %-10s" % (team, score["profit_or_loss"],
+                                                                 score["maximum_drawdown"], score["etf_position"],
+                                                                 score["future_position"], score["total_fees"],
+                                                                 score["status"] or ""), file=output)
+
+
+def main(match_events_filename: str, score_board_filename: Optional[str] = None,
+         horizons: Iterable[float] = DEFAULT_MARKOUT_HORIZONS, json_filename: Optional[str] = None,
+         output: TextIO = sys.stdout) -> None:
+    """Analyse a match from its match events and score board files and print a report."""
+    horizons = tuple(sorted(set(horizons)))
+    report: Dict[str, Any] = {"horizons": horizons}
+    with open(match_events_filename, "r", newline="", buffering=READ_BUFFER_SIZE) as match_events:
+        report["teams"] = analyze_match_events(match_events, horizons)
+    if score_board_filename is not None:
+        with open(score_board_filename, "r", newline="", buffering=READ_BUFFER_SIZE) as score_board:
+            report["scores"] = analyze_score_board(score_board)
+
+    print_report(report, output)
+    if json_filename is not None:
+        with open(json_filename, "w") as json_file:
+            json.dump(report, json_file, indent=2)
@@ -18,11 +18,81 @@
 import asyncio
 import json
 import logging
+import logging.handlers
 import pathlib
+import queue
 import signal
 import sys
 
-from typing import Callable, Optional
+from typing import Any, Callable, Dict, Optional
+
+from .monitor import DEFAULT_MONITOR_INTERVAL, DEFAULT_SLOW_CALLBACK_THRESHOLD, EventLoopMonitor
+
+
+# The event loop implementations that may be named by the EventLoop setting
+EVENT_LOOPS = ("asyncio", "uvloop")
+
+# Log file formats that may be named by the Logging.Format setting
+LOG_FORMATS = ("json", "text")
+LOG_TEXT_FORMAT = "%(asctime)s [%(levelname)-7s] [%(name)s] %(message)s"
+
+
+class JsonLogFormatter(logging.Formatter):
+    """Format each log record as a JSON object on a line of its own."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Return the JSON representation of the given log record."""
+        return json.dumps({"time": record.created, "level": record.levelname, "logger": record.name,
+                           "thread": record.threadName, "message": record.getMessage()}, separators=(",", ":"))
+
+
+def _validate_log_level(level: Any, where: str) -> None:
+    """Raise an exception if the given value does not name a logging level."""
+    if type(level) is not str or type(logging.getLevelName(level)) is not int:
+        raise Exception("%s must name a logging level, such as 'INFO' or 'WARNING'" % where)
+
+
+def _validate_logging_config(config: Any) -> None:
+    """Raise an exception if the given Logging configuration is not valid."""
+    if type(config) is not dict:
+        raise Exception("Logging configuration should be a JSON object")
+    _validate_log_level(config.setdefault("Level", "INFO"), "Logging Level")
+    if config.setdefault("Format", "text") not in LOG_FORMATS:
+        raise Exception("Logging Format must be one of: %s" % ", ".join("'%s'" % f for f in LOG_FORMATS))
+    if type(config.setdefault("Levels", {})) is not dict:
+        raise Exception("Logging Levels should be a JSON object")
+    for name, level in config["Levels"].items():
+        _validate_log_level(level, "Logging Levels element '%s'" % name)
+
+
+def _validate_monitor_config(config: Any, name: str) -> None:
+    """Raise an exception if the given Monitor configuration is not valid."""
+    if type(config) is not dict:
+        raise Exception("Monitor configuration should be a JSON object")
+    config.setdefault("Interval", DEFAULT_MONITOR_INTERVAL)
+    config.setdefault("Threshold", DEFAULT_SLOW_CALLBACK_THRESHOLD)
+    config.setdefault("ProfileFile", name + ".profile.json")
+    for key in ("Interval", "Threshold"):
+        if type(config[key]) is int:
+            config[key] = float(config[key])
+    if any(type(config[k]) is not t for k, t in (("Interval", float), ("Threshold", float), ("ProfileFile", str))):
+        raise Exception("Element of inappropriate type in Monitor configuration")
+    if config["Interval"] <= 0.0 or config["Threshold"] <= 0.0:
+        raise Exception("Monitor Interval and Threshold must be positive numbers of seconds")
+
+
+def new_event_loop(name: str = "asyncio") -> asyncio.AbstractEventLoop:
+    """Return a new event loop of the named kind, or a standard asyncio event
+    loop if the named kind is not available.
+    """
+    if name == "uvloop":
+        try:
+            import uvloop
+        except ImportError:
+            logging.getLogger("APP").warning("uvloop is not installed, using the standard asyncio event loop")
+        else:
+            return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
 
 
 class Application(object):
@@ -30,20 +100,9 @@ class Application(object):
 
     def __init__(self, name: str, config_validator: Optional[Callable] = None):
         """Initialise a new instance of the Application class."""
-        self.event_loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
         self.logger = logging.getLogger("APP")
         self.name: str = name
 
-        # Turn on debugging if you're having trouble with the event loop
-        # self.event_loop.set_debug(True)
-
-        try:
-            self.event_loop.add_signal_handler(signal.SIGINT, self.on_signal, signal.SIGINT)
-            self.event_loop.add_signal_handler(signal.SIGTERM, self.on_signal, signal.SIGTERM)
-        except NotImplementedError:
-            # Signal handlers are only implemented on Unix
-            pass
-
         self.config = None
         config_path = pathlib.Path(name + ".json")
         if config_path.exists():
@@ -54,13 +113,73 @@ class Application(object):
         elif config_validator is not None:
             raise Exception("configuration file does not exist: %s" % str(config_path))
 
-        logging.basicConfig(filename=f'{name}.log', format="%(asctime)s [%(levelname)-7s] [%(name)s] %(message)s",
-                            level=logging.INFO)
+        event_loop_name = self.config.get("EventLoop", "asyncio") if type(self.config) is dict else "asyncio"
+        if event_loop_name not in EVENT_LOOPS:
+            raise Exception("EventLoop must be one of: %s" % ", ".join("'%s'" % e for e in EVENT_LOOPS))
+        if type(self.config) is dict and "Monitor" in self.config:
+            _validate_monitor_config(self.config["Monitor"], name)
+
+        logging_config: Dict[str, Any] = {}
+        if type(self.config) is dict:
+            logging_config = self.config.setdefault("Logging", logging_config)
+        _validate_logging_config(logging_config)
+        self.__start_logging(logging_config)
 
         self.logger.info("%s started with arguments={%s}", self.name, ", ".join(sys.argv))
         if self.config is not None:
             self.logger.info("configuration=%s", json.dumps(self.config, separators=(',', ':')))
 
+        self.event_loop: asyncio.AbstractEventLoop = new_event_loop(event_loop_name)
+        asyncio.set_event_loop(self.event_loop)
+        self.logger.info("using event loop %s.%s", type(self.event_loop).__module__, type(self.event_loop).__name__)
+
+        # Turn on debugging if you're having trouble with the event loop
+        # self.event_loop.set_debug(True)
+
+        self.monitor: Optional[EventLoopMonitor] = None
+        if type(self.config) is dict and "Monitor" in self.config:
+            monitor_config = self.config["Monitor"]
+            self.monitor = EventLoopMonitor(self.event_loop, monitor_config["ProfileFile"],
+                                            monitor_config["Interval"], monitor_config["Threshold"])
+
+        try:
+            self.event_loop.add_signal_handler(signal.SIGINT, self.on_signal, signal.SIGINT)
+            self.event_loop.add_signal_handler(signal.SIGTERM, self.on_signal, signal.SIGTERM)
+        except NotImplementedError:
+            # Signal handlers are only implemented on Unix
+            pass
+
+    def __start_logging(self, logging_config: Dict[str, Any]) -> None:
+        """Send log records through a queue to a thread that writes them to the log file.
+
+        This keeps file I/O off the event loop thread, which only has to put
+        each log record on the queue.
+        """
+        self.__log_file_handler = logging.FileHandler(f"{self.name}.log")
+        if logging_config["Format"] == "json":
+            self.__log_file_handler.setFormatter(JsonLogFormatter())
+        else:
+            self.__log_file_handler.setFormatter(logging.Formatter(LOG_TEXT_FORMAT))
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.__log_queue_handler = logging.handlers.QueueHandler(log_queue)
+        self.__log_listener = logging.handlers.QueueListener(log_queue, self.__log_file_handler)
+
+        root = logging.getLogger()
+        root.setLevel(logging_config["Level"])
+        root.addHandler(self.__log_queue_handler)
+        for name, level in logging_config["Levels"].items():
+            logging.getLogger(name).setLevel(level)
+
+        self.__log_listener.start()
+
+    def __stop_logging(self) -> None:
+        """Write any queued log records and then write further records directly."""
+        self.__log_listener.stop()
+        root = logging.getLogger()
+        root.removeHandler(self.__log_queue_handler)
+        root.addHandler(self.__log_file_handler)
+
     def on_signal(self, signum: int) -> None:
         """Called when a signal is received."""
         sig_name = "SIGINT" if signum == signal.SIGINT else "SIGTERM"
@@ -71,6 +190,9 @@ class Application(object):
         """Start the application's event loop."""
         loop = self.event_loop
 
+        if self.monitor is not None:
+            self.monitor.start()
+
         try:
             loop.run_forever()
         except Exception as e:
@@ -78,7 +200,10 @@ class Application(object):
             raise
         finally:
             self.logger.info("closing event loop")
+            if self.monitor is not None:
+                self.monitor.stop()
             try:
                 loop.run_until_complete(loop.shutdown_asyncgens())
             finally:
                 loop.close()
+                self.__stop_logging()
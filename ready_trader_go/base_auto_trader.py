@@ -17,18 +17,58 @@
 #     <https://www.gnu.org/licenses/>.
 import asyncio
 import logging
+import struct
 
-from typing import List, Optional
+from typing import Iterable, List, Optional, Tuple
 
 from .messages import (AMEND_MESSAGE, AMEND_MESSAGE_SIZE, CANCEL_MESSAGE, CANCEL_MESSAGE_SIZE,
-                       ERROR_MESSAGE, ERROR_MESSAGE_SIZE, HEDGE_MESSAGE, HEDGE_MESSAGE_SIZE,
-                       HEDGE_FILLED_MESSAGE, HEDGE_FILLED_MESSAGE_SIZE, INSERT_MESSAGE, INSERT_MESSAGE_SIZE,
-                       LOGIN_MESSAGE, LOGIN_MESSAGE_SIZE, ORDER_BOOK_HEADER, ORDER_BOOK_HEADER_SIZE,
-                       ORDER_BOOK_MESSAGE_SIZE, BOOK_PART, ORDER_FILLED_MESSAGE, ORDER_FILLED_MESSAGE_SIZE,
-                       ORDER_STATUS_MESSAGE, ORDER_STATUS_MESSAGE_SIZE, TRADE_TICKS_HEADER,
-                       TRADE_TICKS_HEADER_SIZE, TRADE_TICKS_MESSAGE_SIZE, TICKS_PART,
-                       Connection, MessageType, Subscription)
-from .types import Lifespan, Side
+                       EXECUTION_RESPONSE_DISPATCH_TABLE, HEADER_SIZE, HEDGE_MESSAGE, HEDGE_MESSAGE_SIZE,
+                       INFORMATION_DISPATCH_TABLE, INSERT_MESSAGE, INSERT_MESSAGE_SIZE, LOGIN_MESSAGE,
+                       LOGIN_MESSAGE_SIZE, MAXIMUM_BATCH_SIZE, ORDER_BOOK_DELTA_ENTRY, ORDER_BOOK_DELTA_HEADER,
+                       REPLACE_MESSAGE, REPLACE_MESSAGE_SIZE, Connection, DispatchTable, MessageType, Subscription,
+                       batch_message_size, bind_dispatch_table, dispatch_message)
+from .order_book import TOP_LEVEL_COUNT
+from .types import Instrument, Lifespan, Side
+
+
+class ReconstructedOrderBook:
+    """The top levels of an order book rebuilt from order book snapshots and deltas."""
+
+    def __init__(self):
+        """Initialise a new instance of the ReconstructedOrderBook class."""
+        self.sequence_number: int = 0
+        self.ask_prices: List[int] = [0] * TOP_LEVEL_COUNT
+        self.ask_volumes: List[int] = [0] * TOP_LEVEL_COUNT
+        self.bid_prices: List[int] = [0] * TOP_LEVEL_COUNT
+        self.bid_volumes: List[int] = [0] * TOP_LEVEL_COUNT
+
+    def apply_delta(self, sequence_number: int, previous_sequence_number: int, data: bytes, start: int,
+                    end: int) -> bool:
+        """Apply the entries of an order book delta and return True if the book is now up to date.
+
+        A delta only applies to the book message that preceded it, so if that
+        message was missed the book is out of date until the next snapshot.
+        """
+        if self.sequence_number == 0 or previous_sequence_number != self.sequence_number:
+            self.sequence_number = 0
+            return False
+
+        sides = ((self.ask_prices, self.ask_volumes), (self.bid_prices, self.bid_volumes))
+        for side, level, price, volume in ORDER_BOOK_DELTA_ENTRY.iter_unpack(data[start:end]):
+            prices, volumes = sides[side]
+            prices[level] = price
+            volumes[level] = volume
+        self.sequence_number = sequence_number
+        return True
+
+    def apply_snapshot(self, sequence_number: int, ask_prices: List[int], ask_volumes: List[int],
+                       bid_prices: List[int], bid_volumes: List[int]) -> None:
+        """Replace the contents of the book with an order book snapshot."""
+        self.sequence_number = sequence_number
+        self.ask_prices[:] = ask_prices
+        self.ask_volumes[:] = ask_volumes
+        self.bid_prices[:] = bid_prices
+        self.bid_volumes[:] = bid_volumes
 
 
 class BaseAutoTrader(Connection, Subscription):
@@ -41,9 +81,13 @@ class BaseAutoTrader(Connection, Subscription):
 
         self.event_loop: asyncio.AbstractEventLoop = loop
         self.logger = logging.getLogger("TRADER")
+        self.order_books: List[ReconstructedOrderBook] = [ReconstructedOrderBook() for _ in Instrument]
         self.team_name: bytes = team_name.encode()
         self.secret: bytes = secret.encode()
 
+        self.__execution_handlers: DispatchTable = bind_dispatch_table(EXECUTION_RESPONSE_DISPATCH_TABLE, self)
+        self.__information_handlers: DispatchTable = bind_dispatch_table(INFORMATION_DISPATCH_TABLE, self)
+
     def connection_made(self, transport: asyncio.BaseTransport) -> None:
         """Called twice, when the execution connection and the information channel are established."""
         if transport.get_extra_info("peername") is not None:
@@ -63,17 +107,39 @@ class BaseAutoTrader(Connection, Subscription):
         self.event_loop.stop()
 
     def on_datagram(self, typ: int, data: bytes, start: int, length: int) -> None:
-        """Called when an information message is received from the matching engine."""
-        if typ == MessageType.ORDER_BOOK_UPDATE and length == ORDER_BOOK_MESSAGE_SIZE:
-            inst, seq = ORDER_BOOK_HEADER.unpack_from(data, start)
-            self.on_order_book_update_message(inst, seq, *BOOK_PART.iter_unpack(data[ORDER_BOOK_HEADER_SIZE:]))
-        elif typ == MessageType.TRADE_TICKS and length == TRADE_TICKS_MESSAGE_SIZE:
-            inst, seq = TRADE_TICKS_HEADER.unpack_from(data, start)
-            self.on_trade_ticks_message(inst, seq, *TICKS_PART.iter_unpack(data[TRADE_TICKS_HEADER_SIZE:]))
-        else:
+        """Called when an information message is received from the matching engine.
+
+        The data may be a memoryview into the information channel's shared
+        memory, so prices and volumes are unpacked in place. Order book
+        snapshots and deltas are applied to the reconstructed order books,
+        so on_order_book_update_message is called in either feed mode.
+        """
+        if not dispatch_message(self.__information_handlers, typ, data, start, length):
             self.logger.error("received invalid information message: length=%d type=%d", length, typ)
             self.event_loop.stop()
 
+    def _on_order_book_delta(self, data: bytes, start: int, length: int) -> None:
+        """Called when an order book delta is received from the matching engine."""
+        inst, seq, previous_seq = ORDER_BOOK_DELTA_HEADER.unpack_from(data, start)
+        if inst < len(self.order_books):
+            book = self.order_books[inst]
+            book_seq = book.sequence_number
+            if book.apply_delta(seq, previous_seq, data, start + ORDER_BOOK_DELTA_HEADER.size,
+                               start + length - HEADER_SIZE):
+                self.on_order_book_update_message(inst, seq, tuple(book.ask_prices), tuple(book.ask_volumes),
+                                                  tuple(book.bid_prices), tuple(book.bid_volumes))
+            elif book_seq != 0:
+                self.logger.warning("missed order book messages for instrument %d: book_sequence=%d"
+                                    " delta_previous_sequence=%d, waiting for next snapshot", inst, book_seq,
+                                    previous_seq)
+
+    def _on_order_book_update(self, inst: int, seq: int, ask_prices: List[int], ask_volumes: List[int],
+                              bid_prices: List[int], bid_volumes: List[int]) -> None:
+        """Called when an order book snapshot is received from the matching engine."""
+        if inst < len(self.order_books):
+            self.order_books[inst].apply_snapshot(seq, ask_prices, ask_volumes, bid_prices, bid_volumes)
+        self.on_order_book_update_message(inst, seq, ask_prices, ask_volumes, bid_prices, bid_volumes)
+
     def on_hedge_filled_message(self, client_order_id: int, price: int, volume: int) -> None:
         """Called when one of your hedge orders is filled, partially or fully.
 
@@ -84,16 +150,7 @@ class BaseAutoTrader(Connection, Subscription):
 
     def on_message(self, typ: int, data: bytes, start: int, length: int) -> None:
         """Called when an execution message is received from the matching engine."""
-        if typ == MessageType.ERROR and length == ERROR_MESSAGE_SIZE:
-            client_order_id, error_message = ERROR_MESSAGE.unpack_from(data, start)
-            self.on_error_message(client_order_id, error_message.rstrip(b"\x00"))
-        elif typ == MessageType.HEDGE_FILLED and length == HEDGE_FILLED_MESSAGE_SIZE:
-            self.on_hedge_filled_message(*HEDGE_FILLED_MESSAGE.unpack_from(data, start))
-        elif typ == MessageType.ORDER_FILLED and length == ORDER_FILLED_MESSAGE_SIZE:
-            self.on_order_filled_message(*ORDER_FILLED_MESSAGE.unpack_from(data, start))
-        elif typ == MessageType.ORDER_STATUS and length == ORDER_STATUS_MESSAGE_SIZE:
-            self.on_order_status_message(*ORDER_STATUS_MESSAGE.unpack_from(data, start))
-        else:
+        if not dispatch_message(self.__execution_handlers, typ, data, start, length):
             self.logger.error("received invalid execution message: length=%d type=%d", length, typ)
             self.event_loop.stop()
 
@@ -152,6 +209,16 @@ class BaseAutoTrader(Connection, Subscription):
         """
         self.send_message(MessageType.AMEND_ORDER, AMEND_MESSAGE.pack(client_order_id, volume), AMEND_MESSAGE_SIZE)
 
+    def send_amend_orders(self, amends: Iterable[Tuple[int, int]]) -> None:
+        """Amend several orders with a single message.
+
+        Each amend is a (client_order_id, volume) pair and is treated exactly
+        as if it had been sent with send_amend_order. A batch holds at most
+        MAXIMUM_BATCH_SIZE amends and each counts towards the message
+        frequency limit.
+        """
+        self.__send_batch(MessageType.AMEND_ORDERS, AMEND_MESSAGE, amends)
+
     def send_cancel_order(self, client_order_id: int) -> None:
         """Cancel the specified order.
 
@@ -160,6 +227,15 @@ class BaseAutoTrader(Connection, Subscription):
         """
         self.send_message(MessageType.CANCEL_ORDER, CANCEL_MESSAGE.pack(client_order_id), CANCEL_MESSAGE_SIZE)
 
+    def send_cancel_orders(self, client_order_ids: Iterable[int]) -> None:
+        """Cancel several orders with a single message.
+
+        Each cancel is treated exactly as if it had been sent with
+        send_cancel_order. A batch holds at most MAXIMUM_BATCH_SIZE cancels
+        and each counts towards the message frequency limit.
+        """
+        self.__send_batch(MessageType.CANCEL_ORDERS, CANCEL_MESSAGE, ((i,) for i in client_order_ids))
+
     def send_hedge_order(self, client_order_id: int, side: Side, price: int, volume: int) -> None:
         """Order lots in the future to hedge a position."""
         self.send_message(MessageType.HEDGE_ORDER,
@@ -171,3 +247,34 @@ class BaseAutoTrader(Connection, Subscription):
         self.send_message(MessageType.INSERT_ORDER,
                           INSERT_MESSAGE.pack(client_order_id, side, price, volume, lifespan),
                           INSERT_MESSAGE_SIZE)
+
+    def send_insert_orders(self, inserts: Iterable[Tuple[int, Side, int, int, Lifespan]]) -> None:
+        """Insert several new orders into the market with a single message.
+
+        Each insert is a (client_order_id, side, price, volume, lifespan)
+        tuple and is treated exactly as if it had been sent with
+        send_insert_order. A batch holds at most MAXIMUM_BATCH_SIZE inserts and
+        each counts towards the message frequency limit.
+        """
+        self.__send_batch(MessageType.INSERT_ORDERS, INSERT_MESSAGE, inserts)
+
+    def send_replace_order(self, client_order_id: int, price: int, volume: int) -> None:
+        """Move the specified order to a new price and/or remaining volume.
+
+        This is a single operation, so the order is never absent from the
+        market as it would be between a cancel and an insert. The order keeps
+        its queue priority only if the price is unchanged and the volume is
+        not increased. If the order has already completely filled or been
+        cancelled this request has no effect and no order status message will
+        be received.
+        """
+        self.send_message(MessageType.REPLACE_ORDER, REPLACE_MESSAGE.pack(client_order_id, price, volume),
+                          REPLACE_MESSAGE_SIZE)
+
+    def __send_batch(self, typ: MessageType, item: struct.Struct, items: Iterable[Tuple]) -> None:
+        """Send a batched message containing the given items."""
+        data = b"".join(item.pack(*i) for i in items)
+        count = len(data) // item.size
+        if not 1 <= count <= MAXIMUM_BATCH_SIZE:
+            raise ValueError("a batch must contain between 1 and %d operations" % MAXIMUM_BATCH_SIZE)
+        self.send_message(typ, data, batch_message_size(item, count))
@@ -0,0 +1,191 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import time
+
+from typing import Dict, Iterable, List, Optional, TextIO, Tuple
+
+from .account import AccountFactory
+from .application import new_event_loop
+from .competitor import CompetitorManager
+from .execution import ExecutionServer
+from .limiter import FrequencyLimiterFactory
+from .match_events import MatchEvents
+from .messages import INSERT_MESSAGE, INSERT_MESSAGE_SIZE, LOGIN_MESSAGE, LOGIN_MESSAGE_SIZE, Connection, MessageType
+from .order_book import OrderBook
+from .score_board import ScoreBoardWriter
+from .timer import Timer
+from .types import IController, Instrument, Lifespan, Side
+from .unhedged_lots import UnhedgedLotsFactory
+
+
+BENCHMARK_HOST = "127.0.0.1"
+BENCHMARK_NAME = "benchmark"
+BENCHMARK_SECRET = "secret"
+DEFAULT_MESSAGE_COUNT = 10000
+WARM_UP_MESSAGE_COUNT = 100
+
+
+class BenchmarkController(IController):
+    """A controller for which the market is open as soon as it is created."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        """Initialise a new instance of the BenchmarkController class."""
+        self.__event_loop: asyncio.AbstractEventLoop = loop
+        self.__start_time: float = loop.time() - 1.0
+
+    def advance_time(self) -> float:
+        """Return the current time after accounting for events."""
+        return self.__event_loop.time() - self.__start_time
+
+
+class BenchmarkClient(Connection):
+    """An execution client that sends each insert order as soon as the previous one has been answered."""
+
+    def __init__(self, count: int, done: asyncio.Future):
+        """Initialise a new instance of the BenchmarkClient class."""
+        Connection.__init__(self)
+
+        self.latencies: List[float] = list()
+
+        self.__count: int = count
+        self.__done: asyncio.Future = done
+        self.__order_id: int = 0
+        self.__send_time: float = 0.0
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        """Called when the connection to the execution server is lost."""
+        Connection.connection_lost(self, exc)
+        if not self.__done.done():
+            self.__done.set_exception(ConnectionError("execution connection lost during the benchmark"))
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        """Called when the connection to the execution server is established."""
+        Connection.connection_made(self, transport)
+        self.send_message(MessageType.LOGIN, LOGIN_MESSAGE.pack(BENCHMARK_NAME.encode(), BENCHMARK_SECRET.encode()),
+                          LOGIN_MESSAGE_SIZE)
+        self.__send_insert_order()
+
+    def on_message(self, typ: int, data: bytes, start: int, length: int) -> None:
+        """Called when a message is received from the execution server."""
+        if typ == MessageType.ORDER_STATUS:
+            self.latencies.append(time.perf_counter() - self.__send_time)
+            if len(self.latencies) < self.__count:
+                self.__send_insert_order()
+            elif not self.__done.done():
+                self.__done.set_result(self.latencies)
+        elif typ == MessageType.ERROR and not self.__done.done():
+            self.__done.set_exception(Exception("the execution server rejected a benchmark message"))
+
+    def __send_insert_order(self) -> None:
+        """Send a fill-and-kill order that will be cancelled straight away."""
+        self.__order_id += 1
+        self.__send_time = time.perf_counter()
+        self.send_message(MessageType.INSERT_ORDER,
+                          INSERT_MESSAGE.pack(self.__order_id, Side.BUY, 100, 1, Lifespan.FILL_AND_KILL),
+                          INSERT_MESSAGE_SIZE)
+
+
+def find_free_port(host: str) -> int:
+    """Return a TCP port number on the given host that is not currently in use."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+class BenchmarkExchange:
+    """A stand-alone execution server for the given traders with a market that is open from the start."""
+
+    def __init__(self, host: str, port: int, traders: Dict[str, str]):
+        """Initialise a new instance of the BenchmarkExchange class."""
+        loop = asyncio.get_running_loop()
+
+        self.etf_book: OrderBook = OrderBook(Instrument.ETF, 0.0, 0.0)
+        self.future_book: OrderBook = OrderBook(Instrument.FUTURE, 0.0, 0.0)
+        self.score_board_writer: ScoreBoardWriter = ScoreBoardWriter(os.devnull, loop)
+        limits = {"ActiveOrderCountLimit": 10, "ActiveVolumeLimit": 200, "PositionLimit": 100}
+        self.competitor_manager: CompetitorManager = CompetitorManager(
+            limits, traders, AccountFactory(0.002, 1.0), self.etf_book, self.future_book, MatchEvents(),
+            self.score_board_writer, 1.0, Timer(1.0, 1.0), UnhedgedLotsFactory())
+        self.controller: BenchmarkController = BenchmarkController(loop)
+        self.competitor_manager.controller = self.controller
+
+        self.exec_server: ExecutionServer = ExecutionServer(host, port, self.competitor_manager,
+                                                            FrequencyLimiterFactory(1.0, 2 ** 31 - 1))
+        self.exec_server.controller = self.controller
+
+    async def start(self) -> None:
+        """Start the execution server."""
+        self.score_board_writer.start()
+        await self.exec_server.start()
+
+    async def stop(self) -> None:
+        """Disconnect every competitor and stop the execution server."""
+        for competitor in self.competitor_manager.get_competitors():
+            competitor.disconnect(self.controller.advance_time())
+        self.exec_server.close()
+        await asyncio.sleep(0.1)
+        self.score_board_writer.finish()
+        self.score_board_writer.writer_task.join()
+
+
+async def measure_execution_round_trips(count: int) -> List[float]:
+    """Return the round-trip latency, in seconds, of count insert orders sent
+    through an execution server running on the current event loop.
+    """
+    loop = asyncio.get_running_loop()
+
+    exchange = BenchmarkExchange(BENCHMARK_HOST, find_free_port(BENCHMARK_HOST), {BENCHMARK_NAME: BENCHMARK_SECRET})
+    await exchange.start()
+
+    done: asyncio.Future = loop.create_future()
+    transport, _ = await loop.create_connection(
+        lambda: BenchmarkClient(count + WARM_UP_MESSAGE_COUNT, done), BENCHMARK_HOST, exchange.exec_server.port)
+    try:
+        latencies: List[float] = await done
+    finally:
+        transport.close()
+        await exchange.stop()
+
+    return latencies[WARM_UP_MESSAGE_COUNT:]
+
+
+def run_benchmark(event_loop: str, count: int) -> Tuple[str, List[float]]:
+    """Return the name of the event loop used and the measured round-trip latencies."""
+    loop = new_event_loop(event_loop)
+    try:
+        return type(loop).__module__.partition(".")[0], loop.run_until_complete(measure_execution_round_trips(count))
+    finally:
+        loop.close()
+
+
+def main(event_loops: Iterable[str], count: int = DEFAULT_MESSAGE_COUNT, output: TextIO = sys.stdout) -> None:
+    """Benchmark execution round trips with each of the given event loops and print a report."""
+    print("%-10s %-14s %8s %10s %10s %10s %10s" % ("EventLoop", "Implementation", "Messages", "Mean(us)", "P50(us)",
+                                                   "P99(us)", "Max(us)"), file=output)
+    for event_loop in event_loops:
+        implementation, latencies = run_benchmark(event_loop, count)
+        latencies.sort()
+        print("%-10s %-14s %8d %10.1f %10.1f %10.1f %10.1f"
+              % (event_loop, implementation, len(latencies), statistics.fmean(latencies) * 1e6,
+                 latencies[len(latencies) // 2] * 1e6, latencies[(len(latencies) * 99) // 100] * 1e6,
+                 latencies[-1] * 1e6), file=output)
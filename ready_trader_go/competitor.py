@@ -18,7 +18,7 @@
 import bisect
 import logging
 
-from typing import Any, Callable, Dict, Iterable, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 from .account import AccountFactory, CompetitorAccount
 from .match_events import MatchEvents
@@ -48,6 +48,7 @@ class Competitor(ICompetitor, IOrderListener):
         self.last_client_order_id: int = -1
         self.logger: logging.Logger = logging.getLogger("COMPETITOR")
         self.match_events: MatchEvents = match_events
+        self.message_count: int = 0
         self.order_count_limit: int = order_count_limit
         self.name: str = name
         self.orders: Dict[int, Order] = dict()
@@ -86,7 +87,7 @@ class Competitor(ICompetitor, IOrderListener):
         if self.exec_connection is not None:
             self.exec_connection.send_order_status(order.client_order_id, order.volume - order.remaining_volume,
                                                    order.remaining_volume, order.total_fees)
-        self.match_events.amend(now, self.name, order.client_order_id, -volume_removed)
+        self.match_events.amend(now, self.name, order.client_order_id, order.instrument, -volume_removed)
 
         self.active_volume -= volume_removed
 
@@ -102,7 +103,7 @@ class Competitor(ICompetitor, IOrderListener):
         if self.exec_connection is not None:
             self.exec_connection.send_order_status(order.client_order_id, order.volume - volume_removed,
                                                    order.remaining_volume, order.total_fees)
-        self.match_events.cancel(now, self.name, order.client_order_id, -volume_removed)
+        self.match_events.cancel(now, self.name, order.client_order_id, order.instrument, -volume_removed)
 
         self.active_volume -= volume_removed
 
@@ -144,6 +145,25 @@ class Competitor(ICompetitor, IOrderListener):
         if not (-self.position_limit <= self.account.etf_position <= self.position_limit):
             self.hard_breach(now, order.client_order_id, b"ETF position limit breached")
 
+    def on_order_replaced(self, now: float, order: Order, old_price: int, old_remaining_volume: int) -> None:
+        """Called when an order's price or remaining volume is replaced."""
+        self.active_volume += order.remaining_volume - old_remaining_volume
+
+        if order.price != old_price:
+            if order.side == Side.BUY:
+                self.buy_prices.pop(bisect.bisect(self.buy_prices, old_price) - 1)
+                bisect.insort(self.buy_prices, order.price)
+            else:
+                self.sell_prices.pop(bisect.bisect(self.sell_prices, -old_price) - 1)
+                bisect.insort(self.sell_prices, -order.price)
+
+        self.match_events.replace(now, self.name, order.client_order_id, order.instrument, order.side,
+                                  order.remaining_volume, order.price)
+
+        if self.exec_connection is not None:
+            self.exec_connection.send_order_status(order.client_order_id, order.volume - order.remaining_volume,
+                                                   order.remaining_volume, order.total_fees)
+
     def on_unhedged_lots_expiry(self):
         """Called when unhedged lots have been held for too long."""
         self.logger.info("Unhedged lots timer expired for %s at etf=%d fut=%d rel=%d", self.name,
@@ -167,6 +187,13 @@ class Competitor(ICompetitor, IOrderListener):
             else:
                 self.etf_book.amend(now, order, volume)
 
+    def on_amend_messages(self, now: float, amends: Iterable[Tuple[int, int]]) -> None:
+        """Called when a batch of amend order requests is received from the competitor."""
+        for client_order_id, volume in amends:
+            if self.status == "BREACH":
+                break
+            self.on_amend_message(now, client_order_id, volume)
+
     def on_cancel_message(self, now: float, client_order_id: int) -> None:
         """Called when a cancel order request is received from the competitor."""
         if client_order_id > self.last_client_order_id:
@@ -176,6 +203,13 @@ class Competitor(ICompetitor, IOrderListener):
         if client_order_id in self.orders:
             self.etf_book.cancel(now, self.orders[client_order_id])
 
+    def on_cancel_messages(self, now: float, cancels: Iterable[Tuple[int]]) -> None:
+        """Called when a batch of cancel order requests is received from the competitor."""
+        for client_order_id, in cancels:
+            if self.status == "BREACH":
+                break
+            self.on_cancel_message(now, client_order_id)
+
     def on_hedge_message(self, now: float, client_order_id: int, side: int, price: int, volume: int) -> None:
         """Called when a hedge order request is received from the competitor."""
         if client_order_id <= self.last_client_order_id:
@@ -292,9 +326,52 @@ class Competitor(ICompetitor, IOrderListener):
         self.active_volume += volume
         self.etf_book.insert(now, order)
 
+    def on_insert_messages(self, now: float, inserts: Iterable[Tuple[int, int, int, int, int]]) -> None:
+        """Called when a batch of insert order requests is received from the competitor."""
+        for client_order_id, side, price, volume, lifespan in inserts:
+            if self.status == "BREACH":
+                break
+            self.on_insert_message(now, client_order_id, side, price, volume, lifespan)
+
+    def on_replace_message(self, now: float, client_order_id: int, price: int, volume: int) -> None:
+        """Called when a replace order request is received from the competitor."""
+        if client_order_id > self.last_client_order_id:
+            self.send_error(now, client_order_id, b"out-of-order client_order_id in replace message")
+            return
+
+        order = self.orders.get(client_order_id)
+        if order is None:
+            return
+
+        if not (MINIMUM_BID <= price <= MAXIMUM_ASK):
+            self.send_error(now, client_order_id, b"%d is not a valid price" % price)
+            return
+
+        if price % self.tick_size != 0:
+            self.send_error(now, client_order_id, b"price is not a multiple of tick size")
+            return
+
+        if volume < 1:
+            self.send_error(now, client_order_id, b"%d is not a valid volume" % volume)
+            return
+
+        if self.active_volume - order.remaining_volume + volume > self.active_volume_limit:
+            self.send_error(now, client_order_id, b"order rejected: active order volume limit breached")
+            return
+
+        if now == 0.0:
+            self.send_error(now, client_order_id, b"order rejected: market not yet open")
+            return
+
+        if ((order.side == Side.BUY and self.sell_prices and price >= -self.sell_prices[-1])
+                or (order.side == Side.SELL and self.buy_prices and price <= self.buy_prices[-1])):
+            self.send_error(now, client_order_id, b"order rejected: in cross with an existing order")
+            return
+
+        self.etf_book.replace(now, order, price, volume)
+
     def on_timer_tick(self, now: float, future_price: int, etf_price: int) -> None:
-        """Called on each timer tick to update the auto-trader."""
-        self.account.update(future_price or 0, etf_price or 0)
+        """Called on each timer tick, after the accounts have been updated, to update the auto-trader."""
         self.score_board.tick(now, self.name, self.account, etf_price, future_price, self.status)
 
     def send_error(self, now: float, client_order_id: int, message: bytes) -> None:
@@ -385,6 +462,7 @@ class CompetitorManager:
         """Called on each timer tick."""
         etf_price = self.__etf_book.last_traded_price()
         future_price = self.__future_book.last_traded_price()
+        self.__account_factory.book.update(future_price or 0, etf_price or 0)
         for competitor in self.__competitors.values():
             competitor.on_timer_tick(now, future_price, etf_price)
 
@@ -15,6 +15,7 @@
 #     You should have received a copy of the GNU Affero General Public
 #     License along with Ready Trader Go.  If not, see
 #     <https://www.gnu.org/licenses/>.
+import signal
 import socket
 
 from .account import AccountFactory
@@ -22,13 +23,16 @@ from .application import Application
 from .competitor import CompetitorManager
 from .controller import Controller
 from .execution import ExecutionServer
-from .heads_up import HeadsUpDisplayServer
-from .information import InformationPublisher
+from .heads_up import DEFAULT_HIGH_WATER_MARK, HeadsUpDisplayServer
+from .information import DEFAULT_MINIMUM_PUBLISH_INTERVAL, DEFAULT_SNAPSHOT_INTERVAL, InformationPublisher
+from .instrumentation import Instrumentation
 from .limiter import FrequencyLimiterFactory
 from .market_events import MarketEventsReader
 from .match_events import MatchEvents, MatchEventsWriter
+from .metrics import ExchangeMetrics, MetricsServer
 from .order_book import OrderBook
-from .pubsub import PublisherFactory
+from .pubsub import (BUFFER_SIZE, DEFAULT_INTERFACE, DEFAULT_TIME_TO_LIVE, PublisherFactory,
+                     parse_multicast_address, validate_buffer_size)
 from .score_board import ScoreBoardWriter
 from .timer import Timer
 from .types import Instrument
@@ -70,9 +74,62 @@ def __exchange_config_validator(config):
                                          "MessageFrequencyLimit", "PositionLimit"), (int, int, float, int, int))
     __validate_hostname(config, "Execution", "Host")
 
+    if config["Limits"].setdefault("MessageFrequencyEngine", "deque") not in ("deque", "ring"):
+        raise Exception("Limits MessageFrequencyEngine must be either 'deque' or 'ring'")
+
+    if "BufferSize" in config["Information"]:
+        if type(config["Information"]["BufferSize"]) is not int:
+            raise Exception("Element of inappropriate type in Information configuration")
+        try:
+            validate_buffer_size(config["Information"]["BufferSize"])
+        except ValueError as e:
+            raise Exception("Invalid BufferSize in Information configuration: %s" % e)
+
+    if config["Information"].setdefault("FeedMode", "snapshot") not in ("incremental", "snapshot"):
+        raise Exception("Information FeedMode must be either 'incremental' or 'snapshot'")
+    config["Information"].setdefault("SnapshotInterval", DEFAULT_SNAPSHOT_INTERVAL)
+    __validate_object(config, "Information", ("FeedMode", "SnapshotInterval"), (str, int))
+    if config["Information"]["SnapshotInterval"] < 1:
+        raise Exception("Information SnapshotInterval must be a positive number of ticks")
+
+    if config["Information"].setdefault("PublishMode", "tick") not in ("change", "tick"):
+        raise Exception("Information PublishMode must be either 'change' or 'tick'")
+    config["Information"].setdefault("MinimumPublishInterval", DEFAULT_MINIMUM_PUBLISH_INTERVAL)
+    if type(config["Information"]["MinimumPublishInterval"]) is int:
+        config["Information"]["MinimumPublishInterval"] = float(config["Information"]["MinimumPublishInterval"])
+    __validate_object(config, "Information", ("PublishMode", "MinimumPublishInterval"), (str, float))
+    if config["Information"]["MinimumPublishInterval"] < 0.0:
+        raise Exception("Information MinimumPublishInterval must not be negative")
+
+    if config["Information"]["Type"] == "multicast":
+        try:
+            parse_multicast_address(config["Information"]["Name"])
+        except ValueError as e:
+            raise Exception("Invalid Name in Information configuration: %s" % e)
+        config["Information"].setdefault("Interface", DEFAULT_INTERFACE)
+        config["Information"].setdefault("TimeToLive", DEFAULT_TIME_TO_LIVE)
+        __validate_object(config, "Information", ("Interface", "TimeToLive"), (str, int))
+        __validate_hostname(config, "Information", "Interface")
+
     if "Hud" in config:
         __validate_object(config, "Hud", ("Host", "Port"), (str, int))
         __validate_hostname(config, "Hud", "Host")
+        config["Hud"].setdefault("HighWaterMark", DEFAULT_HIGH_WATER_MARK)
+        __validate_object(config, "Hud", ("HighWaterMark",), (int,))
+        if config["Hud"]["HighWaterMark"] < 1:
+            raise Exception("Hud HighWaterMark must be a positive number of bytes")
+
+    if "Instrumentation" in config:
+        __validate_object(config, "Instrumentation", ("ReportFile",), (str,))
+
+    if "Metrics" in config:
+        if type(config["Metrics"]) is dict and "Path" in config["Metrics"]:
+            __validate_object(config, "Metrics", ("Path",), (str,))
+            if not hasattr(socket, "AF_UNIX"):
+                raise Exception("Metrics Path requires Unix domain sockets, use Host and Port instead")
+        else:
+            __validate_object(config, "Metrics", ("Host", "Port"), (str, int))
+            __validate_hostname(config, "Metrics", "Host")
 
     if type(config["Traders"]) is not dict:
         raise Exception("Traders configuration should be a JSON object")
@@ -109,10 +166,15 @@ def setup(app: Application) -> Controller:
                                            tick_timer, unhedged_lots_factory)
 
     limiter_factory = FrequencyLimiterFactory(limits["MessageFrequencyInterval"] / engine["Speed"],
-                                              limits["MessageFrequencyLimit"])
+                                              limits["MessageFrequencyLimit"], limits["MessageFrequencyEngine"])
     exec_server = ExecutionServer(exec_["Host"], exec_["Port"], competitor_manager, limiter_factory)
-    info_publisher = InformationPublisher(app.event_loop, PublisherFactory(info["Type"], info["Name"]),
-                                          (future_book, etf_book), tick_timer)
+    publisher_factory = PublisherFactory(info["Type"], info["Name"], info.get("BufferSize", BUFFER_SIZE),
+                                         info.get("Interface", DEFAULT_INTERFACE),
+                                         info.get("TimeToLive", DEFAULT_TIME_TO_LIVE))
+    snapshot_interval = info["SnapshotInterval"] if info["FeedMode"] == "incremental" else 0
+    info_publisher = InformationPublisher(app.event_loop, publisher_factory, (future_book, etf_book), tick_timer,
+                                          snapshot_interval, match_events if info["PublishMode"] == "change" else None,
+                                          info["MinimumPublishInterval"] / engine["Speed"])
 
     market_timer = Timer(engine["MarketEventInterval"], engine["Speed"])
     controller = Controller(engine["MarketOpenDelay"], exec_server, info_publisher, market_events_reader,
@@ -122,9 +184,26 @@ def setup(app: Application) -> Controller:
 
     if "Hud" in app.config:
         hud_server = HeadsUpDisplayServer(app.config["Hud"]["Host"], app.config["Hud"]["Port"], match_events,
-                                          competitor_manager, controller)
+                                          competitor_manager, controller, (future_book, etf_book), tick_timer,
+                                          app.config["Hud"]["HighWaterMark"])
         controller.heads_up_display_server = hud_server
 
+    if "Instrumentation" in app.config:
+        instrumentation = Instrumentation(app.config["Instrumentation"]["ReportFile"])
+        instrumentation.instrument_exchange(controller, exec_server, market_events_reader, (future_book, etf_book))
+        tick_timer.timer_stopped.append(instrumentation.on_timer_stopped)
+        if hasattr(signal, "SIGUSR1"):
+            app.event_loop.add_signal_handler(signal.SIGUSR1, instrumentation.log_report)
+
+    if "Metrics" in app.config:
+        metrics_config = app.config["Metrics"]
+        metrics = ExchangeMetrics(app.event_loop, competitor_manager, match_events, (future_book, etf_book),
+                                  market_events_reader, market_timer, match_events_writer, score_board_writer)
+        metrics_server = MetricsServer(metrics_config.get("Host"), metrics_config.get("Port"),
+                                       metrics_config.get("Path"), metrics.render)
+        metrics.start()
+        app.event_loop.create_task(metrics_server.start())
+
     app.event_loop.create_task(controller.start())
     return controller
 
@@ -18,22 +18,21 @@
 import asyncio
 import logging
 
-from typing import Optional
+from typing import Callable, List, Optional, Union
 
 from .competitor import Competitor, CompetitorManager
-from .limiter import FrequencyLimiter, FrequencyLimiterFactory
-from .messages import (AMEND_MESSAGE, AMEND_MESSAGE_SIZE, CANCEL_MESSAGE, CANCEL_MESSAGE_SIZE,
-                       ERROR_MESSAGE, ERROR_MESSAGE_SIZE, HEADER, HEADER_SIZE, HEDGE_FILLED_MESSAGE,
-                       HEDGE_FILLED_MESSAGE_SIZE, HEDGE_MESSAGE, HEDGE_MESSAGE_SIZE, INSERT_MESSAGE,
-                       INSERT_MESSAGE_SIZE, LOGIN_MESSAGE, LOGIN_MESSAGE_SIZE, ORDER_FILLED_MESSAGE,
-                       ORDER_FILLED_MESSAGE_SIZE, ORDER_STATUS_MESSAGE, ORDER_STATUS_MESSAGE_SIZE,
-                       Connection, MessageType)
+from .limiter import FrequencyLimiter, FrequencyLimiterFactory, RingFrequencyLimiter
+from .messages import (ERROR_MESSAGE, ERROR_MESSAGE_SIZE, EXECUTION_REQUEST_DISPATCH_TABLE, HEADER, HEADER_SIZE,
+                       HEDGE_FILLED_MESSAGE, HEDGE_FILLED_MESSAGE_SIZE, LOGIN_MESSAGE_SIZE, MAXIMUM_BATCH_SIZE,
+                       ORDER_FILLED_MESSAGE, ORDER_FILLED_MESSAGE_SIZE, ORDER_STATUS_MESSAGE,
+                       ORDER_STATUS_MESSAGE_SIZE, Connection, DispatchTable, MessageType, bind_dispatch_table,
+                       dispatch_message, unpack_login_message)
 from .types import IController, IExecutionConnection
 
 
 class ExecutionConnection(Connection, IExecutionConnection):
-    def __init__(self, competitor_manager: CompetitorManager, frequency_limiter: FrequencyLimiter,
-                 controller: IController):
+    def __init__(self, competitor_manager: CompetitorManager,
+                 frequency_limiter: Union[FrequencyLimiter, RingFrequencyLimiter], controller: IController):
         """Initialise a new instance of the ExecutionChannel class."""
         Connection.__init__(self)
 
@@ -41,10 +40,11 @@ class ExecutionConnection(Connection, IExecutionConnection):
         self.competitor_manager: CompetitorManager = competitor_manager
         self.controller: IController = controller
         self.closing: bool = False
-        self.frequency_limiter: FrequencyLimiter = frequency_limiter
+        self.frequency_limiter: Union[FrequencyLimiter, RingFrequencyLimiter] = frequency_limiter
         self.logger: logging.Logger = logging.getLogger("EXECUTION")
         self.login_timeout: asyncio.Handle = asyncio.get_running_loop().call_later(1.0, self.close)
 
+        self.__competitor_handlers: DispatchTable = EXECUTION_REQUEST_DISPATCH_TABLE
         self.__error_message = bytearray(ERROR_MESSAGE_SIZE)
         self.__hedge_filled_message = bytearray(HEDGE_FILLED_MESSAGE_SIZE)
         self.__order_status_message = bytearray(ORDER_STATUS_MESSAGE_SIZE)
@@ -84,10 +84,26 @@ class ExecutionConnection(Connection, IExecutionConnection):
         self.competitor_manager.on_competitor_connect()
 
     def on_message(self, typ: int, data: bytes, start: int, length: int) -> None:
-        """Called when a message is received from the auto-trader."""
+        """Called when a message is received from the auto-trader.
+
+        Each operation in a batched message counts as one message against the
+        message frequency limit.
+        """
         now: float = self.controller.advance_time()
 
-        if self.frequency_limiter.check_event(now):
+        descriptor = EXECUTION_REQUEST_DISPATCH_TABLE[typ]
+        if descriptor is not None and descriptor.item_size:
+            count: int = (length - HEADER_SIZE) // descriptor.item_size
+            if count > MAXIMUM_BATCH_SIZE:
+                self.logger.info("fd=%d received oversized batch message: time=%.6f length=%d type=%d",
+                                 self._file_number, now, length, typ)
+                self.close()
+                return
+            breached: bool = self.frequency_limiter.check_events(now, max(count, 1))
+        else:
+            breached = self.frequency_limiter.check_event(now)
+
+        if breached:
             self.logger.info("fd=%d message frequency limit breached: now=%.6f value=%d limit=%d",
                              self._file_number, now, self.frequency_limiter.value, self.frequency_limiter.limit)
             if self.competitor is not None:
@@ -98,22 +114,14 @@ class ExecutionConnection(Connection, IExecutionConnection):
 
         if self.competitor is None:
             if typ == MessageType.LOGIN and length == LOGIN_MESSAGE_SIZE:
-                raw_name, raw_secret = LOGIN_MESSAGE.unpack_from(data, start)
-                self.on_login(raw_name.rstrip(b"\x00").decode(), raw_secret.rstrip(b"\x00").decode())
+                self.on_login(*unpack_login_message(data, start))
             else:
                 self.logger.info("fd=%d first message received was not a login", self._file_number)
                 self.close()
             return
 
-        if typ == MessageType.AMEND_ORDER and length == AMEND_MESSAGE_SIZE:
-            self.competitor.on_amend_message(now, *AMEND_MESSAGE.unpack_from(data, start))
-        elif typ == MessageType.CANCEL_ORDER and length == CANCEL_MESSAGE_SIZE:
-            self.competitor.on_cancel_message(now, *CANCEL_MESSAGE.unpack_from(data, start))
-        elif typ == MessageType.HEDGE_ORDER and length == HEDGE_MESSAGE_SIZE:
-            self.competitor.on_hedge_message(now, *HEDGE_MESSAGE.unpack_from(data, start))
-        elif typ == MessageType.INSERT_ORDER and length == INSERT_MESSAGE_SIZE:
-            self.competitor.on_insert_message(now, *INSERT_MESSAGE.unpack_from(data, start))
-        else:
+        self.competitor.message_count += 1
+        if not dispatch_message(self.__competitor_handlers, typ, data, start, length, now):
             if typ == MessageType.LOGIN:
                 self.logger.info("fd=%d received second login message: time=%.6f name='%s'", self._file_number,
                                  now, self.competitor.name)
@@ -132,6 +140,7 @@ class ExecutionConnection(Connection, IExecutionConnection):
             self.close()
             return
 
+        self.__competitor_handlers = bind_dispatch_table(EXECUTION_REQUEST_DISPATCH_TABLE, self.competitor)
         self.logger.info("fd=%d '%s' is ready!", self._file_number, name)
 
     def send_error(self, client_order_id: int, error_message: bytes) -> None:
@@ -171,13 +180,19 @@ class ExecutionServer:
         self.__logger = logging.getLogger("EXECUTION")
         self.__server: Optional[asyncio.AbstractServer] = None
 
+        # Signals
+        self.connection_created: List[Callable[[ExecutionConnection], None]] = list()
+
     def close(self):
         """Close the server without affecting existing connections."""
         self.__server.close()
 
     def __on_new_connection(self) -> ExecutionConnection:
         """Callback for when a new connection is accepted."""
-        return ExecutionConnection(self.__competitor_manager, self.__limiter_factory.create(), self.controller)
+        connection = ExecutionConnection(self.__competitor_manager, self.__limiter_factory.create(), self.controller)
+        for callback in self.connection_created:
+            callback(connection)
+        return connection
 
     async def start(self) -> None:
         """Start the server."""
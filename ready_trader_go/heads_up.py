@@ -18,162 +18,305 @@
 import asyncio
 import logging
 
-from typing import Dict, Optional
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 from .competitor import CompetitorManager
 from .match_events import MatchEvent, MatchEventOperation, MatchEvents
-from .messages import (AMEND_MESSAGE, AMEND_MESSAGE_SIZE, CANCEL_MESSAGE, CANCEL_MESSAGE_SIZE,
-                       ERROR_MESSAGE, ERROR_MESSAGE_SIZE, HEADER, HEADER_SIZE, INSERT_MESSAGE,
-                       INSERT_MESSAGE_SIZE, LOGIN_MESSAGE, LOGIN_MESSAGE_SIZE,
-                       AMEND_EVENT_MESSAGE, AMEND_EVENT_MESSAGE_SIZE, CANCEL_EVENT_MESSAGE, CANCEL_EVENT_MESSAGE_SIZE,
-                       INSERT_EVENT_MESSAGE, INSERT_EVENT_MESSAGE_SIZE, HEDGE_EVENT_MESSAGE, HEDGE_EVENT_MESSAGE_SIZE,
-                       LOGIN_EVENT_MESSAGE, LOGIN_EVENT_MESSAGE_SIZE,
-                       TRADE_EVENT_MESSAGE, TRADE_EVENT_MESSAGE_SIZE, Connection, MessageType)
+from .messages import (ERROR_MESSAGE, ERROR_MESSAGE_SIZE, HEADER, HEADER_SIZE, HUD_REQUEST_DISPATCH_TABLE,
+                       HUD_SUBSCRIBE_DISPATCH_TABLE, SUBSCRIBE_ALL, SUBSCRIBE_TOP_OF_BOOK, TOP_OF_BOOK_EVENT_HEADER,
+                       TOP_OF_BOOK_EVENT_HEADER_SIZE, TOP_OF_BOOK_EVENT_MESSAGE, TOP_OF_BOOK_EVENT_MESSAGE_SIZE,
+                       LOGIN_MESSAGE_SIZE, AMEND_EVENT_MESSAGE, AMEND_EVENT_MESSAGE_SIZE, CANCEL_EVENT_MESSAGE,
+                       CANCEL_EVENT_MESSAGE_SIZE, INSERT_EVENT_MESSAGE, INSERT_EVENT_MESSAGE_SIZE,
+                       HEDGE_EVENT_MESSAGE, HEDGE_EVENT_MESSAGE_SIZE, LOGIN_EVENT_MESSAGE, LOGIN_EVENT_MESSAGE_SIZE,
+                       TRADE_EVENT_MESSAGE, TRADE_EVENT_MESSAGE_SIZE, REPLACE_EVENT_MESSAGE,
+                       REPLACE_EVENT_MESSAGE_SIZE, Connection, DispatchTable, MessageType,
+                       bind_dispatch_table, dispatch_message, unpack_login_message)
+from .order_book import TOP_LEVEL_COUNT, OrderBook
+from .timer import Timer
 from .types import ICompetitor, IController, IExecutionConnection
 
 
+DEFAULT_HIGH_WATER_MARK = 4 * 1024 * 1024  # Bytes a heads-up display may fall behind before it is disconnected
+
+
 class HudConnection(Connection, IExecutionConnection):
-    def __init__(self, match_events: MatchEvents, competitor_manager: CompetitorManager, controller: IController):
+    """A connection from a heads-up display.
+
+    Until the heads-up display sends a subscribe message, it is sent every
+    match event. A subscription narrows the events sent to those of the given
+    teams, operations and instruments and, if it asks for the top of the
+    order books, replaces the market's own order events with a snapshot of
+    the top levels of each order book every tick.
+
+    If more than high_water_mark bytes are waiting to be sent to the
+    heads-up display, it is not keeping up with the match and is
+    disconnected, so that it cannot hold up the exchange or other observers.
+    """
+
+    def __init__(self, broadcaster: "HudBroadcaster", competitor_manager: CompetitorManager, controller: IController,
+                 high_water_mark: int = DEFAULT_HIGH_WATER_MARK):
         """Initialise a new instance of the HudConnection class."""
         Connection.__init__(self)
 
+        self.high_water_mark: int = high_water_mark
+        self.subscribed_instruments: int = SUBSCRIBE_ALL
+        self.subscribed_operations: int = SUBSCRIBE_ALL
+        self.subscribed_teams: Optional[Set[str]] = None
+        self.top_of_book: bool = False
+
+        self.__broadcaster: HudBroadcaster = broadcaster
         self.__competitor: Optional[ICompetitor] = None
-        self.__competitor_ids: Dict[str, int] = {"": 0}
+        self.__competitor_handlers: DispatchTable = HUD_REQUEST_DISPATCH_TABLE
         self.__competitor_manager: CompetitorManager = competitor_manager
         self.__controller: IController = controller
         self.__logger = logging.getLogger("HEADS_UP")
-        self.__match_events: MatchEvents = match_events
+        self.__subscribe_handlers: DispatchTable = bind_dispatch_table(HUD_SUBSCRIBE_DISPATCH_TABLE, self)
 
         # Message buffers
         self.__error_message = bytearray(ERROR_MESSAGE_SIZE)
-        self.__amend_event_message = bytearray(AMEND_EVENT_MESSAGE_SIZE)
-        self.__cancel_event_message = bytearray(CANCEL_EVENT_MESSAGE_SIZE)
-        self.__insert_event_message = bytearray(INSERT_EVENT_MESSAGE_SIZE)
-        self.__login_event_message = bytearray(LOGIN_EVENT_MESSAGE_SIZE)
-        self.__hedge_event_message = bytearray(HEDGE_EVENT_MESSAGE_SIZE)
-        self.__trade_event_message = bytearray(TRADE_EVENT_MESSAGE_SIZE)
 
         HEADER.pack_into(self.__error_message, 0, ERROR_MESSAGE_SIZE, MessageType.ERROR)
-        HEADER.pack_into(self.__amend_event_message, 0, AMEND_EVENT_MESSAGE_SIZE, MessageType.AMEND_EVENT)
-        HEADER.pack_into(self.__cancel_event_message, 0, CANCEL_EVENT_MESSAGE_SIZE, MessageType.CANCEL_EVENT)
-        HEADER.pack_into(self.__insert_event_message, 0, INSERT_EVENT_MESSAGE_SIZE, MessageType.INSERT_EVENT)
-        HEADER.pack_into(self.__login_event_message, 0, LOGIN_EVENT_MESSAGE_SIZE, MessageType.LOGIN_EVENT)
-        HEADER.pack_into(self.__hedge_event_message, 0, HEDGE_EVENT_MESSAGE_SIZE, MessageType.HEDGE_EVENT)
-        HEADER.pack_into(self.__trade_event_message, 0, TRADE_EVENT_MESSAGE_SIZE, MessageType.TRADE_EVENT)
 
     def connection_lost(self, exc: Optional[Exception]) -> None:
         """Called when the connection to the heads-up display is lost."""
         Connection.connection_lost(self, exc)
-        self.__match_events.event_occurred.remove(self.on_match_event)
-        self.__competitor_manager.competitor_logged_in.remove(self.on_competitor_logged_in)
+        self.__broadcaster.remove(self)
         self.__competitor_manager.on_competitor_disconnect()
 
     def connection_made(self, transport: asyncio.transports.BaseTransport) -> None:
         """Called when a connection from a heads-up display is established."""
         Connection.connection_made(self, transport)
+        transport.set_write_buffer_limits(high=self.high_water_mark)
         self.__competitor_manager.on_competitor_connect()
-        self.__competitor_manager.competitor_logged_in.append(self.on_competitor_logged_in)
-        for competitor in self.__competitor_manager.get_competitors():
-            self.on_competitor_logged_in(competitor.name)
-        self.__match_events.event_occurred.append(self.on_match_event)
+        self.__broadcaster.add(self)
+
+    def is_subscribed(self, event: MatchEvent) -> bool:
+        """Return True if the heads-up display has subscribed to the given match event."""
+        if event.competitor:
+            if self.subscribed_teams is not None and event.competitor not in self.subscribed_teams:
+                return False
+        elif self.top_of_book:
+            return False
+        if not self.subscribed_operations & (1 << event.operation):
+            return False
+        return event.instrument is None or bool(self.subscribed_instruments & (1 << event.instrument))
 
     def on_message(self, typ: int, data: bytes, start: int, length: int) -> None:
         """Callback when a message is received from the Heads-Up Display."""
         now: float = self.__controller.advance_time()
 
+        if typ == MessageType.SUBSCRIBE:
+            if not dispatch_message(self.__subscribe_handlers, typ, data, start, length):
+                self.__logger.warning("fd=%d received invalid subscribe message: time=%.6f length=%d",
+                                      self._file_number, now, length)
+            return
+
         if self.__competitor is None:
             if typ == MessageType.LOGIN and length == LOGIN_MESSAGE_SIZE:
-                raw_name, raw_secret = LOGIN_MESSAGE.unpack_from(data, start)
-                self.on_login(raw_name.rstrip(b"\x00").decode(), raw_secret.rstrip(b"\x00").decode())
+                self.on_login(*unpack_login_message(data, start))
             else:
                 self.__logger.info("fd=%d first message received was not a login", self._file_number)
                 self._connection_transport.close()
             return
 
-        if typ == MessageType.AMEND_ORDER and length == AMEND_MESSAGE_SIZE:
-            self.__competitor.on_amend_message(now, *AMEND_MESSAGE.unpack_from(data, start))
-        elif typ == MessageType.CANCEL_ORDER and length == CANCEL_MESSAGE_SIZE:
-            self.__competitor.on_cancel_message(now, *CANCEL_MESSAGE.unpack_from(data, start))
-        elif typ == MessageType.INSERT_ORDER and length == INSERT_MESSAGE_SIZE:
-            self.__competitor.on_insert_message(now, *INSERT_MESSAGE.unpack_from(data, start))
-        else:
-            self.__logger.warning("fd=%d '%s' received invalid message: time=%.6f length=%d type=%d",
-                                  self._file_number, length, typ)
+        if not dispatch_message(self.__competitor_handlers, typ, data, start, length, now):
+            self.__logger.warning("fd=%d received invalid message: time=%.6f length=%d type=%d",
+                                  self._file_number, now, length, typ)
             self.close()
 
-    def on_competitor_logged_in(self, name: str) -> None:
-        """Called when a competitor logs in."""
-        identifier = self.__competitor_ids[name] = len(self.__competitor_ids) + 1
-        LOGIN_EVENT_MESSAGE.pack_into(self.__login_event_message, HEADER_SIZE, name.encode(), identifier)
-        self._connection_transport.write(self.__login_event_message)
-
     def on_login(self, name: str, secret: str) -> None:
         """Called when the heads-up display logs in."""
         self.__competitor = self.__competitor_manager.login_competitor(name, secret, self)
+        if self.__competitor is not None:
+            self.__competitor_handlers = bind_dispatch_table(HUD_REQUEST_DISPATCH_TABLE, self.__competitor)
 
-    def on_match_event(self, event: MatchEvent) -> None:
-        """Called when a match event occurs."""
+    def on_subscribe_message(self, subscription: Tuple[int, int, int, List[str]]) -> None:
+        """Called when the heads-up display chooses the events it is sent."""
+        operations, instruments, flags, teams = subscription
+        self.subscribed_operations = operations
+        self.subscribed_instruments = instruments
+        self.subscribed_teams = set(teams) if teams else None
+        self.top_of_book = bool(flags & SUBSCRIBE_TOP_OF_BOOK)
+        self.__logger.info("fd=%d subscribed: operations=%#x instruments=%#x flags=%#x teams=%s",
+                           self._file_number, operations, instruments, flags, ",".join(teams) or "*")
+
+    def pause_writing(self) -> None:
+        """Called when more than the high-water mark of data is waiting to be sent to the heads-up display."""
+        self.__logger.warning("fd=%d disconnecting slow heads-up display: buffered=%d high_water_mark=%d",
+                              self._file_number, self._connection_transport.get_write_buffer_size(),
+                              self.high_water_mark)
+        self._closing = True
+        self._connection_transport.abort()
+
+    def write(self, frame: bytes) -> None:
+        """Send an encoded frame to the heads-up display unless it is being disconnected."""
+        if not self._closing:
+            self._connection_transport.write(frame)
+
+    # IExecutionConnection overrides
+
+    def close(self):
+        """Close the connection."""
+        # Do nothing since the HUD should not be disconnected.
+
+    def send_error(self, client_order_id: int, error_message: bytes) -> None:
+        """Send an error message to the heads-up display."""
+        ERROR_MESSAGE.pack_into(self.__error_message, HEADER_SIZE, client_order_id, error_message)
+        self.write(self.__error_message)
+
+    def send_order_filled(self, client_order_id: int, price: int, volume: int) -> None:
+        """Send an order filled message to the heads-up display."""
+        # Do nothing since the HUD will get a Trade event.
+
+    def send_order_status(self, client_order_id: int, fill_volume: int, remaining_volume: int, fees: int) -> None:
+        """Send an order status message to the heads-up display."""
+        # Do nothing since the HUD will get Trade and cancel events.
+
+
+class HudBroadcaster:
+    """Send match events to every connected heads-up display.
+
+    Each match event is encoded at most once, into a frame that is shared by
+    every connection that has subscribed to it, however many heads-up
+    displays are watching the match. Teams are numbered here rather than by
+    each connection, so that the frames are the same for every connection.
+    """
+
+    def __init__(self, match_events: MatchEvents, competitor_manager: CompetitorManager, books: Iterable[OrderBook],
+                 tick_timer: Timer):
+        """Initialise a new instance of the HudBroadcaster class."""
+        self.connections: List[HudConnection] = list()
+
+        self.__books: Tuple[OrderBook, ...] = tuple(books)
+        self.__competitor_ids: Dict[str, int] = {"": 0}
+        self.__login_events: List[bytes] = list()
+
+        self.__ask_prices: List[int] = [0] * TOP_LEVEL_COUNT
+        self.__ask_volumes: List[int] = [0] * TOP_LEVEL_COUNT
+        self.__bid_prices: List[int] = [0] * TOP_LEVEL_COUNT
+        self.__bid_volumes: List[int] = [0] * TOP_LEVEL_COUNT
+
+        # Message buffers
+        self.__amend_event_message = bytearray(AMEND_EVENT_MESSAGE_SIZE)
+        self.__cancel_event_message = bytearray(CANCEL_EVENT_MESSAGE_SIZE)
+        self.__insert_event_message = bytearray(INSERT_EVENT_MESSAGE_SIZE)
+        self.__hedge_event_message = bytearray(HEDGE_EVENT_MESSAGE_SIZE)
+        self.__trade_event_message = bytearray(TRADE_EVENT_MESSAGE_SIZE)
+        self.__replace_event_message = bytearray(REPLACE_EVENT_MESSAGE_SIZE)
+        self.__top_of_book_event_message = bytearray(TOP_OF_BOOK_EVENT_MESSAGE_SIZE)
+
+        HEADER.pack_into(self.__amend_event_message, 0, AMEND_EVENT_MESSAGE_SIZE, MessageType.AMEND_EVENT)
+        HEADER.pack_into(self.__cancel_event_message, 0, CANCEL_EVENT_MESSAGE_SIZE, MessageType.CANCEL_EVENT)
+        HEADER.pack_into(self.__insert_event_message, 0, INSERT_EVENT_MESSAGE_SIZE, MessageType.INSERT_EVENT)
+        HEADER.pack_into(self.__hedge_event_message, 0, HEDGE_EVENT_MESSAGE_SIZE, MessageType.HEDGE_EVENT)
+        HEADER.pack_into(self.__trade_event_message, 0, TRADE_EVENT_MESSAGE_SIZE, MessageType.TRADE_EVENT)
+        HEADER.pack_into(self.__replace_event_message, 0, REPLACE_EVENT_MESSAGE_SIZE, MessageType.REPLACE_EVENT)
+        HEADER.pack_into(self.__top_of_book_event_message, 0, TOP_OF_BOOK_EVENT_MESSAGE_SIZE,
+                         MessageType.TOP_OF_BOOK_EVENT)
+
+        competitor_manager.competitor_logged_in.append(self.on_competitor_logged_in)
+        match_events.event_occurred.append(self.on_match_event)
+        tick_timer.timer_ticked.append(self.on_timer_tick)
+
+    def add(self, connection: HudConnection) -> None:
+        """Start sending match events to the given connection, beginning with the teams that have logged in."""
+        for frame in self.__login_events:
+            connection.write(frame)
+        self.connections.append(connection)
+
+    def remove(self, connection: HudConnection) -> None:
+        """Stop sending match events to the given connection."""
+        self.connections.remove(connection)
+
+    def __encode(self, event: MatchEvent) -> bytearray:
+        """Return the given match event encoded in its message buffer."""
         if event.operation == MatchEventOperation.AMEND:
             AMEND_EVENT_MESSAGE.pack_into(self.__amend_event_message, HEADER_SIZE, event.time,
                                           self.__competitor_ids[event.competitor], event.order_id, event.volume)
-            self._connection_transport.write(self.__amend_event_message)
+            return self.__amend_event_message
         elif event.operation == MatchEventOperation.CANCEL:
             CANCEL_EVENT_MESSAGE.pack_into(self.__cancel_event_message, HEADER_SIZE, event.time,
                                            self.__competitor_ids[event.competitor], event.order_id)
-            self._connection_transport.write(self.__cancel_event_message)
+            return self.__cancel_event_message
         elif event.operation == MatchEventOperation.INSERT:
             INSERT_EVENT_MESSAGE.pack_into(self.__insert_event_message, HEADER_SIZE, event.time,
                                            self.__competitor_ids[event.competitor], event.order_id,
                                            event.instrument.value, event.side.value, event.volume, event.price,
                                            event.lifespan.value)
-            self._connection_transport.write(self.__insert_event_message)
+            return self.__insert_event_message
         elif event.operation == MatchEventOperation.HEDGE:
             HEDGE_EVENT_MESSAGE.pack_into(self.__hedge_event_message, HEADER_SIZE, event.time,
                                           self.__competitor_ids[event.competitor], event.side, event.instrument,
                                           event.volume, event.price)
-            self._connection_transport.write(self.__hedge_event_message)
+            return self.__hedge_event_message
         elif event.operation == MatchEventOperation.TRADE:
             TRADE_EVENT_MESSAGE.pack_into(self.__trade_event_message, HEADER_SIZE, event.time,
                                           self.__competitor_ids[event.competitor], event.order_id,
                                           event.side, event.instrument, event.volume, event.price, event.fee)
-            self._connection_transport.write(self.__trade_event_message)
-
-    # IExecutionConnection overrides
+            return self.__trade_event_message
+        else:
+            REPLACE_EVENT_MESSAGE.pack_into(self.__replace_event_message, HEADER_SIZE, event.time,
+                                            self.__competitor_ids[event.competitor], event.order_id, event.price,
+                                            event.volume)
+            return self.__replace_event_message
 
-    def close(self):
-        """Close the connection."""
-        # Do nothing since the HUD should not be disconnected.
+    def on_competitor_logged_in(self, name: str) -> None:
+        """Called when a competitor logs in."""
+        identifier = self.__competitor_ids[name] = len(self.__competitor_ids) + 1
+        frame = bytearray(LOGIN_EVENT_MESSAGE_SIZE)
+        HEADER.pack_into(frame, 0, LOGIN_EVENT_MESSAGE_SIZE, MessageType.LOGIN_EVENT)
+        LOGIN_EVENT_MESSAGE.pack_into(frame, HEADER_SIZE, name.encode(), identifier)
+        self.__login_events.append(bytes(frame))
+        for connection in self.connections:
+            connection.write(self.__login_events[-1])
 
-    def send_error(self, client_order_id: int, error_message: bytes) -> None:
-        """Send an error message to the heads-up display."""
-        ERROR_MESSAGE.pack_into(self.__error_message, HEADER_SIZE, client_order_id, error_message)
-        self._connection_transport.write(self.__error_message)
+    def on_match_event(self, event: MatchEvent) -> None:
+        """Called when a match event occurs."""
+        frame: Optional[bytearray] = None
+        for connection in self.connections:
+            if connection.is_subscribed(event):
+                if frame is None:
+                    frame = self.__encode(event)
+                connection.write(frame)
 
-    def send_order_filled(self, client_order_id: int, price: int, volume: int) -> None:
-        """Send an order filled message to the heads-up display."""
-        # Do nothing since the HUD will get a Trade event.
+    def on_timer_tick(self, timer: Timer, now: float, tick_number: int) -> None:
+        """Called on each tick to send the top levels of each order book to the connections that want them."""
+        connections = [c for c in self.connections if c.top_of_book]
+        if not connections:
+            return
 
-    def send_order_status(self, client_order_id: int, fill_volume: int, remaining_volume: int, fees: int) -> None:
-        """Send an order status message to the heads-up display."""
-        # Do nothing since the HUD will get Trade and cancel events.
+        frame = self.__top_of_book_event_message
+        for book in self.__books:
+            mask = 1 << book.instrument
+            if any(c.subscribed_instruments & mask for c in connections):
+                book.top_levels(self.__ask_prices, self.__ask_volumes, self.__bid_prices, self.__bid_volumes)
+                TOP_OF_BOOK_EVENT_HEADER.pack_into(frame, HEADER_SIZE, now, book.instrument,
+                                                   book.last_traded_price() or 0)
+                TOP_OF_BOOK_EVENT_MESSAGE.pack_into(frame, TOP_OF_BOOK_EVENT_HEADER_SIZE, *self.__ask_prices,
+                                                    *self.__ask_volumes, *self.__bid_prices, *self.__bid_volumes)
+                for connection in connections:
+                    if connection.subscribed_instruments & mask:
+                        connection.write(frame)
 
 
 class HeadsUpDisplayServer:
     def __init__(self, host: str, port: int, match_events: MatchEvents, competitor_manager: CompetitorManager,
-                 controller: IController):
+                 controller: IController, books: Iterable[OrderBook], tick_timer: Timer,
+                 high_water_mark: int = DEFAULT_HIGH_WATER_MARK):
         """Initialise a new instance of the HeadsUpDisplayServer class."""
+        self.high_water_mark: int = high_water_mark
         self.host: str = host
         self.port: int = port
 
+        self.__broadcaster: HudBroadcaster = HudBroadcaster(match_events, competitor_manager, books, tick_timer)
         self.__competitor_manager: CompetitorManager = competitor_manager
         self.__controller: IController = controller
         self.__logger: logging.Logger = logging.getLogger("HEADS_UP")
-        self.__match_events: MatchEvents = match_events
         self.__server: Optional[asyncio.AbstractServer] = None
 
     def __on_new_connection(self):
         """Called when a new connection is established."""
-        return HudConnection(self.__match_events, self.__competitor_manager, self.__controller)
+        return HudConnection(self.__broadcaster, self.__competitor_manager, self.__controller, self.high_water_mark)
 
     async def start(self):
         """Start this Heads Up Display server."""
@@ -23,12 +23,14 @@ import string
 import sys
 import time
 
-from typing import Any, Mapping, Tuple
+from typing import Any, List, Mapping, Optional, Tuple
 
 from PySide6 import QtGui, QtWidgets
 from PySide6.QtCore import Qt
 
-from .event_source import EventSource, LiveEventSource, RecordedEventSource
+from ready_trader_go.messages import SUBSCRIBE_ALL
+
+from .event_source import EventSource, LiveEventSource, StreamingEventSource
 from .main_window.main_window import MainWindow
 
 
@@ -101,19 +103,19 @@ def __validate_configuration(filename: pathlib.Path, config: Mapping[str, Any])
 def replay(path: pathlib.Path):
     app = __create_application()
     splash = __show_splash()
-    splash.showMessage("Processing %s..." % str(path), Qt.AlignBottom, QtGui.QColor("#F0F0F0"))
     etf_clamp, tick_size = __read_exchange_config()
-    with path.open("r", newline="") as csv_file:
-        event_source = RecordedEventSource.from_csv(csv_file, etf_clamp, tick_size)
+    event_source = StreamingEventSource(path, etf_clamp, tick_size)
     window = __show_main_window(splash, event_source)
     return app.exec_()
 
 
-def main(host: str, port: int):
+def main(host: str, port: int, teams: Optional[List[str]] = None, operations: int = SUBSCRIBE_ALL,
+         instruments: int = SUBSCRIBE_ALL, top_of_book: bool = False):
     app = __create_application()
     splash = __show_splash()
     etf_clamp, tick_size = __read_exchange_config()
     time.sleep(1)
-    event_source = LiveEventSource(host, port, etf_clamp, tick_size)
+    event_source = LiveEventSource(host, port, etf_clamp, tick_size, teams=teams, operations=operations,
+                                   instruments=instruments, top_of_book=top_of_book)
     window = __show_main_window(splash, event_source)
     return app.exec_()
@@ -18,7 +18,7 @@
 import collections
 import sys
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from PySide6 import QtCore, QtGui, QtWidgets
 from PySide6 import QtCharts
@@ -26,11 +26,20 @@ from PySide6.QtCore import Qt
 
 from ready_trader_go.types import Instrument
 
+from .downsample import SeriesData
+
 CHART_DURATION: float = 60.0
 
 
 class BaseChartGadget(QtWidgets.QWidget):
-    """A generic chart widget."""
+    """A generic chart widget.
+
+    The full-resolution points of each line are kept in a SeriesData object
+    and the line series itself only holds a downsampled copy of the points
+    in the visible range, which is refreshed whenever the range changes, so
+    drawing the chart does not get slower as a match goes on. Dragging across
+    the chart zooms in to the selected range and right-clicking zooms out.
+    """
 
     def __init__(self, parent: Optional[QtWidgets.QWidget] = None, flags: Qt.WindowFlags = Qt.Widget):
         """Initialise a new instance of the class."""
@@ -38,6 +47,7 @@ class BaseChartGadget(QtWidgets.QWidget):
 
         self.chart_view = QtCharts.QChartView()
         self.chart_view.setRenderHint(QtGui.QPainter.Antialiasing)
+        self.chart_view.setRubberBand(QtCharts.QChartView.HorizontalRubberBand)
 
         chart: QtCharts.QChart = self.chart_view.chart()
         chart.legend().setLabelColor(parent.palette().color(parent.foregroundRole()))
@@ -64,8 +74,51 @@ class BaseChartGadget(QtWidgets.QWidget):
 
         self._largest_y_value: float = 0.0
         self._smallest_y_value: float = sys.float_info.max
+        self.__lines: List[Tuple[QtCharts.QXYSeries, SeriesData]] = list()
         self.__x_axis_maximum: float = 0.0
 
+        x_axis.rangeChanged.connect(self.__on_x_axis_range_changed)
+
+    def clear(self, time: float) -> None:
+        """Remove every point from the chart and scroll the x-axis to the given time."""
+        for _, data in self.__lines:
+            data.clear()
+        self.chart.axisX().setRange(time - CHART_DURATION, time)
+        self._largest_y_value = 0.0
+        self._smallest_y_value = sys.float_info.max
+        self.__x_axis_maximum = time
+        self.__refresh_lines()
+
+    def _add_line(self, line_series: QtCharts.QXYSeries) -> SeriesData:
+        """Add a line series to the chart and return the object that holds its full-resolution points."""
+        self.chart.addSeries(line_series)
+        line_series.attachAxis(self.chart.axisX())
+        line_series.attachAxis(self.chart.axisY())
+        data = SeriesData()
+        self.__lines.append((line_series, data))
+        return data
+
+    def _append_point(self, line_series: QtCharts.QXYSeries, data: SeriesData, x: float, y: float) -> None:
+        """Add a point to a line, scrolling the x-axis to it if necessary."""
+        data.append(x, y)
+        if not self._scroll_x_axis(x):
+            self._refresh_line(line_series, data)
+
+    def __on_x_axis_range_changed(self, _: float, __: float) -> None:
+        """Callback when the range of the x-axis changes."""
+        self.__refresh_lines()
+
+    def _refresh_line(self, line_series: QtCharts.QXYSeries, data: SeriesData) -> None:
+        """Replace the points of a line series with those of its full-resolution points that are visible."""
+        x_axis: QtCharts.QValueAxis = self.chart.axisX()
+        points = data.visible_points(x_axis.min(), x_axis.max(), max(int(self.chart.plotArea().width()), 1))
+        line_series.replace([QtCore.QPointF(x, y) for x, y in points])
+
+    def __refresh_lines(self) -> None:
+        """Refresh the points of every line series."""
+        for line_series, data in self.__lines:
+            self._refresh_line(line_series, data)
+
     def _style_axes(self):
         """Apply the common style elements to the chart axes."""
         chart: QtCharts.QChart = self.chart
@@ -74,12 +127,15 @@ class BaseChartGadget(QtWidgets.QWidget):
         chart.axisY().setLabelFormat("%.2f")
         chart.axisY().setLabelsColor(chart.legend().labelColor())
 
-    def _scroll_x_axis(self, time: float) -> None:
-        """Scroll the the x-axis to the given time."""
+    def _scroll_x_axis(self, time: float) -> bool:
+        """Scroll the the x-axis to the given time and return True if it moved."""
         if time > self.__x_axis_maximum:
             scroll_distance: float = time - self.__x_axis_maximum
             self.__x_axis_maximum += scroll_distance
-            self.chart.scroll(scroll_distance * self.chart.plotArea().width() / CHART_DURATION, 0)
+            x_axis: QtCharts.QValueAxis = self.chart.axisX()
+            self.chart.scroll(scroll_distance * self.chart.plotArea().width() / (x_axis.max() - x_axis.min()), 0)
+            return True
+        return False
 
     def _update_y_axis(self, new_value: float) -> None:
         """Ensure the y-axis range is large enough for the given value."""
@@ -102,12 +158,11 @@ class MidpointChartGadget(BaseChartGadget):
 
         self.setWindowTitle("Midpoint Prices")
 
+        self.instrument_data: List[SeriesData] = list()
         self.instrument_series: List[QtCharts.QSplineSeries] = [QtCharts.QSplineSeries() for _ in Instrument]
         for i, line_series in enumerate(self.instrument_series):
             line_series.setName(Instrument(i).name)
-            self.chart.addSeries(line_series)
-            line_series.attachAxis(self.chart.axisX())
-            line_series.attachAxis(self.chart.axisY())
+            self.instrument_data.append(self._add_line(line_series))
             line_series.setColor(self._COLOURS[i])
 
         self.__last_price: Optional[float] = None
@@ -127,10 +182,9 @@ class MidpointChartGadget(BaseChartGadget):
 
     def on_midpoint_price_changed(self, instrument: Instrument, time: float, mid_price: float) -> None:
         """Callback when the midpoint price of an instrument changes."""
-        self._scroll_x_axis(time)
         price = mid_price / 100.0
         self._update_y_axis(price)
-        self.instrument_series[instrument].append(time, price)
+        self._append_point(self.instrument_series[instrument], self.instrument_data[instrument], time, price)
         self.__last_price = price
         if not self.__timer.isActive():
             self.__timer.start(6000)
@@ -146,14 +200,13 @@ class ProfitLossChartGadget(BaseChartGadget):
         super().__init__(parent)
 
         self.setWindowTitle("All Teams Profit or Loss")
+        self.team_data: Dict[str, SeriesData] = dict()
         self.team_series: Dict[str, QtCharts.QSplineSeries] = collections.defaultdict(QtCharts.QSplineSeries)
 
     def on_login_occurred(self, team: str) -> None:
         """Callback when a team logs in to the exchange."""
         line_series: QtCharts.QSplineSeries = self.team_series[team]
-        self.chart.addSeries(line_series)
-        line_series.attachAxis(self.chart.axisX())
-        line_series.attachAxis(self.chart.axisY())
+        self.team_data[team] = self._add_line(line_series)
         line_series.setName(team)
         line_series.setColor(self._COLOURS[(len(self.team_series) - 1) % len(self._COLOURS)])
 
@@ -161,5 +214,4 @@ class ProfitLossChartGadget(BaseChartGadget):
                                account_balance: float, total_fees: float) -> None:
         """Callback when the profit of a team changes."""
         self._update_y_axis(profit)
-        self.team_series[team].append(time, profit)
-        self._scroll_x_axis(time)
+        self._append_point(self.team_series[team], self.team_data[team], time, profit)
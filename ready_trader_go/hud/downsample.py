@@ -0,0 +1,86 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import array
+import bisect
+
+from typing import List, Tuple
+
+
+class SeriesData:
+    """The full-resolution points of a chart series, in order of their x values.
+
+    A chart only draws the points returned by visible_points, which keeps the
+    number of drawn points bounded however long the series grows: wherever
+    there are more points than buckets in the visible range, each bucket is
+    reduced to its lowest and highest points, so the shape of the series is
+    preserved at the resolution of the screen.
+    """
+
+    def __init__(self):
+        """Initialise a new instance of the SeriesData class."""
+        self.xs: array.array = array.array("d")
+        self.ys: array.array = array.array("d")
+
+    def __len__(self) -> int:
+        """Return the number of points in the series."""
+        return len(self.xs)
+
+    def append(self, x: float, y: float) -> None:
+        """Add a point to the series, which must not be to the left of the last point."""
+        self.xs.append(x)
+        self.ys.append(y)
+
+    def clear(self) -> None:
+        """Remove every point from the series."""
+        del self.xs[:]
+        del self.ys[:]
+
+    def visible_points(self, x_min: float, x_max: float, bucket_count: int) -> List[Tuple[float, float]]:
+        """Return at most two points per bucket of the given x range (plus one point either side of it)."""
+        xs = self.xs
+        ys = self.ys
+        start = max(bisect.bisect_left(xs, x_min) - 1, 0)
+        end = min(bisect.bisect_right(xs, x_max) + 1, len(xs))
+        if end - start <= 2 * bucket_count + 2 or x_max <= x_min:
+            return list(zip(xs[start:end], ys[start:end]))
+
+        # The points either side of the range are kept so that the line reaches the edges of the chart
+        points: List[Tuple[float, float]] = list()
+        if xs[start] < x_min:
+            points.append((xs[start], ys[start]))
+            start += 1
+        tail = end - 1 if xs[end - 1] > x_max else end
+
+        bucket_width = (x_max - x_min) / bucket_count
+        first = start
+        for bucket in range(1, bucket_count + 1):
+            last = tail if bucket == bucket_count else bisect.bisect_right(xs, x_min + bucket * bucket_width, first,
+                                                                            tail)
+            if last - first <= 2:
+                points.extend(zip(xs[first:last], ys[first:last]))
+            elif last > first:
+                bucket_ys = ys[first:last]
+                low = first + bucket_ys.index(min(bucket_ys))
+                high = first + bucket_ys.index(max(bucket_ys))
+                for i in ((low, high) if low < high else (high, low) if high < low else (low,)):
+                    points.append((xs[i], ys[i]))
+            first = last
+
+        if tail < end:
+            points.append((xs[tail], ys[tail]))
+        return points
@@ -15,27 +15,28 @@
 #     You should have received a copy of the GNU Affero General Public
 #     License along with Ready Trader Go.  If not, see
 #     <https://www.gnu.org/licenses/>.
-import collections
-import csv
-import itertools
+import pathlib
+import pickle
+import threading
 
-from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Set, TextIO, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
 from PySide6 import QtCore,  QtNetwork
 
 from ready_trader_go.account import AccountFactory, CompetitorAccount
-from ready_trader_go.messages import (AMEND_EVENT_MESSAGE, AMEND_EVENT_MESSAGE_SIZE, CANCEL_EVENT_MESSAGE,
-                                      CANCEL_EVENT_MESSAGE_SIZE, ERROR_MESSAGE, ERROR_MESSAGE_SIZE, HEADER_SIZE,
-                                      HEDGE_EVENT_MESSAGE, HEDGE_EVENT_MESSAGE_SIZE, INSERT_EVENT_MESSAGE,
-                                      INSERT_EVENT_MESSAGE_SIZE, LOGIN_EVENT_MESSAGE, LOGIN_EVENT_MESSAGE_SIZE,
-                                      TRADE_EVENT_MESSAGE, TRADE_EVENT_MESSAGE_SIZE, MessageType)
+from ready_trader_go.messages import (HEADER_SIZE, HUD_EVENT_DISPATCH_TABLE, SUBSCRIBE_ALL, SUBSCRIBE_TOP_OF_BOOK,
+                                      DispatchTable, bind_dispatch_table, dispatch_message, pack_subscribe_message)
 from ready_trader_go.order_book import TOP_LEVEL_COUNT, Order, OrderBook
 from ready_trader_go.types import Instrument, Lifespan, Side
 
+from .replay import ReplayEvent, ReplayIndex, ReplayReader, ReplayState
 
-__all__ = ("EventSource", "LiveEventSource", "RecordedEventSource")
 
+__all__ = ("EventSource", "LiveEventSource", "OrderEventBatcher", "StreamingEventSource")
 
+
+FRAME_INTERVAL_MILLISECONDS = 40
+MINIMUM_REPLAY_INTERVAL_MILLISECONDS = 25
 TICK_INTERVAL_MILLISECONDS = 500
 TICK_INTERVAL_SECONDS = TICK_INTERVAL_MILLISECONDS / 1000.0
 
@@ -63,6 +64,8 @@ class EventSource(QtCore.QObject):
     # team, time, order_id, instrument, side, volume, price, lifespan
     order_inserted = QtCore.Signal(str, float, int, Instrument, Side, int, int, Lifespan)
 
+    order_replaced = QtCore.Signal(str, float, int, int, int)  # team, time, order_id, new price, new volume
+
     # team, time, profit, etf position, account balance, total fees
     profit_loss_changed = QtCore.Signal(str, float, float, int, int, float, float)
 
@@ -87,17 +90,31 @@ class EventSource(QtCore.QObject):
 
 
 class LiveEventSource(EventSource):
-    """An event source that receives events from an exchange simulator."""
+    """An event source that receives events from an exchange simulator.
+
+    If any teams are given, or the operations or instruments bit masks do not
+    include everything, or top_of_book is True, the event source subscribes
+    to just those events when it connects. With top_of_book, the order books
+    are not rebuilt from the market's order events but are taken from the
+    snapshots the exchange simulator sends every tick.
+    """
 
     def __init__(self, host: str, port: int, etf_clamp: float, tick_size: float,
-                 parent: Optional[QtCore.QObject] = None):
+                 parent: Optional[QtCore.QObject] = None, teams: Optional[List[str]] = None,
+                 operations: int = SUBSCRIBE_ALL, instruments: int = SUBSCRIBE_ALL, top_of_book: bool = False):
         """Initialise a new instance of the class."""
         super().__init__(etf_clamp, tick_size, parent)
 
         self.host: str = host
+        self.instruments: int = instruments
+        self.operations: int = operations
         self.port: int = port
+        self.teams: List[str] = list(teams) if teams else list()
+        self.top_of_book: bool = top_of_book
 
         self.__accounts: Dict[int, CompetitorAccount] = dict()
+        self.__handlers: DispatchTable = bind_dispatch_table(HUD_EVENT_DISPATCH_TABLE, self)
+        self.__last_traded_prices: List[Optional[int]] = [None] * len(Instrument)
         self.__now: float = 0.0
         self.__order_books: List[OrderBook] = list(OrderBook(i, 0.0, 0.0) for i in Instrument)
         self.__orders: Dict[int, Dict[int, Order]] = {0: dict()}
@@ -108,6 +125,7 @@ class LiveEventSource(EventSource):
         self.__ask_volumes: List[int] = [0] * TOP_LEVEL_COUNT
         self.__bid_prices: List[int] = [0] * TOP_LEVEL_COUNT
         self.__bid_volumes: List[int] = [0] * TOP_LEVEL_COUNT
+        self.__top_levels: List[Optional[Tuple[List[int], ...]]] = [None] * len(Instrument)
 
         self.__socket = QtNetwork.QTcpSocket(self)
         self.__socket.connected.connect(self.on_connected)
@@ -122,6 +140,9 @@ class LiveEventSource(EventSource):
 
     def on_connected(self) -> None:
         """Callback when a connection to the exchange is established."""
+        if self.teams or self.top_of_book or self.operations != SUBSCRIBE_ALL or self.instruments != SUBSCRIBE_ALL:
+            self.__socket.write(pack_subscribe_message(self.operations, self.instruments,
+                                                       SUBSCRIBE_TOP_OF_BOOK if self.top_of_book else 0, self.teams))
         self._timer.start(TICK_INTERVAL_MILLISECONDS)
 
     def on_disconnected(self) -> None:
@@ -146,23 +167,7 @@ class LiveEventSource(EventSource):
 
     def on_message(self, typ: int, data: bytes, length: int):
         """Process a message."""
-        if typ == MessageType.AMEND_EVENT and length == AMEND_EVENT_MESSAGE_SIZE:
-            self.on_amend_event_message(*AMEND_EVENT_MESSAGE.unpack_from(data))
-        elif typ == MessageType.CANCEL_EVENT and length == CANCEL_EVENT_MESSAGE_SIZE:
-            self.on_cancel_event_message(*CANCEL_EVENT_MESSAGE.unpack_from(data))
-        elif typ == MessageType.INSERT_EVENT and length == INSERT_EVENT_MESSAGE_SIZE:
-            self.on_insert_event_message(*INSERT_EVENT_MESSAGE.unpack_from(data))
-        elif typ == MessageType.LOGIN_EVENT and length == LOGIN_EVENT_MESSAGE_SIZE:
-            name, competitor_id = LOGIN_EVENT_MESSAGE.unpack_from(data)
-            self.on_login_event_message(name.rstrip(b"\0").decode(), competitor_id)
-        elif typ == MessageType.HEDGE_EVENT and length == HEDGE_EVENT_MESSAGE_SIZE:
-            self.on_hedge_event_message(*HEDGE_EVENT_MESSAGE.unpack_from(data))
-        elif typ == MessageType.TRADE_EVENT and length == TRADE_EVENT_MESSAGE_SIZE:
-            self.on_trade_event_message(*TRADE_EVENT_MESSAGE.unpack_from(data))
-        elif typ == MessageType.ERROR and length == ERROR_MESSAGE_SIZE:
-            client_order_id, error_message = ERROR_MESSAGE.unpack_from(data)
-            self.on_error_message(client_order_id, error_message.rstrip(b"\x00"))
-        else:
+        if not dispatch_message(self.__handlers, typ, data, 0, length):
             self.event_source_error_occurred.emit("received invalid message: length=%d type=%d" % (length, typ))
 
     def on_error_message(self, client_order_id: int, error_message: bytes):
@@ -173,7 +178,10 @@ class LiveEventSource(EventSource):
         self.__now = now
         order = self.__orders[competitor_id].get(order_id)
         if order is not None:
-            self.__order_books[order.instrument].amend(now, order, order.volume + volume_delta)
+            if self.top_of_book:
+                order.remaining_volume = max(order.remaining_volume + volume_delta, 0)
+            else:
+                self.__order_books[order.instrument].amend(now, order, order.volume + volume_delta)
             if order.remaining_volume == 0:
                 del self.__orders[competitor_id][order_id]
         if competitor_id != 0:
@@ -183,7 +191,7 @@ class LiveEventSource(EventSource):
         """Callback when an cancel event message is received."""
         self.__now = now
         order = self.__orders[competitor_id].pop(order_id, None)
-        if order is not None:
+        if order is not None and not self.top_of_book:
             self.__order_books[order.instrument].cancel(now, order)
         if competitor_id != 0:
             self.order_cancelled.emit(self.__teams[competitor_id], now, order_id)
@@ -194,11 +202,28 @@ class LiveEventSource(EventSource):
         self.__now = now
         order = Order(order_id, Instrument(instrument), Lifespan(lifespan), Side(side), price, volume)
         self.__orders[competitor_id][order_id] = order
-        self.__order_books[instrument].insert(now, order)
+        if not self.top_of_book:
+            self.__order_books[instrument].insert(now, order)
         if competitor_id != 0:
             self.order_inserted.emit(self.__teams[competitor_id], now, order_id, Instrument(instrument),
                                      Side(side), volume, price, Lifespan(lifespan))
 
+    def on_replace_event_message(self, now: float, competitor_id: int, order_id: int, price: int,
+                                 volume: int) -> None:
+        """Callback when a replace event message is received."""
+        self.__now = now
+        order = self.__orders[competitor_id].get(order_id)
+        if order is not None:
+            if self.top_of_book:
+                order.price = price
+                order.remaining_volume = volume
+            else:
+                self.__order_books[order.instrument].replace(now, order, price, volume)
+            if order.remaining_volume == 0:
+                del self.__orders[competitor_id][order_id]
+        if competitor_id != 0:
+            self.order_replaced.emit(self.__teams[competitor_id], now, order_id, price, volume)
+
     def on_hedge_event_message(self, now: float, competitor_id: int, side: int, instrument: int, volume: int,
                                price: float) -> None:
         """Callback when an hedge event message is received."""
@@ -207,32 +232,47 @@ class LiveEventSource(EventSource):
 
     def on_login_event_message(self, name: str, competitor_id: int) -> None:
         """Callback when an login event message is received."""
-        self.__accounts[competitor_id] = self._account_factory.create()
         self.__teams[competitor_id] = name
         self.__orders[competitor_id] = dict()
-        self.login_occurred.emit(name)
+        if not self.teams or name in self.teams:
+            self.__accounts[competitor_id] = self._account_factory.create()
+            self.login_occurred.emit(name)
 
     def _on_timer_tick(self):
         """Callback when the timer ticks."""
         if self.__now <= 0.0:
             return
 
-        for i in Instrument:
-            midpoint_price: float = self.__order_books[i].midpoint_price()
-            if midpoint_price is not None:
-                self.midpoint_price_changed.emit(i, self.__now, midpoint_price)
-                self.__order_books[i].top_levels(self.__ask_prices, self.__ask_volumes, self.__bid_prices,
-                                                 self.__bid_volumes)
-                self.order_book_changed.emit(i, self.__now, self.__ask_prices, self.__ask_volumes,
-                                             self.__bid_prices, self.__bid_volumes)
-
-        future_price: int = self.__order_books[Instrument.FUTURE].last_traded_price()
-        etf_price: int = self.__order_books[Instrument.ETF].last_traded_price()
-        if future_price is None:
-            future_price = round(self.__order_books[Instrument.FUTURE].midpoint_price())
+        if self.top_of_book:
+            midpoint_prices: List[Optional[float]] = [None] * len(Instrument)
+            for i in Instrument:
+                levels = self.__top_levels[i]
+                if levels is not None and levels[0][0] and levels[2][0]:
+                    midpoint_prices[i] = (levels[0][0] + levels[2][0]) / 2.0
+                    self.midpoint_price_changed.emit(i, self.__now, midpoint_prices[i])
+                    self.order_book_changed.emit(i, self.__now, *levels)
+
+            future_price = self.__last_traded_prices[Instrument.FUTURE]
+            etf_price = self.__last_traded_prices[Instrument.ETF]
+            if future_price is None and midpoint_prices[Instrument.FUTURE] is not None:
+                future_price = round(midpoint_prices[Instrument.FUTURE])
+        else:
+            for i in Instrument:
+                midpoint_price: float = self.__order_books[i].midpoint_price()
+                if midpoint_price is not None:
+                    self.midpoint_price_changed.emit(i, self.__now, midpoint_price)
+                    self.__order_books[i].top_levels(self.__ask_prices, self.__ask_volumes, self.__bid_prices,
+                                                     self.__bid_volumes)
+                    self.order_book_changed.emit(i, self.__now, self.__ask_prices, self.__ask_volumes,
+                                                 self.__bid_prices, self.__bid_volumes)
+
+            future_price: int = self.__order_books[Instrument.FUTURE].last_traded_price()
+            etf_price: int = self.__order_books[Instrument.ETF].last_traded_price()
+            if future_price is None:
+                future_price = round(self.__order_books[Instrument.FUTURE].midpoint_price())
         if future_price is not None and etf_price is not None:
+            self._account_factory.book.update(future_price, etf_price)
             for competitor_id, account in self.__accounts.items():
-                account.update(future_price, etf_price)
                 self.profit_loss_changed.emit(self.__teams[competitor_id], self.__now,
                                               account.profit_or_loss / 100.0, account.etf_position,
                                               account.future_position, account.account_balance / 100.0,
@@ -242,6 +282,15 @@ class LiveEventSource(EventSource):
             self._timer.stop()
             self.match_over.emit()
 
+    def on_top_of_book_event_message(self, now: float, instrument: int, last_traded_price: int,
+                                     ask_prices: Tuple[int, ...], ask_volumes: Tuple[int, ...],
+                                     bid_prices: Tuple[int, ...], bid_volumes: Tuple[int, ...]) -> None:
+        """Callback when a top-of-book event message is received."""
+        self.__now = now
+        self.__top_levels[instrument] = (list(ask_prices), list(ask_volumes), list(bid_prices), list(bid_volumes))
+        if last_traded_price:
+            self.__last_traded_prices[instrument] = last_traded_price
+
     def on_trade_event_message(self, now: float, competitor_id: int, order_id: int, side: int, instrument: int,
                                volume: int, price: int, fee: int) -> None:
         """Callback when an trade event message is received."""
@@ -250,6 +299,8 @@ class LiveEventSource(EventSource):
         self.trade_occurred.emit(self.__teams[competitor_id], now, order_id, Side(side), volume, price, fee)
 
         order = self.__orders[competitor_id].get(order_id)
+        if order and self.top_of_book:
+            order.remaining_volume -= volume
         if order and order.remaining_volume == 0:
             del self.__orders[competitor_id][order_id]
 
@@ -258,145 +309,225 @@ class LiveEventSource(EventSource):
         self.__socket.connectToHost(self.host, self.port)
 
 
-class Event(NamedTuple):
-    """A recorded event."""
-    when: float
-    emitter: Callable
-    args: Tuple
+class StreamingEventSource(EventSource):
+    """A source of events read from a recording of a match as it is replayed.
+
+    Rather than decoding the whole recording before the replay starts, the
+    events for each tick are read and decoded when the replay reaches it, so
+    the replay starts straight away and only the current state of the match
+    is held in memory. While the replay runs, a background thread indexes
+    the recording (saving the index next to it) and takes checkpoints of
+    the state of the match, so that a seek only needs to restore the nearest
+    checkpoint and replay the events that follow it.
+    """
 
+    # Signals
 
-class RecordedEventSource(EventSource):
-    """A source of events taken from a recording of a match."""
+    replay_progressed = QtCore.Signal(float, float)  # time, time up to which the replay may seek
 
-    def __init__(self, etf_clamp: float, tick_size: float, parent: Optional[QtCore.QObject] = None):
+    replay_restarted = QtCore.Signal(float)  # time
+
+    def __init__(self, path: pathlib.Path, etf_clamp: float, tick_size: float,
+                 parent: Optional[QtCore.QObject] = None):
         """Initialise a new instance of the class."""
         super().__init__(etf_clamp, tick_size, parent)
 
+        self.path: pathlib.Path = path
+        self.speed: float = 1.0
+
+        self.__index: ReplayIndex = (ReplayIndex.load(path, TICK_INTERVAL_SECONDS)
+                                     or ReplayIndex(TICK_INTERVAL_SECONDS))
+        self.__indexer: Optional[threading.Thread] = None
+        self.__match_over: bool = False
+        self.__playing: bool = False
+        self.__reader: Optional[ReplayReader] = None
+        self.__signals: Dict[str, QtCore.SignalInstance] = {
+            name: getattr(self, name) for name in ("login_occurred", "midpoint_price_changed", "order_amended",
+                                                   "order_book_changed", "order_cancelled", "order_inserted",
+                                                   "order_replaced", "profit_loss_changed", "trade_occurred")}
+        self.__state: ReplayState = ReplayState(self._account_factory)
         self.__teams: Set[str] = set()
-        self.__end_time: float = 0.0
-        self.__events: List[Event] = list()
-        self.__event_iter: Optional[Iterator] = None
-        self.__next_event: Optional[Event] = None
-        self.__now: float = 0.0
-        self.__order_books: Tuple[List[int], ...] = tuple(list() for _ in Instrument)
+        self.__tick: int = 0
+        self.__ticks_per_step: int = 1
+
+    @property
+    def playing(self) -> bool:
+        """Return True if the replay is running."""
+        return self.__playing
+
+    @property
+    def seekable_time(self) -> float:
+        """Return the time up to which the replay may seek."""
+        return max(len(self.__index.offsets) - 1, 0) * TICK_INTERVAL_SECONDS
+
+    def __emit(self, events: List[ReplayEvent]) -> None:
+        """Emit the given events, ignoring logins by teams that have already logged in."""
+        signals = self.__signals
+        for name, args in events:
+            if name == "login_occurred":
+                if args[0] in self.__teams:
+                    continue
+                self.__teams.add(args[0])
+            signals[name].emit(*args)
 
     def _on_timer_tick(self):
         """Callback when the timer ticks."""
-        now = self.__now = self.__now + TICK_INTERVAL_SECONDS
-
-        if self.__next_event.when <= now:
-            self.__next_event.emitter(*self.__next_event.args)
-            event: Optional[Event] = None
-            for event in self.__event_iter:
-                if event.when > now:
-                    break
-                event.emitter(*event.args)
-            self.__next_event = event
-
-        tick = int(now // TICK_INTERVAL_SECONDS)
-        for i in Instrument:
-            if len(self.__order_books[i]) >= (tick + 1) * 4 * TOP_LEVEL_COUNT:
-                data = (self.__order_books[i][j * TOP_LEVEL_COUNT:(j + 1) * TOP_LEVEL_COUNT]
-                        for j in range(tick * 4, (tick + 1) * 4))
-                self.order_book_changed.emit(i, now, *data)
-
-        if self.__now >= self.__end_time:
-            self._timer.stop()
-            self.match_over.emit()
+        offsets = self.__index.offsets
+        events: List[ReplayEvent] = list()
+        for _ in range(self.__ticks_per_step):
+            self.__tick += 1
+            now = self.__tick * TICK_INTERVAL_SECONDS
+            for row in self.__reader.read_until(now, offsets[self.__tick] if self.__tick < len(offsets) else None):
+                self.__state.apply(row, events)
+            if self.__reader.at_end:
+                break
+        self.__state.snapshot(now, events)
+        self.__emit(events)
+        self.replay_progressed.emit(now, self.seekable_time)
+
+        if self.__reader.at_end:
+            self.pause()
+            if not self.__match_over:
+                self.__match_over = True
+                self.match_over.emit()
+
+    def pause(self) -> None:
+        """Pause the replay."""
+        self.__playing = False
+        self._timer.stop()
+
+    def resume(self) -> None:
+        """Resume the replay, unless every event has been replayed."""
+        if self.__reader is not None and not self.__reader.at_end:
+            self.__playing = True
+            self._timer.start(round(self.__ticks_per_step * TICK_INTERVAL_MILLISECONDS / self.speed))
+
+    def seek(self, when: float) -> None:
+        """Continue the replay from the given time (or the latest time up to which the replay may seek)."""
+        offsets = self.__index.offsets
+        tick = min(max(round(when / TICK_INTERVAL_SECONDS), 0), len(offsets) - 1)
+        if self.__reader is None or tick < 0:
+            return
 
-    @staticmethod
-    def from_csv(file_object: TextIO, etf_clamp: float, tick_size: float,
-                 parent: Optional[QtCore.QObject] = None):
-        """Create a new RecordedEventSource instance from a CSV file."""
-        source = RecordedEventSource(etf_clamp, tick_size, parent)
-        events = source.__events
+        # Restore the latest checkpoint unless the replay is already closer to the given time
+        checkpoint = self.__index.checkpoint_before(tick)
+        if tick < self.__tick or (checkpoint is not None and checkpoint.tick > self.__tick):
+            self.__reader.close()
+            if checkpoint is not None:
+                self.__reader = ReplayReader(self.path, checkpoint.offset)
+                self.__state = pickle.loads(checkpoint.state)
+                self.__tick = checkpoint.tick
+            else:
+                self.__reader = ReplayReader(self.path)
+                self.__state = ReplayState(self._account_factory)
+                self.__tick = 0
+
+        discarded: List[ReplayEvent] = list()
+        while self.__tick < tick:
+            self.__tick += 1
+            for row in self.__reader.read_until(self.__tick * TICK_INTERVAL_SECONDS, offsets[self.__tick]):
+                self.__state.apply(row, discarded)
+            discarded.clear()
+
+        # Describe the restored state as if the open orders had just been inserted
+        now = self.__tick * TICK_INTERVAL_SECONDS
+        self.replay_restarted.emit(now)
+        events: List[ReplayEvent] = [("login_occurred", (team,)) for team in sorted(self.__state.teams)]
+        for team, open_orders in self.__state.open_orders.items():
+            if team:
+                events.extend(("order_inserted", (team, now, order.client_order_id, order.instrument, order.side,
+                                                  order.remaining_volume, order.price, order.lifespan))
+                              for order in open_orders.orders.values())
+        self.__state.snapshot(now, events)
+        self.__emit(events)
+        self.replay_progressed.emit(now, self.seekable_time)
+
+    def set_speed(self, speed: float) -> None:
+        """Set the speed of the replay as a multiple of the speed of the match."""
+        self.speed = speed
+        # Replay several ticks per timer event rather than running the timer too often for the HUD to keep up
+        ticks_per_step = int(speed * MINIMUM_REPLAY_INTERVAL_MILLISECONDS) // TICK_INTERVAL_MILLISECONDS
+        self.__ticks_per_step = max(ticks_per_step, 1)
+        if self.__playing:
+            self.resume()
 
-        reader = csv.reader(file_object)
-        next(reader)  # Skip header
+    def start(self) -> None:
+        """Start this streaming event source."""
+        self.__indexer = threading.Thread(target=self.__index.build,
+                                          args=(self.path, ReplayState(self._account_factory)), daemon=True,
+                                          name="indexer")
+        self.__indexer.start()
+        self.__reader = ReplayReader(self.path)
+        self.resume()
 
-        accounts: Dict[str, CompetitorAccount] = collections.defaultdict(source._account_factory.create)
-        books: Tuple[OrderBook, ...] = tuple(OrderBook(i, 0.0, 0.0) for i in Instrument)
-        orders: Dict[str, Dict[int, Order]] = collections.defaultdict(dict)
 
-        ask_prices = [0] * TOP_LEVEL_COUNT
-        ask_volumes = [0] * TOP_LEVEL_COUNT
-        bid_prices = [0] * TOP_LEVEL_COUNT
-        bid_volumes = [0] * TOP_LEVEL_COUNT
+class OrderEventBatcher(QtCore.QObject):
+    """Collect the order and trade events of an event source and deliver them a frame at a time.
 
-        def take_snapshot(when: float):
-            for i in Instrument:
-                events.append(Event(when, source.midpoint_price_changed.emit, (i, when, books[i].midpoint_price())))
-                books[i].top_levels(ask_prices, ask_volumes, bid_prices, bid_volumes)
-                source.__order_books[i].extend(itertools.chain(ask_prices, ask_volumes, bid_prices, bid_volumes))
-
-            future_price: int = books[Instrument.FUTURE].last_traded_price()
-            etf_price: int = books[Instrument.ETF].last_traded_price()
-            if future_price is not None and etf_price is not None:
-                for team, account in accounts.items():
-                    account.update(future_price, etf_price)
-                    events.append(Event(when, source.profit_loss_changed.emit,
-                                        (team, when, account.profit_or_loss / 100.0, account.etf_position,
-                                         account.future_position, account.account_balance / 100.0,
-                                         account.total_fees / 100.0)))
-
-        now: float = TICK_INTERVAL_SECONDS
-        for row in reader:
-            tm = float(row[0])
-
-            if tm > now:
-                take_snapshot(now)
-                now += TICK_INTERVAL_SECONDS
-
-            team: str = row[1]
-            order_id: int = int(row[3])
-            operation: str = row[2]
-
-            if team and team not in source.__teams:
-                source.__teams.add(team)
-
-            if operation == "Insert":
-                order = Order(order_id, Instrument(int(row[4])), Lifespan[row[8]], Side[row[5]],
-                              int(row[7]), int(row[6]))
-                books[order.instrument].insert(tm, order)
-                orders[team][order_id] = order
-                events.append(Event(tm, source.order_inserted.emit, (team, tm, order_id, order.instrument,
-                                                                     order.side, order.volume, order.price,
-                                                                     order.lifespan)))
-            elif operation == "Amend":
-                order = orders[team][order_id]
-                volume_delta = int(row[6])
-                books[order.instrument].amend(tm, order, order.volume + volume_delta)
-                if order.remaining_volume == 0:
-                    del orders[team][order_id]
-                events.append(Event(tm, source.order_amended.emit, (team, tm, order_id, volume_delta)))
-            elif operation == "Cancel":
-                order = orders[team].pop(order_id, None)
-                if order:
-                    books[order.instrument].cancel(tm, order)
-                events.append(Event(tm, source.order_cancelled.emit, (team, tm, order_id)))
-            else:  # operation is "Hedge" or "Trade"
-                instrument = Instrument(int(row[4]))
-                side = Side[row[5]]
-                volume = int(row[6])
-                price = float(row[7]) if operation == "Hedge" else int(row[7])
-                fee = int(row[9]) if row[9] else 0
-                accounts[team].transact(instrument, side, price, volume, fee)
-                if operation == "Trade":
-                    if order_id in orders[team] and orders[team][order_id].remaining_volume == 0:
-                        del orders[team][order_id]
-                    events.append(Event(tm, source.trade_occurred.emit, (team, tm, order_id, side, volume, price,
-                                                                         fee)))
-
-        take_snapshot(now)
-        source.__end_time = now
-
-        return source
+    Rather than every team's tables handling every event as it arrives, the
+    events of each team are collected until the next frame and then
+    delivered together, so each table is updated at most once per frame
+    however quickly the teams are trading.
+    """
 
-    def start(self) -> None:
-        """Start this recorded event source."""
-        self.__now = 0.0
-        self._timer.start(TICK_INTERVAL_MILLISECONDS)
-        self.__event_iter = iter(self.__events)
-        self.__next_event = next(self.__event_iter, None)
-        for competitor in sorted(self.__teams):
-            self.login_occurred.emit(competitor)
+    # Signals
+
+    order_events_occurred = QtCore.Signal(str, list)  # team, list of (event source signal name, arguments)
+
+    def __init__(self, event_source: EventSource, parent: Optional[QtCore.QObject] = None):
+        """Initialise a new instance of the class."""
+        super().__init__(parent)
+
+        self.__events: Dict[str, List[ReplayEvent]] = dict()
+        self.__timer = QtCore.QTimer(self)
+        self.__timer.setSingleShot(True)
+        self.__timer.timeout.connect(self.flush)
+
+        event_source.order_amended.connect(self.on_order_amended)
+        event_source.order_cancelled.connect(self.on_order_cancelled)
+        event_source.order_inserted.connect(self.on_order_inserted)
+        event_source.order_replaced.connect(self.on_order_replaced)
+        event_source.trade_occurred.connect(self.on_trade_occurred)
+
+    def __add(self, team: str, name: str, args: Tuple) -> None:
+        """Add an event to be delivered at the next frame."""
+        events = self.__events.get(team)
+        if events is None:
+            events = self.__events[team] = list()
+        events.append((name, args))
+        if not self.__timer.isActive():
+            self.__timer.start(FRAME_INTERVAL_MILLISECONDS)
+
+    def discard(self) -> None:
+        """Discard the events that have not yet been delivered."""
+        self.__events.clear()
+        self.__timer.stop()
+
+    def flush(self) -> None:
+        """Deliver the events collected since the last frame."""
+        events = self.__events
+        self.__events = dict()
+        for team, team_events in events.items():
+            self.order_events_occurred.emit(team, team_events)
+
+    def on_order_amended(self, team: str, now: float, order_id: int, volume_delta: int) -> None:
+        """Callback when an order is amended."""
+        self.__add(team, "order_amended", (team, now, order_id, volume_delta))
+
+    def on_order_cancelled(self, team: str, now: float, order_id: int) -> None:
+        """Callback when an order is cancelled."""
+        self.__add(team, "order_cancelled", (team, now, order_id))
+
+    def on_order_inserted(self, team: str, now: float, order_id: int, instrument: Instrument, side: Side,
+                          volume: int, price: int, lifespan: Lifespan) -> None:
+        """Callback when an order is inserted."""
+        self.__add(team, "order_inserted", (team, now, order_id, instrument, side, volume, price, lifespan))
+
+    def on_order_replaced(self, team: str, now: float, order_id: int, price: int, volume: int) -> None:
+        """Callback when an order is replaced."""
+        self.__add(team, "order_replaced", (team, now, order_id, price, volume))
+
+    def on_trade_occurred(self, team: str, now: float, order_id: int, side: Side, volume: int, price: int,
+                          fee: int) -> None:
+        """Callback when a trade occurs."""
+        self.__add(team, "trade_occurred", (team, now, order_id, side, volume, price, fee))
@@ -15,9 +15,10 @@
 #     You should have received a copy of the GNU Affero General Public
 #     License along with Ready Trader Go.  If not, see
 #     <https://www.gnu.org/licenses/>.
-from typing import Callable, Dict, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 
 from PySide6 import QtCore, QtGui, QtWidgets
+from PySide6.QtCore import Qt
 
 from ready_trader_go.types import Instrument
 
@@ -25,12 +26,13 @@ from ready_trader_go.hud.table_gadget import BasicPriceLadderGadget, PerTeamTabl
 from ready_trader_go.hud.table_model import (ActiveOrderTableModel, BasicPriceLadderModel,
                                              ProfitLossTableModel, TradeHistoryTableModel, PriceLadderModel,
                                              TeamLadderVolumes)
-from ready_trader_go.hud.event_source import EventSource
+from ready_trader_go.hud.event_source import EventSource, OrderEventBatcher, StreamingEventSource
 from ready_trader_go.hud.chart import MidpointChartGadget, ProfitLossChartGadget
 
 from .ui_main_window import Ui_main_window
 
 
+REPLAY_SPEEDS = (1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0)
 TICK_SIZE: int = 100
 
 
@@ -69,6 +71,8 @@ class MainWindow(Ui_main_window, QtWidgets.QMainWindow):
         event_source.event_source_error_occurred.connect(self.__on_event_source_error_occurred)
         event_source.login_occurred.connect(self.__on_login_occurred)
         event_source.match_over.connect(self.__on_match_over)
+        self.__order_event_batcher = OrderEventBatcher(event_source, self)
+        self.__order_event_batcher.order_events_occurred.connect(self.__on_order_events)
 
         self.__icon: QtGui.QIcon = icon
         self.__team_active_orders: Dict[str, ActiveOrderTableModel] = dict()
@@ -77,6 +81,8 @@ class MainWindow(Ui_main_window, QtWidgets.QMainWindow):
         self.__selected_team: str = ""
 
         self.__setup_models()
+        if isinstance(event_source, StreamingEventSource):
+            self.__setup_replay_controls(event_source)
 
     def __on_event_source_error_occurred(self, error_message: str) -> None:
         """Callback when an error occurs with the event source."""
@@ -89,23 +95,9 @@ class MainWindow(Ui_main_window, QtWidgets.QMainWindow):
 
     def __on_login_occurred(self, competitor: str) -> None:
         """Callback when a login occurs."""
-        aov_model = ActiveOrderTableModel(competitor)
-        self.event_source.order_amended.connect(aov_model.on_order_amended)
-        self.event_source.order_cancelled.connect(aov_model.on_order_cancelled)
-        self.event_source.order_inserted.connect(aov_model.on_order_inserted)
-        self.event_source.trade_occurred.connect(aov_model.on_trade_occurred)
-        self.__team_active_orders[competitor] = aov_model
-
-        competitor_volumes = TeamLadderVolumes(competitor)
-        self.event_source.order_amended.connect(competitor_volumes.on_order_amended)
-        self.event_source.order_cancelled.connect(competitor_volumes.on_order_cancelled)
-        self.event_source.order_inserted.connect(competitor_volumes.on_order_inserted)
-        self.event_source.trade_occurred.connect(competitor_volumes.on_trade_occurred)
-        self.__team_volumes[competitor] = competitor_volumes
-
-        tv_model = TradeHistoryTableModel(competitor)
-        self.event_source.trade_occurred.connect(tv_model.on_trade_occurred)
-        self.__team_trades[competitor] = tv_model
+        self.__team_active_orders[competitor] = ActiveOrderTableModel(competitor)
+        self.__team_volumes[competitor] = TeamLadderVolumes(competitor)
+        self.__team_trades[competitor] = TradeHistoryTableModel(competitor)
 
     def __on_match_over(self) -> None:
         """Callback when the Ready Trader Go match is over."""
@@ -116,6 +108,49 @@ class MainWindow(Ui_main_window, QtWidgets.QMainWindow):
         message_dialog.setText("Simulation Complete")
         message_dialog.show()
 
+    def __on_order_events(self, team: str, events: List[Tuple[str, Tuple]]) -> None:
+        """Callback when the order events of a team since the last frame are delivered."""
+        if team in self.__team_active_orders:
+            self.__team_active_orders[team].on_order_events(team, events)
+            self.__team_volumes[team].on_order_events(team, events)
+            self.__team_trades[team].on_order_events(team, events)
+
+    def __on_play_button_clicked(self) -> None:
+        """Callback when the play or pause button is clicked."""
+        if self.event_source.playing:
+            self.event_source.pause()
+        else:
+            self.event_source.resume()
+        self.__play_button.setText("Pause" if self.event_source.playing else "Play")
+
+    def __on_replay_progressed(self, now: float, seekable_time: float) -> None:
+        """Callback when a replay moves forward."""
+        self.__play_button.setText("Pause" if self.event_source.playing else "Play")
+        if not self.__replay_slider.isSliderDown():
+            self.__replay_slider.blockSignals(True)
+            self.__replay_slider.setMaximum(int(seekable_time))
+            self.__replay_slider.setValue(int(now))
+            self.__replay_slider.blockSignals(False)
+        self.__replay_time_label.setText("%d:%02d / %d:%02d" % (*divmod(int(now), 60), *divmod(int(seekable_time), 60)))
+
+    def __on_replay_restarted(self, now: float) -> None:
+        """Callback when a replay continues from a different time."""
+        self.__order_event_batcher.discard()
+        for aov_model in self.__team_active_orders.values():
+            aov_model.clear()
+        for tv_model in self.__team_trades.values():
+            tv_model.clear()
+        for competitor_volumes in self.__team_volumes.values():
+            competitor_volumes.clear()
+        if self.__mcg:
+            self.__mcg.clear(now)
+        if self.__pnl_chart:
+            self.__pnl_chart.clear(now)
+
+    def __on_replay_speed_changed(self, index: int) -> None:
+        """Callback when a different replay speed is selected."""
+        self.event_source.set_speed(REPLAY_SPEEDS[index])
+
     def __on_selected_competitor_changed(self, team: str) -> None:
         """Callback when the selected competitor changes."""
         if team and team != self.__selected_team:
@@ -260,6 +295,36 @@ class MainWindow(Ui_main_window, QtWidgets.QMainWindow):
         self.profit_loss_chart_action.setStatusTip("Reopen the profit or loss chart")
         self.profit_loss_chart_action.triggered.connect(self.__show_profit_loss_chart)
 
+    def __setup_replay_controls(self, event_source: StreamingEventSource) -> None:
+        """Setup the toolbar used to pause, seek and change the speed of a replay."""
+        event_source.replay_progressed.connect(self.__on_replay_progressed)
+        event_source.replay_restarted.connect(self.__on_replay_restarted)
+
+        toolbar: QtWidgets.QToolBar = self.addToolBar("Replay")
+        toolbar.setMovable(False)
+
+        self.__play_button = QtWidgets.QToolButton(toolbar)
+        self.__play_button.setText("Pause")
+        self.__play_button.setToolTip("Pause or resume the replay")
+        self.__play_button.clicked.connect(self.__on_play_button_clicked)
+        toolbar.addWidget(self.__play_button)
+
+        # Seek whenever the slider moves so that dragging it scrubs through the match
+        self.__replay_slider = QtWidgets.QSlider(Qt.Horizontal, toolbar)
+        self.__replay_slider.setRange(0, 0)
+        self.__replay_slider.setToolTip("Match time (the replay can seek as far as the recording has been indexed)")
+        self.__replay_slider.valueChanged.connect(event_source.seek)
+        toolbar.addWidget(self.__replay_slider)
+
+        self.__replay_time_label = QtWidgets.QLabel("0:00 / 0:00", toolbar)
+        toolbar.addWidget(self.__replay_time_label)
+
+        speed_combo_box = QtWidgets.QComboBox(toolbar)
+        speed_combo_box.addItems(["%gx" % speed for speed in REPLAY_SPEEDS])
+        speed_combo_box.setToolTip("Replay speed")
+        speed_combo_box.currentIndexChanged.connect(self.__on_replay_speed_changed)
+        toolbar.addWidget(speed_combo_box)
+
     def __setup_models(self) -> None:
         """Setup the data models."""
         self.__etf_model = PriceLadderModel(Instrument.ETF, TICK_SIZE)
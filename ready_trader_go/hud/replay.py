@@ -0,0 +1,294 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import bisect
+import csv
+import json
+import os
+import pathlib
+import pickle
+
+from typing import Any, BinaryIO, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from ready_trader_go.account import AccountBook, AccountFactory, CompetitorAccount
+from ready_trader_go.analysis import OpenOrders
+from ready_trader_go.order_book import TOP_LEVEL_COUNT, Order, OrderBook
+from ready_trader_go.types import Instrument, Lifespan, Side
+
+
+DEFAULT_CHECKPOINT_INTERVAL = 60.0  # Seconds of match time between replay checkpoints
+INDEX_FILE_SUFFIX = ".index"
+INDEX_VERSION = 1
+
+# A replay event is the name of an event source signal and its arguments
+ReplayEvent = Tuple[str, Tuple[Any, ...]]
+
+
+class ReplayCheckpoint(NamedTuple):
+    """The pickled state of a replay at the end of a tick and the offset of the following events."""
+    tick: int
+    offset: int
+    state: bytes
+
+
+class ReplayIndex:
+    """The location in a match events file of the events for each tick of a replay.
+
+    The offsets list holds, for each tick k, the byte offset of the first
+    event that happened after k tick intervals, so the events for tick k
+    lie between offsets[k - 1] and offsets[k]. The offsets are found with a
+    single pass over the file and cached in a file next to it. The same pass
+    can also take periodic checkpoints of the replay state, from which a
+    replay can resume at any point without starting from the beginning.
+    """
+
+    def __init__(self, tick_interval: float):
+        """Initialise a new instance of the ReplayIndex class."""
+        self.checkpoints: List[ReplayCheckpoint] = list()
+        self.complete: bool = False
+        self.end_time: float = 0.0
+        self.offsets: List[int] = list()
+        self.tick_interval: float = tick_interval
+
+    def build(self, path: pathlib.Path, state: Optional["ReplayState"] = None,
+              checkpoint_interval: float = DEFAULT_CHECKPOINT_INTERVAL) -> None:
+        """Index the given match events file and save the index next to it.
+
+        If a replay state is given, every event is applied to it and a
+        checkpoint of it is taken every checkpoint_interval seconds. If the
+        offsets were loaded from the cache, only the checkpoints are taken.
+        """
+        stat = os.stat(path)
+        indexed = self.complete
+        tick_interval = self.tick_interval
+        checkpoint_ticks = max(round(checkpoint_interval / tick_interval), 1)
+        checkpoints = self.checkpoints
+        offsets = self.offsets
+        events: List[ReplayEvent] = list()
+        tick = 0
+        with path.open("rb") as match_events:
+            offset = len(match_events.readline())  # Skip header
+            for line in match_events:
+                comma = line.find(b",")
+                if comma > 0:
+                    when = float(line[:comma])
+                    while when > tick * tick_interval:
+                        if not indexed:
+                            offsets.append(offset)
+                        if state is not None and tick and tick % checkpoint_ticks == 0:
+                            checkpoints.append(ReplayCheckpoint(tick, offset,
+                                                                pickle.dumps(state, pickle.HIGHEST_PROTOCOL)))
+                        tick += 1
+                    if state is not None:
+                        state.apply(next(csv.reader((line.decode(),))), events)
+                        events.clear()
+                offset += len(line)
+
+        if indexed:
+            return
+
+        offsets.append(offset)
+        self.end_time = (len(offsets) - 1) * tick_interval
+        self.complete = True
+
+        try:
+            with self.cache_path(path).open("w") as index_file:
+                json.dump({"version": INDEX_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                           "tick_interval": tick_interval, "end_time": self.end_time, "offsets": offsets},
+                          index_file, separators=(",", ":"))
+        except OSError:
+            # The index is only a cache, so it does not matter if it cannot be saved
+            pass
+
+    def checkpoint_before(self, tick: int) -> Optional[ReplayCheckpoint]:
+        """Return the latest checkpoint taken at or before the given tick, or None if there is none."""
+        i = bisect.bisect_right(self.checkpoints, tick, key=lambda c: c.tick)
+        return self.checkpoints[i - 1] if i else None
+
+    @staticmethod
+    def cache_path(path: pathlib.Path) -> pathlib.Path:
+        """Return the path of the cached index for the given match events file."""
+        return path.with_name(path.name + INDEX_FILE_SUFFIX)
+
+    @staticmethod
+    def load(path: pathlib.Path, tick_interval: float) -> Optional["ReplayIndex"]:
+        """Return the cached index of the given match events file, or None if it is missing or out of date."""
+        try:
+            stat = os.stat(path)
+            with ReplayIndex.cache_path(path).open("r") as index_file:
+                cached = json.load(index_file)
+        except (OSError, ValueError):
+            return None
+
+        if (type(cached) is not dict or cached.get("version") != INDEX_VERSION
+                or cached.get("size") != stat.st_size or cached.get("mtime_ns") != stat.st_mtime_ns
+                or cached.get("tick_interval") != tick_interval):
+            return None
+
+        index = ReplayIndex(tick_interval)
+        index.end_time = cached["end_time"]
+        index.offsets = cached["offsets"]
+        index.complete = True
+        return index
+
+
+class ReplayReader:
+    """Read the events in a match events file a tick at a time.
+
+    When the end of a tick is known from the index, all of the events for the
+    tick are read and decoded as one block, otherwise events are read a line
+    at a time until one is found that belongs to a later tick.
+    """
+
+    def __init__(self, path: pathlib.Path, offset: Optional[int] = None):
+        """Initialise a new instance of the ReplayReader class."""
+        self.__file: BinaryIO = path.open("rb")
+        self.__pending: Optional[List[str]] = None
+        if offset is None:
+            offset = len(self.__file.readline())  # Skip header
+        else:
+            self.__file.seek(offset)
+        self.__position: int = offset
+        self.__size: int = os.fstat(self.__file.fileno()).st_size
+
+    @property
+    def at_end(self) -> bool:
+        """Return True if every event in the file has been read."""
+        return self.__pending is None and self.__position >= self.__size
+
+    def close(self) -> None:
+        """Close the match events file."""
+        self.__file.close()
+
+    def read_until(self, now: float, end_offset: Optional[int] = None) -> List[List[str]]:
+        """Return the events that happened up to and including the given time.
+
+        If end_offset is given, it must be the offset of the first event that
+        happened after the given time.
+        """
+        rows: List[List[str]] = list()
+        if self.__pending is not None:
+            if float(self.__pending[0]) > now:
+                return rows
+            rows.append(self.__pending)
+            self.__pending = None
+
+        if end_offset is not None:
+            if end_offset > self.__position:
+                block = self.__file.read(end_offset - self.__position)
+                self.__position = end_offset
+                rows.extend(row for row in csv.reader(block.decode().splitlines()) if row)
+            return rows
+
+        for line in self.__file:
+            self.__position += len(line)
+            row = next(csv.reader((line.decode(),)), None)
+            if not row:
+                continue
+            if float(row[0]) > now:
+                self.__pending = row
+                break
+            rows.append(row)
+        return rows
+
+
+class ReplayState:
+    """The order books, orders and accounts of a match that is being replayed.
+
+    Orders are dropped as soon as they leave the order books, including
+    orders filled by another team's order, so the state does not grow with
+    the length of the match.
+    """
+
+    def __init__(self, account_factory: AccountFactory):
+        """Initialise a new instance of the ReplayState class."""
+        self.account_book: AccountBook = account_factory.create_book()
+        self.accounts: Dict[str, CompetitorAccount] = dict()
+        self.books: Tuple[OrderBook, ...] = tuple(OrderBook(i, 0.0, 0.0) for i in Instrument)
+        self.open_orders: Dict[str, OpenOrders] = {"": OpenOrders()}
+        self.teams: Set[str] = set()
+
+    def apply(self, row: List[str], events: List[ReplayEvent]) -> None:
+        """Apply a row of the match events file and append the resulting events to the given list."""
+        tm = float(row[0])
+        team: str = row[1]
+        operation: str = row[2]
+        order_id: int = int(row[3])
+
+        open_orders = self.open_orders.get(team)
+        if open_orders is None:
+            self.accounts[team] = self.account_book.create()
+            open_orders = self.open_orders[team] = OpenOrders()
+            self.teams.add(team)
+            events.append(("login_occurred", (team,)))
+        orders = open_orders.orders
+
+        if operation == "Insert":
+            order = Order(order_id, Instrument(int(row[4])), Lifespan[row[8]], Side[row[5]], int(row[7]),
+                          int(row[6]), open_orders)
+            orders[order_id] = order
+            self.books[order.instrument].insert(tm, order)
+            events.append(("order_inserted", (team, tm, order_id, order.instrument, order.side, order.volume,
+                                              order.price, order.lifespan)))
+        elif operation == "Amend":
+            volume_delta = int(row[6])
+            order = orders.get(order_id)
+            if order is not None:
+                self.books[order.instrument].amend(tm, order, order.volume + volume_delta)
+            events.append(("order_amended", (team, tm, order_id, volume_delta)))
+        elif operation == "Cancel":
+            order = orders.get(order_id)
+            if order is not None:
+                self.books[order.instrument].cancel(tm, order)
+            events.append(("order_cancelled", (team, tm, order_id)))
+        elif operation == "Replace":
+            volume = int(row[6])
+            price = int(row[7])
+            order = orders.get(order_id)
+            if order is not None:
+                self.books[order.instrument].replace(tm, order, price, volume)
+            events.append(("order_replaced", (team, tm, order_id, price, volume)))
+        elif team:  # operation is "Hedge" or "Trade"
+            instrument = Instrument(int(row[4]))
+            side = Side[row[5]]
+            volume = int(row[6])
+            price = float(row[7]) if operation == "Hedge" else int(row[7])
+            fee = int(row[9]) if row[9] else 0
+            self.accounts[team].transact(instrument, side, price, volume, fee)
+            if operation == "Trade":
+                events.append(("trade_occurred", (team, tm, order_id, side, volume, price, fee)))
+
+    def snapshot(self, now: float, events: List[ReplayEvent]) -> None:
+        """Append the events describing the order books and accounts at the given time to the given list."""
+        for book in self.books:
+            midpoint_price = book.midpoint_price()
+            if midpoint_price is not None:
+                events.append(("midpoint_price_changed", (book.instrument, now, midpoint_price)))
+            levels: Tuple[List[int], ...] = tuple([0] * TOP_LEVEL_COUNT for _ in range(4))
+            book.top_levels(*levels)
+            events.append(("order_book_changed", (book.instrument, now) + levels))
+
+        future_price = self.books[Instrument.FUTURE].last_traded_price()
+        etf_price = self.books[Instrument.ETF].last_traded_price()
+        if future_price is not None and etf_price is not None:
+            self.account_book.update(future_price, etf_price)
+            for team, account in self.accounts.items():
+                if team:
+                    events.append(("profit_loss_changed", (team, now, account.profit_or_loss / 100.0,
+                                                           account.etf_position, account.future_position,
+                                                           account.account_balance / 100.0,
+                                                           account.total_fees / 100.0)))
@@ -79,6 +79,7 @@ class ActiveOrderTableModel(BaseTableModel):
                         "The volume of the order (i.e. the number of lots to trade)",
                         "The limit price of the order (i.e. the worst price at which it can trade)")
     _ORDER_ID_COLUMN = _COLUMN_NAMES.index("OrderId")
+    _PRICE_COLUMN = _COLUMN_NAMES.index("Price")
     _VOLUME_COLUMN = _COLUMN_NAMES.index("Volume")
 
     def __init__(self, team: str, parent: Optional[QtCore.QObject] = None):
@@ -87,55 +88,51 @@ class ActiveOrderTableModel(BaseTableModel):
         self.team: str = team
         self.__orders: List[List[str, int, str, str, int, str]] = list()
 
+    def clear(self) -> None:
+        """Remove every order from the table."""
+        self.beginResetModel()
+        self._row_count = 0
+        self.__orders.clear()
+        self.endResetModel()
+
     def data(self, index: QtCore.QModelIndex, role: int = Qt.DisplayRole) -> Any:
         """Return information about a specified table cell."""
         if role == Qt.DisplayRole:
             return self.__orders[self._row_count - index.row() - 1][index.column()]
         return super().data(index, role)
 
-    def __remove_row(self, row: int) -> None:
-        self.beginRemoveRows(QtCore.QModelIndex(), row, row)
-        self._row_count -= 1
-        self.__orders.pop(row)
-        self.endRemoveRows()
-
-    def __update_order_volume(self, order_id: int, volume_delta: int) -> None:
-        row = next((i for i in range(self._row_count) if self.__orders[i][self._ORDER_ID_COLUMN] == order_id), None)
-        if row is not None:
-            self.__orders[row][self._VOLUME_COLUMN] += volume_delta
-            if self.__orders[row][self._VOLUME_COLUMN] <= 0:
-                self.__remove_row(row)
-            else:
-                self.dataChanged.emit(self.createIndex(row, self._VOLUME_COLUMN),
-                                      self.createIndex(row, self._VOLUME_COLUMN))
-
-    def on_order_amended(self, team: str, _: float, order_id: int, volume_delta: int) -> None:
-        """Callback when an order is amended."""
-        if team == self.team:
-            self.__update_order_volume(order_id, volume_delta)
+    @staticmethod
+    def __order_row(now: float, order_id: int, instrument: Instrument, side: Side, volume: int,
+                    price: int) -> List[Any]:
+        return ["%.3f" % now, order_id, instrument.name, side.name.capitalize(), volume, "%.2f" % (price / 100.0)]
 
-    def on_order_cancelled(self, team: str, now: float, order_id: int) -> None:
-        """Callback when an order is cancelled."""
-        if team == self.team:
-            row = next((i for i in range(self._row_count) if self.__orders[i][self._ORDER_ID_COLUMN] == order_id), None)
-            if row is not None:
-                self.__remove_row(row)
-
-    def on_order_inserted(self, team: str, now: float, order_id: int, instrument: Instrument, side: Side,
-                          volume: int, price: int, _: Lifespan) -> None:
-        """Callback when an order is inserted."""
-        if team == self.team:
-            self.beginInsertRows(QtCore.QModelIndex(), 0, 0)
-            self._row_count += 1
-            self.__orders.append(["%.3f" % now, order_id, instrument.name, side.name.capitalize(), volume,
-                                  "%.2f" % (price / 100.0)])
-            self.endInsertRows()
+    def on_order_events(self, team: str, events: List[Tuple[str, Tuple]]) -> None:
+        """Callback when a batch of order events occurs, which are applied with a single reset of the model."""
+        if team != self.team:
+            return
 
-    def on_trade_occurred(self, team: str, now: float, order_id: int, side: Side, volume: int, price: int,
-                          fee: int) -> None:
-        """Callback when a trade occurs."""
-        if team == self.team:
-            self.__update_order_volume(order_id, -volume)
+        self.beginResetModel()
+        orders = {row[self._ORDER_ID_COLUMN]: row for row in self.__orders}
+        for name, args in events:
+            order_id: int = args[2]
+            if name == "order_inserted":
+                orders[order_id] = self.__order_row(*args[1:7])
+            elif name == "order_cancelled":
+                orders.pop(order_id, None)
+            elif name == "order_replaced":
+                row = orders.get(order_id)
+                if row is not None:
+                    row[self._VOLUME_COLUMN] = args[4]
+                    row[self._PRICE_COLUMN] = "%.2f" % (args[3] / 100.0)
+            else:  # "order_amended" or "trade_occurred"
+                row = orders.get(order_id)
+                if row is not None:
+                    row[self._VOLUME_COLUMN] += args[3] if name == "order_amended" else -args[4]
+                    if row[self._VOLUME_COLUMN] <= 0:
+                        del orders[order_id]
+        self.__orders = list(orders.values())
+        self._row_count = len(self.__orders)
+        self.endResetModel()
 
 
 class BasicPriceLadderModel(BaseTableModel):
@@ -166,8 +163,8 @@ class BasicPriceLadderModel(BaseTableModel):
 
         self._first_price: int = 0
 
-        self.__ask_volumes: Dict[int, Any] = dict()
-        self.__bid_volumes: Dict[int, Any] = dict()
+        self.__ask_volumes: Dict[int, int] = dict()
+        self.__bid_volumes: Dict[int, int] = dict()
 
     def data(self, index: QtCore.QModelIndex, role: int = Qt.DisplayRole) -> Any:
         """Return the content of a table cell."""
@@ -175,11 +172,13 @@ class BasicPriceLadderModel(BaseTableModel):
         column: int = index.column()
         if role == Qt.DisplayRole:
             if column == self._BID_VOL_COLUMN:
-                return self.__bid_volumes.get(price, None)
+                volume = self.__bid_volumes.get(price)
+                return "{:,}".format(volume) if volume is not None else None
             elif column == self._PRICE_COLUMN:
                 return "%.2f" % (price / 100.0)
             elif column == self._ASK_VOL_COLUMN:
-                return self.__ask_volumes.get(price, None)
+                volume = self.__ask_volumes.get(price)
+                return "{:,}".format(volume) if volume is not None else None
         elif role == Qt.ForegroundRole:
             if column == self._PRICE_COLUMN:
                 if price >= self.last_best_ask:
@@ -202,6 +201,35 @@ class BasicPriceLadderModel(BaseTableModel):
         self._row_count += count
         self.endInsertRows()
 
+    def __emit_changed_rows(self, column: int, rows: List[int]) -> None:
+        """Emit dataChanged for each run of consecutive rows, in ascending order, of the given column."""
+        first = last = -2
+        for row in rows:
+            if row != last + 1:
+                if first >= 0:
+                    self.dataChanged.emit(self.createIndex(first, column), self.createIndex(last, column))
+                first = row
+            last = row
+        if first >= 0:
+            self.dataChanged.emit(self.createIndex(first, column), self.createIndex(last, column))
+
+    def __emit_changed_volumes(self, column: int, old_volumes: Dict[int, int], new_volumes: Dict[int, int]) -> None:
+        """Emit dataChanged for the rows of the given column whose volume differs between old and new."""
+        first_price = self._first_price
+        tick_size = self.tick_size
+        row_count = self._row_count
+        rows = sorted(row for row in ((first_price - p) // tick_size for p in old_volumes.keys() | new_volumes.keys()
+                                      if old_volumes.get(p) != new_volumes.get(p)) if 0 <= row < row_count)
+        self.__emit_changed_rows(column, rows)
+
+    def __emit_price_rows(self, price: int, other_price: int) -> None:
+        """Emit dataChanged for the price column between two prices, inclusive."""
+        first_row = max((self._first_price - max(price, other_price)) // self.tick_size, 0)
+        last_row = min((self._first_price - min(price, other_price)) // self.tick_size, self._row_count - 1)
+        if first_row <= last_row:
+            self.dataChanged.emit(self.createIndex(first_row, self._PRICE_COLUMN),
+                                  self.createIndex(last_row, self._PRICE_COLUMN))
+
     def __prepend_rows(self, count: int) -> None:
         self.beginInsertRows(QtCore.QModelIndex(), 1, count)
         self._row_count += count
@@ -218,8 +246,8 @@ class BasicPriceLadderModel(BaseTableModel):
         if best_ask == 0 and bid_prices[0] != 0:
             best_ask = bid_prices[0] + self.tick_size
 
-        min_best_ask: int = best_ask if best_ask < self.last_best_ask else self.last_best_ask
-        max_best_ask: int = best_ask if best_ask > self.last_best_ask else self.last_best_ask
+        previous_best_ask: int = self.last_best_ask
+        previous_best_bid: int = self.last_best_bid
         self.last_best_ask = best_ask
         self.last_best_bid = bid_prices[0]
 
@@ -237,18 +265,23 @@ class BasicPriceLadderModel(BaseTableModel):
         if self._row_count - best_ask_row < self._MINIMUM_EXTRA_ROW_COUNT:
             self.__append_rows(best_ask_row + self._MINIMUM_EXTRA_ROW_COUNT * 2 - self._row_count)
 
-        min_best_ask_row: int = (self._first_price - min_best_ask) // self.tick_size
-        max_best_bid_row: int = (self._first_price - max_best_ask) // self.tick_size + 1
+        ask_volumes_by_price: Dict[int, int] = {p: v for p, v in zip(ask_prices, ask_volumes) if p}
+        if ask_volumes_by_price != self.__ask_volumes:
+            previous_ask_volumes = self.__ask_volumes
+            self.__ask_volumes = ask_volumes_by_price
+            self.__emit_changed_volumes(self._ASK_VOL_COLUMN, previous_ask_volumes, ask_volumes_by_price)
 
-        self.__ask_volumes.clear()
-        self.__ask_volumes.update((p, "{:,}".format(v)) for p, v in zip(ask_prices, ask_volumes) if p)
-        self.dataChanged.emit(self.createIndex(0, self._ASK_VOL_COLUMN),
-                              self.createIndex(min_best_ask_row, self._ASK_VOL_COLUMN))
+        bid_volumes_by_price: Dict[int, int] = {p: v for p, v in zip(bid_prices, bid_volumes) if p}
+        if bid_volumes_by_price != self.__bid_volumes:
+            previous_bid_volumes = self.__bid_volumes
+            self.__bid_volumes = bid_volumes_by_price
+            self.__emit_changed_volumes(self._BID_VOL_COLUMN, previous_bid_volumes, bid_volumes_by_price)
 
-        self.__bid_volumes.clear()
-        self.__bid_volumes.update((p, "{:,}".format(v)) for p, v in zip(bid_prices, bid_volumes) if p)
-        self.dataChanged.emit(self.createIndex(max_best_bid_row, self._BID_VOL_COLUMN),
-                              self.createIndex(self._row_count - 1, self._BID_VOL_COLUMN))
+        # The colour of a price depends on which side of the best prices it lies
+        if previous_best_ask and best_ask != previous_best_ask:
+            self.__emit_price_rows(previous_best_ask, best_ask)
+        if previous_best_bid and self.last_best_bid and self.last_best_bid != previous_best_bid:
+            self.__emit_price_rows(previous_best_bid, self.last_best_bid)
 
         if best_ask_row != self.last_best_ask_row:
             self.last_best_ask_row = best_ask_row
@@ -320,6 +353,15 @@ class TeamLadderVolumes:
         self.__bid_orders: Dict[int, _Order] = dict()
         self.__model: Optional[PriceLadderModel] = None
 
+    def clear(self) -> None:
+        """Remove every order from the team's volumes."""
+        self.team_ask_volumes.clear()
+        self.team_bid_volumes.clear()
+        self.__ask_orders.clear()
+        self.__bid_orders.clear()
+        if self.__model:
+            self.__model.set_competitor_model(self)
+
     def clear_model(self) -> None:
         """Clear the price ladder model."""
         self.__model = None
@@ -359,6 +401,23 @@ class TeamLadderVolumes:
         if team == self.team:
             self.__subtract_volume(order_id, -volume_delta)
 
+    def on_order_events(self, team: str, events: List[Tuple[str, Tuple]]) -> None:
+        """Callback when a batch of order events occurs, after which the team columns are refreshed once."""
+        if team != self.team:
+            return
+
+        # Detach the model while the events are applied so that it is not told about each one
+        model = self.__model
+        self.__model = None
+        handlers = {"order_amended": self.on_order_amended, "order_cancelled": self.on_order_cancelled,
+                    "order_inserted": self.on_order_inserted, "order_replaced": self.on_order_replaced,
+                    "trade_occurred": self.on_trade_occurred}
+        for name, args in events:
+            handlers[name](*args)
+        self.__model = model
+        if model:
+            model.set_competitor_model(self)
+
     def on_order_cancelled(self, team: str, now: float, order_id: int) -> None:
         """Callback when an order is cancelled."""
         if team == self.team:
@@ -383,6 +442,19 @@ class TeamLadderVolumes:
                 index = self.__model.createIndex(self.__model.get_row(price), column)
                 self.__model.dataChanged.emit(index, index)
 
+    def on_order_replaced(self, team: str, now: float, order_id: int, price: int, volume: int) -> None:
+        """Callback when an order is replaced."""
+        if team == self.team:
+            if order_id in self.__ask_orders:
+                side = Side.SELL
+                self.__subtract_volume(order_id, self.__ask_orders[order_id].remaining_volume)
+            elif order_id in self.__bid_orders:
+                side = Side.BUY
+                self.__subtract_volume(order_id, self.__bid_orders[order_id].remaining_volume)
+            else:
+                return
+            self.on_order_inserted(team, now, order_id, Instrument.ETF, side, volume, price, Lifespan.GOOD_FOR_DAY)
+
     def on_trade_occurred(self, team: str, now: float, order_id: int, side: Side, volume: int, price: int,
                           fee: int) -> None:
         """Callback when a trade occurs."""
@@ -484,18 +556,33 @@ class TradeHistoryTableModel(BaseTableModel):
         self.team: str = team
         self.__trades: List[Tuple[str, int, str, int, str, str]] = list()
 
+    def clear(self) -> None:
+        """Remove every trade from the table."""
+        self.beginResetModel()
+        self._row_count = 0
+        self.__trades.clear()
+        self.endResetModel()
+
     def data(self, index: QtCore.QModelIndex, role: int = Qt.DisplayRole) -> Any:
         """Return information about the specified table cell."""
         if role == Qt.DisplayRole:
             return self.__trades[self._row_count - index.row() - 1][index.column()]
         return super().data(index, role)
 
-    def on_trade_occurred(self, team: str, now: float, order_id: int, side: Side, volume: int, price: int,
-                          fee: int) -> None:
-        """Callback when a trade occurs."""
-        if team == self.team:
-            self.beginInsertRows(QtCore.QModelIndex(), 0, 0)
-            self._row_count += 1
-            self.__trades.append(("%.3f" % now, order_id, ("Sell", "Buy")[side], volume, "%.2f" % (price / 100.0),
-                                  "%.2f" % (-fee / 100.0)))
+    def on_order_events(self, team: str, events: List[Tuple[str, Tuple]]) -> None:
+        """Callback when a batch of order events occurs, from which the trades are inserted together."""
+        if team != self.team:
+            return
+
+        trades = [self.__trade_row(*args[1:]) for name, args in events if name == "trade_occurred"]
+        if trades:
+            self.beginInsertRows(QtCore.QModelIndex(), 0, len(trades) - 1)
+            self._row_count += len(trades)
+            self.__trades.extend(trades)
             self.endInsertRows()
+
+    @staticmethod
+    def __trade_row(now: float, order_id: int, side: Side, volume: int, price: int,
+                    fee: int) -> Tuple[str, int, str, int, str, str]:
+        return ("%.3f" % now, order_id, ("Sell", "Buy")[side], volume, "%.2f" % (price / 100.0),
+                "%.2f" % (-fee / 100.0))
@@ -20,27 +20,53 @@ import logging
 
 from typing import Iterable, List, Optional, Tuple
 
-from .messages import (HEADER, HEADER_SIZE, ORDER_BOOK_HEADER, ORDER_BOOK_HEADER_SIZE,
-                       ORDER_BOOK_MESSAGE, ORDER_BOOK_MESSAGE_SIZE, TRADE_TICKS_HEADER, TRADE_TICKS_HEADER_SIZE,
-                       TRADE_TICKS_MESSAGE, TRADE_TICKS_MESSAGE_SIZE, MessageType)
+from .messages import (HEADER, HEADER_SIZE, ORDER_BOOK_DELTA_ENTRY, ORDER_BOOK_DELTA_HEADER,
+                       ORDER_BOOK_DELTA_HEADER_SIZE, ORDER_BOOK_DELTA_MAXIMUM_SIZE, ORDER_BOOK_HEADER,
+                       ORDER_BOOK_HEADER_SIZE, ORDER_BOOK_MESSAGE, ORDER_BOOK_MESSAGE_SIZE, TRADE_TICKS_HEADER,
+                       TRADE_TICKS_HEADER_SIZE, TRADE_TICKS_MESSAGE, TRADE_TICKS_MESSAGE_SIZE, MessageType)
+from .match_events import MatchEvent, MatchEvents
 from .order_book import TOP_LEVEL_COUNT, OrderBook
 from .pubsub import PublisherFactory
 from .timer import Timer
-from .types import Instrument
+from .types import Instrument, Side
+
+
+DEFAULT_MINIMUM_PUBLISH_INTERVAL = 0.01  # Seconds between order book messages when publishing on change
+DEFAULT_SNAPSHOT_INTERVAL = 20  # Ticks between full order book snapshots in the incremental feed
 
 
 class InformationPublisher(asyncio.DatagramProtocol):
-    """A publisher of exchange information."""
+    """A publisher of exchange information.
+
+    By default, a full order book snapshot is published for each book on
+    every tick. If a snapshot interval is given, a snapshot is published
+    only every snapshot_interval ticks and, on the ticks in between, an
+    order book delta lists just the levels that have changed since the
+    previous book message (if any have). Changes within a tick are
+    conflated, since only the state of the book at the tick is compared.
+
+    If match events are supplied, the books are also published as soon as
+    their top levels change (but no more often than the minimum publish
+    interval) and book messages carry their own sequence numbers rather
+    than the tick number.
+    """
 
     def __init__(self, loop: asyncio.AbstractEventLoop, publisher_factory: PublisherFactory,
-                 order_books: Iterable[OrderBook], timer: Timer):
+                 order_books: Iterable[OrderBook], timer: Timer, snapshot_interval: int = 0,
+                 match_events: Optional[MatchEvents] = None, minimum_publish_interval: float = 0.0):
         """Initialize a new instance of the InformationChannel class."""
+        self.__book_sequences: List[int] = [0 for _ in Instrument]
         self.__event_loop: asyncio.AbstractEventLoop = loop
         self.__file_number: int = 0
+        self.__last_change_publish_time: float = 0.0
+        self.__minimum_publish_interval: float = minimum_publish_interval
+        self.__publish_on_change: bool = match_events is not None
+        self.__send_changes_handle: Optional[asyncio.Handle] = None
         self.__logger: logging.Logger = logging.getLogger("INFORMATION")
         self.__order_books: Tuple[OrderBook] = tuple(order_books)
         self.__publisher_factory: PublisherFactory = publisher_factory
         self.__send_ticks_handles: List[Optional[asyncio.Handle]] = [None for _ in Instrument]
+        self.__snapshot_interval: int = snapshot_interval
         self.__trade_ticks_sequences: List[int] = [1 for _ in Instrument]
         self.__transport: Optional[asyncio.WriteTransport] = None
 
@@ -48,6 +74,8 @@ class InformationPublisher(asyncio.DatagramProtocol):
         for book in self.__order_books:
             book.trade_occurred.append(self.on_trade)
         timer.timer_ticked.append(self.on_timer_tick)
+        if match_events is not None:
+            match_events.event_occurred.append(self.on_match_event)
 
         # Store book data for dissemination to competitors.
         self.__ask_prices: List[int] = [0] * TOP_LEVEL_COUNT
@@ -55,7 +83,12 @@ class InformationPublisher(asyncio.DatagramProtocol):
         self.__bid_prices: List[int] = [0] * TOP_LEVEL_COUNT
         self.__bid_volumes: List[int] = [0] * TOP_LEVEL_COUNT
 
+        # The levels most recently published for each book (used to compute deltas).
+        self.__published_levels: List[Tuple[List[int], ...]] = [tuple([0] * TOP_LEVEL_COUNT for _ in range(4))
+                                                                 for _ in Instrument]
+
         # Message buffers
+        self.__book_delta_message = bytearray(ORDER_BOOK_DELTA_MAXIMUM_SIZE)
         self.__book_message = bytearray(ORDER_BOOK_MESSAGE_SIZE)
         self.__ticks_message = bytearray(TRADE_TICKS_MESSAGE_SIZE)
         HEADER.pack_into(self.__book_message, 0, ORDER_BOOK_MESSAGE_SIZE, MessageType.ORDER_BOOK_UPDATE)
@@ -66,14 +99,84 @@ class InformationPublisher(asyncio.DatagramProtocol):
         self.__logger.info("information channel established")
         self.__transport = transport
 
+    def on_match_event(self, event: MatchEvent) -> None:
+        """Called when a match event occurs (which may have changed an order book)."""
+        if self.__send_changes_handle is None:
+            delay = self.__last_change_publish_time + self.__minimum_publish_interval - self.__event_loop.time()
+            if delay > 0.0:
+                self.__send_changes_handle = self.__event_loop.call_later(delay, self.__send_changed_order_books)
+            else:
+                self.__send_changes_handle = self.__event_loop.call_soon(self.__send_changed_order_books)
+
     def on_timer_tick(self, timer: Timer, now: float, tick_number: int) -> None:
         """Called each time the timer ticks."""
+        snapshot_due = not self.__snapshot_interval or tick_number % self.__snapshot_interval == 0
         for book in self.__order_books:
             book.top_levels(self.__ask_prices, self.__ask_volumes, self.__bid_prices, self.__bid_volumes)
-            ORDER_BOOK_HEADER.pack_into(self.__book_message, HEADER_SIZE, book.instrument, tick_number)
-            ORDER_BOOK_MESSAGE.pack_into(self.__book_message, ORDER_BOOK_HEADER_SIZE, *self.__ask_prices,
-                                         *self.__ask_volumes, *self.__bid_prices, *self.__bid_volumes)
-            self.__transport.write(self.__book_message)
+            sequence = self.__book_sequences[book.instrument] + 1 if self.__publish_on_change else tick_number
+            self.__send_order_book(book.instrument, sequence, snapshot_due)
+
+    def __send_changed_order_books(self) -> None:
+        """Send the order books whose top levels have changed since they were last published."""
+        self.__send_changes_handle = None
+        if self.__transport is None:
+            return
+
+        published_any: bool = False
+        levels = (self.__ask_prices, self.__ask_volumes, self.__bid_prices, self.__bid_volumes)
+        for book in self.__order_books:
+            book.top_levels(*levels)
+            if levels != self.__published_levels[book.instrument]:
+                self.__send_order_book(book.instrument, self.__book_sequences[book.instrument] + 1,
+                                       not self.__snapshot_interval)
+                published_any = True
+
+        if published_any:
+            self.__last_change_publish_time = self.__event_loop.time()
+
+    def __send_order_book(self, instrument: Instrument, sequence: int, snapshot_due: bool) -> None:
+        """Send either a snapshot or a delta of the top levels of the given book."""
+        if snapshot_due or not self.__book_sequences[instrument]:
+            self.__send_order_book_snapshot(instrument, sequence)
+        else:
+            self.__send_order_book_delta(instrument, sequence)
+
+    def __send_order_book_delta(self, instrument: Instrument, sequence: int) -> None:
+        """Send the levels of the given book that have changed since it was last published."""
+        message = self.__book_delta_message
+        pack_entry = ORDER_BOOK_DELTA_ENTRY.pack_into
+        published_ask_prices, published_ask_volumes, published_bid_prices, published_bid_volumes = \
+            self.__published_levels[instrument]
+
+        end: int = ORDER_BOOK_DELTA_HEADER_SIZE
+        for side, prices, volumes, published_prices, published_volumes in (
+                (Side.ASK, self.__ask_prices, self.__ask_volumes, published_ask_prices, published_ask_volumes),
+                (Side.BID, self.__bid_prices, self.__bid_volumes, published_bid_prices, published_bid_volumes)):
+            for level in range(TOP_LEVEL_COUNT):
+                if prices[level] != published_prices[level] or volumes[level] != published_volumes[level]:
+                    pack_entry(message, end, side, level, prices[level], volumes[level])
+                    end += ORDER_BOOK_DELTA_ENTRY.size
+                    published_prices[level] = prices[level]
+                    published_volumes[level] = volumes[level]
+
+        if end != ORDER_BOOK_DELTA_HEADER_SIZE:
+            HEADER.pack_into(message, 0, end, MessageType.ORDER_BOOK_DELTA)
+            ORDER_BOOK_DELTA_HEADER.pack_into(message, HEADER_SIZE, instrument, sequence,
+                                              self.__book_sequences[instrument])
+            self.__book_sequences[instrument] = sequence
+            self.__transport.write(memoryview(message)[:end])
+
+    def __send_order_book_snapshot(self, instrument: Instrument, sequence: int) -> None:
+        """Send all of the top levels of the given book."""
+        ORDER_BOOK_HEADER.pack_into(self.__book_message, HEADER_SIZE, instrument, sequence)
+        ORDER_BOOK_MESSAGE.pack_into(self.__book_message, ORDER_BOOK_HEADER_SIZE, *self.__ask_prices,
+                                     *self.__ask_volumes, *self.__bid_prices, *self.__bid_volumes)
+        self.__transport.write(self.__book_message)
+
+        for published, levels in zip(self.__published_levels[instrument], (self.__ask_prices, self.__ask_volumes,
+                                                                           self.__bid_prices, self.__bid_volumes)):
+            published[:] = levels
+        self.__book_sequences[instrument] = sequence
 
     def on_trade(self, book: OrderBook) -> None:
         """Called when a trade occurs in one of the order books."""
@@ -0,0 +1,221 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import collections
+import functools
+import json
+import logging
+import time
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .messages import MessageType
+
+
+# Histograms keep this many bits of each recorded value, so that the
+# recorded values are accurate to better than 1% (as with HdrHistogram)
+SIGNIFICANT_BITS = 8
+
+# Percentiles included in each histogram summary
+SUMMARY_PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+MESSAGE_TYPE_NAMES: Dict[int, str] = {t.value: t.name for t in MessageType}
+
+
+class LatencyHistogram:
+    """A histogram of latencies, in nanoseconds, with a bounded relative error.
+
+    Values are grouped in buckets whose width doubles with each power of two
+    so that the histogram needs little memory however large the values are.
+    """
+
+    def __init__(self, significant_bits: int = SIGNIFICANT_BITS):
+        """Initialise a new instance of the LatencyHistogram class."""
+        self.count: int = 0
+        self.maximum: int = 0
+        self.minimum: int = 0
+        self.total: int = 0
+
+        self.__counts: List[int] = [0] * (1 << significant_bits)
+        self.__half_bucket_size: int = 1 << (significant_bits - 1)
+        self.__significant_bits: int = significant_bits
+
+    def __index(self, value: int) -> int:
+        """Return the index of the bucket that counts the given value."""
+        shift = value.bit_length() - self.__significant_bits
+        if shift <= 0:
+            return value
+        return shift * self.__half_bucket_size + (value >> shift)
+
+    def __lowest_value(self, index: int) -> int:
+        """Return the lowest value counted by the bucket with the given index."""
+        if index < 2 * self.__half_bucket_size:
+            return index
+        shift = index // self.__half_bucket_size - 1
+        return (index - shift * self.__half_bucket_size) << shift
+
+    @property
+    def mean(self) -> float:
+        """Return the mean of the recorded values."""
+        return self.total / self.count if self.count else 0.0
+
+    def record(self, value: int) -> None:
+        """Record a value."""
+        if value < 0:
+            value = 0
+        index = self.__index(value)
+        if index >= len(self.__counts):
+            self.__counts.extend([0] * (index + 1 - len(self.__counts)))
+        self.__counts[index] += 1
+
+        if self.count == 0 or value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+        self.count += 1
+        self.total += value
+
+    def reset(self) -> None:
+        """Discard all of the recorded values."""
+        self.count = self.maximum = self.minimum = self.total = 0
+        self.__counts[:] = [0] * (1 << self.__significant_bits)
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the count and a summary of the recorded values in microseconds."""
+        result: Dict[str, Any] = {"count": self.count,
+                                  "min": self.minimum / 1000.0,
+                                  "mean": self.mean / 1000.0}
+        for percentile in SUMMARY_PERCENTILES:
+            result["p%g" % percentile] = self.value_at_percentile(percentile) / 1000.0
+        result["max"] = self.maximum / 1000.0
+        return result
+
+    def value_at_percentile(self, percentile: float) -> int:
+        """Return the value below which the given percentage of recorded values fall."""
+        if self.count == 0:
+            return 0
+        target = max(1, round(self.count * percentile / 100.0))
+        cumulative = 0
+        for index, count in enumerate(self.__counts):
+            cumulative += count
+            if cumulative >= target:
+                # Report the middle of the bucket, but never beyond the recorded range
+                low = self.__lowest_value(index)
+                high = self.__lowest_value(index + 1) - 1
+                return min(max((low + high) // 2, self.minimum), self.maximum)
+        return self.maximum
+
+
+class Instrumentation:
+    """Latency histograms for the message handling of the exchange simulator.
+
+    Each histogram belongs to a category (for example "message" or
+    "competitor") and has a name within that category. Methods are only
+    wrapped with timing code when they are instrumented, so an exchange
+    without instrumentation pays no cost for it.
+    """
+
+    def __init__(self, report_filename: Optional[str] = None):
+        """Initialise a new instance of the Instrumentation class."""
+        self.histograms: Dict[str, Dict[str, LatencyHistogram]] = collections.defaultdict(
+            lambda: collections.defaultdict(LatencyHistogram))
+        self.logger: logging.Logger = logging.getLogger("INSTRUMENTATION")
+        self.report_filename: Optional[str] = report_filename
+
+    def histogram(self, category: str, name: str) -> LatencyHistogram:
+        """Return the histogram with the given category and name."""
+        return self.histograms[category][name]
+
+    def instrument_connection(self, connection: Any) -> None:
+        """Record the time taken to handle each message received by an execution connection.
+
+        Each message is recorded by message type and by competitor name.
+        """
+        on_message: Callable[[int, bytes, int, int], None] = connection.on_message
+        by_type: Dict[str, LatencyHistogram] = self.histograms["message"]
+        by_competitor: Dict[str, LatencyHistogram] = self.histograms["competitor"]
+        clock = time.perf_counter_ns
+
+        @functools.wraps(on_message)
+        def timed_on_message(typ: int, data: bytes, start: int, length: int) -> None:
+            started: int = clock()
+            try:
+                on_message(typ, data, start, length)
+            finally:
+                elapsed: int = clock() - started
+                by_type[MESSAGE_TYPE_NAMES.get(typ, str(typ))].record(elapsed)
+                if connection.competitor is not None:
+                    by_competitor[connection.competitor.name].record(elapsed)
+
+        connection.on_message = timed_on_message
+
+    def instrument_exchange(self, controller: Any, exec_server: Any, market_events_reader: Any,
+                            books: Iterable[Any]) -> None:
+        """Instrument the components of an exchange simulator."""
+        self.instrument_method(controller, "advance_time", "controller", "advance_time")
+        self.instrument_method(market_events_reader, "process_market_events", "controller",
+                               "process_market_events")
+        for book in books:
+            for operation in ("amend", "cancel", "insert", "replace"):
+                self.instrument_method(book, operation, "order_book", "%s.%s" % (book.instrument.name, operation))
+        exec_server.connection_created.append(self.instrument_connection)
+
+    def instrument_method(self, obj: Any, method_name: str, category: str, name: str) -> None:
+        """Record the time taken by each call to the named method of the given object."""
+        method: Callable[..., Any] = getattr(obj, method_name)
+        record: Callable[[int], None] = self.histograms[category][name].record
+        clock = time.perf_counter_ns
+
+        @functools.wraps(method)
+        def timed_method(*args, **kwargs):
+            started: int = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                record(clock() - started)
+
+        setattr(obj, method_name, timed_method)
+
+    def log_report(self) -> None:
+        """Write a summary of every histogram to the log."""
+        for category, histograms in sorted(self.histograms.items()):
+            for name, histogram in sorted(histograms.items()):
+                summary = histogram.summary()
+                self.logger.info("%s %s: %s", category, name,
+                                 " ".join("%s=%s" % (k, ("%.1f" % v) if type(v) is float else v)
+                                          for k, v in summary.items()))
+
+    def on_timer_stopped(self, timer: Any, now: float) -> None:
+        """Called when the match is over."""
+        self.log_report()
+        if self.report_filename:
+            self.write_report(self.report_filename)
+
+    def report(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Return a summary of every histogram by category and name."""
+        return {category: {name: histogram.summary() for name, histogram in sorted(histograms.items())}
+                for category, histograms in sorted(self.histograms.items())}
+
+    def write_report(self, filename: str) -> None:
+        """Write a summary of every histogram to the named file as JSON."""
+        try:
+            with open(filename, "w") as report_file:
+                json.dump(self.report(), report_file, indent=2)
+        except IOError as e:
+            self.logger.error("failed to write instrumentation report: filename=%s", filename, exc_info=e)
+        else:
+            self.logger.info("instrumentation report written to %s", filename)
@@ -16,9 +16,10 @@
 #     License along with Ready Trader Go.  If not, see
 #     <https://www.gnu.org/licenses/>.
 import collections
+import itertools
 import sys
 
-from typing import Deque
+from typing import Deque, List, Union
 
 
 class FrequencyLimiter(object):
@@ -51,15 +52,78 @@ class FrequencyLimiter(object):
 
         return self.value > self.limit
 
+    def check_events(self, now: float, count: int) -> bool:
+        """Return True if count new events at the same time breach the limit, False otherwise."""
+        self.value += count - 1
+        self.events.extend(itertools.repeat(now, count - 1))
+        return self.check_event(now)
+
+
+class RingFrequencyLimiter(object):
+    """Limit the frequency of events in a specified time interval.
+
+    This limiter breaches in exactly the same circumstances as the
+    FrequencyLimiter, but only remembers the times of the most recent
+    limit + 1 events in a ring, so each check takes constant time: the limit
+    is breached if the event limit events before the new one is still
+    inside the interval.
+    """
+
+    def __init__(self, interval: float, limit: int):
+        """Initialise a new instance of the RingFrequencyLimiter class."""
+        self.events: List[float] = [float("-inf")] * (limit + 1)
+        self.interval: float = interval
+        self.limit: int = limit
+        self.__index: int = 0
+        self.__now: float = float("-inf")
+
+    @property
+    def value(self) -> int:
+        """Return the number of events in the interval up to the last event (at most limit + 1)."""
+        epsilon: float = sys.float_info.epsilon
+        window_start: float = self.__now - self.interval
+        return sum(1 for e in self.events
+                   if (e - window_start) > ((e if e > window_start else window_start) * epsilon))
+
+    def check_event(self, now: float) -> bool:
+        """Return True if the new event breaches the limit, False otherwise.
+
+        This method should be called with a monotonically increasing sequence
+        of times.
+        """
+        events = self.events
+        index = self.__index
+        events[index] = now
+        index += 1
+        if index == len(events):
+            index = 0
+        self.__index = index
+        self.__now = now
+
+        first: float = events[index]
+        window_start: float = now - self.interval
+        return (first - window_start) > ((first if first > window_start else window_start) * sys.float_info.epsilon)
+
+    def check_events(self, now: float, count: int) -> bool:
+        """Return True if count new events at the same time breach the limit, False otherwise."""
+        for _ in range(min(count, len(self.events)) - 1):
+            self.check_event(now)
+        return self.check_event(now)
+
 
 class FrequencyLimiterFactory:
     """A factory class for FrequencyLimiters."""
 
-    def __init__(self, interval: float, limit: int):
+    def __init__(self, interval: float, limit: int, engine: str = "deque"):
         """Initialise a new instance of the FrequencyLimiterFactory class."""
+        if engine not in ("deque", "ring"):
+            raise ValueError("engine must be either 'deque' or 'ring'")
+        self.frequency_limit_engine: str = engine
         self.frequency_limit_interval: float = interval
         self.frequency_limit: int = limit
 
-    def create(self) -> FrequencyLimiter:
+    def create(self) -> Union[FrequencyLimiter, RingFrequencyLimiter]:
         """Return a new FrequencyLimiter instance."""
+        if self.frequency_limit_engine == "ring":
+            return RingFrequencyLimiter(self.frequency_limit_interval, self.frequency_limit)
         return FrequencyLimiter(self.frequency_limit_interval, self.frequency_limit)
@@ -33,6 +33,7 @@ class MatchEventOperation(enum.IntEnum):
     INSERT = 2
     HEDGE = 3
     TRADE = 4
+    REPLACE = 5
 
 
 class MatchEvent:
@@ -78,15 +79,17 @@ class MatchEvents:
         # Callbacks
         self.event_occurred: List[Callable[[MatchEvent], None]] = list()
 
-    def amend(self, now: float, name: str, order_id: int, diff: int) -> None:
+    def amend(self, now: float, name: str, order_id: int, instrument: Instrument, diff: int) -> None:
         """Create a new amend event."""
-        event = MatchEvent(now, name, MatchEventOperation.AMEND, order_id, None, None, diff, None, None, None)
+        event = MatchEvent(now, name, MatchEventOperation.AMEND, order_id, instrument, None, diff, None, None,
+                           None)
         for callback in self.event_occurred:
             callback(event)
 
-    def cancel(self, now: float, name: str, order_id: int, diff: int) -> None:
+    def cancel(self, now: float, name: str, order_id: int, instrument: Instrument, diff: int) -> None:
         """Create a new cancel event."""
-        event = MatchEvent(now, name, MatchEventOperation.CANCEL, order_id, None, None, diff, None, None, None)
+        event = MatchEvent(now, name, MatchEventOperation.CANCEL, order_id, instrument, None, diff, None, None,
+                           None)
         for callback in self.event_occurred:
             callback(event)
 
@@ -112,6 +115,14 @@ class MatchEvents:
         for callback in self.event_occurred:
             callback(event)
 
+    def replace(self, now: float, name: str, order_id: int, instrument: Instrument, side: Side, volume: int,
+                price: int) -> None:
+        """Create a new replace event."""
+        event = MatchEvent(now, name, MatchEventOperation.REPLACE, order_id, instrument, side, volume, price, None,
+                           None)
+        for callback in self.event_occurred:
+            callback(event)
+
 
 class MatchEventsWriter:
     """A processor of match events that it writes to a file."""
@@ -20,7 +20,7 @@ import enum
 import logging
 import struct
 
-from typing import Optional, Tuple
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
 
 import ready_trader_go.order_book as order_book
 
@@ -37,10 +37,15 @@ class MessageType(enum.IntEnum):
     LOGIN = 7
     ORDER_FILLED = 8
     ORDER_STATUS = 9
+    AMEND_ORDERS = 13
+    CANCEL_ORDERS = 14
+    INSERT_ORDERS = 15
+    REPLACE_ORDER = 16
 
     # Information messages
     ORDER_BOOK_UPDATE = 10
     TRADE_TICKS = 11
+    ORDER_BOOK_DELTA = 12
 
     # Heads Up Display messages
     AMEND_EVENT = 100
@@ -49,21 +54,31 @@ class MessageType(enum.IntEnum):
     HEDGE_EVENT = 103
     LOGIN_EVENT = 104
     TRADE_EVENT = 105
+    REPLACE_EVENT = 106
+    TOP_OF_BOOK_EVENT = 107
+    SUBSCRIBE = 108
 
 
 # Standard message header: message length (2 bytes) and type (1 byte)
 HEADER = struct.Struct("!HB")  # Length, message type
 
+# Batched amend, cancel and insert messages carry between one and this many
+# amend, cancel or insert message bodies (the count follows from the length)
+MAXIMUM_BATCH_SIZE = 16
+
 # Auto-trader to matching engine messages
 AMEND_MESSAGE = struct.Struct("!II")  # Client order id and new volume
 CANCEL_MESSAGE = struct.Struct("!I")  # Client order id
 HEDGE_MESSAGE = struct.Struct("!IBII")  # Client order id, side, price, volume
 INSERT_MESSAGE = struct.Struct("!IBIIB")  # Client order id, side, price, volume and lifespan
 LOGIN_MESSAGE = struct.Struct("!50s50s")  # Name, secret
+REPLACE_MESSAGE = struct.Struct("!III")  # Client order id, new price and new remaining volume
 
 # Matching engine to auto-trader messages
 ERROR_MESSAGE = struct.Struct("!I50s")  # message
 HEDGE_FILLED_MESSAGE = struct.Struct("!III")  # Client order id, price, volume
+ORDER_BOOK_DELTA_ENTRY = struct.Struct("!BBII")  # Side, level, price and volume
+ORDER_BOOK_DELTA_HEADER = struct.Struct("!BII")  # Instrument, sequence number and previous sequence number
 ORDER_BOOK_HEADER = struct.Struct("!BI")  # Instrument and sequence number
 ORDER_BOOK_MESSAGE = struct.Struct("!%dI" % (4 * order_book.TOP_LEVEL_COUNT))  # Prices & volumes for best bids & asks
 ORDER_FILLED_MESSAGE = struct.Struct("!III")  # Client order id, price, volume
@@ -82,6 +97,19 @@ INSERT_EVENT_MESSAGE = struct.Struct("!dIIBBIIB")  # Time, team id, order id, in
 LOGIN_EVENT_MESSAGE = struct.Struct("!50sI")  # Team name, team id
 HEDGE_EVENT_MESSAGE = struct.Struct("!dIBBId")  # Time, team id, side, instrument, volume, price
 TRADE_EVENT_MESSAGE = struct.Struct("!dIIBBIIi")  # Time, team id, order id, side, instrument, volume, price, fee
+REPLACE_EVENT_MESSAGE = struct.Struct("!dIIII")  # Time, team id, order id, new price, new remaining volume
+TOP_OF_BOOK_EVENT_HEADER = struct.Struct("!dBI")  # Time, instrument, last traded price (zero if none)
+TOP_OF_BOOK_EVENT_MESSAGE = struct.Struct("!%dI" % (4 * order_book.TOP_LEVEL_COUNT))  # Prices & volumes
+
+# HUD to matching engine messages: a subscribe message carries zero or more
+# team names (zero meaning every team) after the operations and instruments
+# bit masks (a bit for each MatchEventOperation and Instrument value)
+SUBSCRIBE_MESSAGE = struct.Struct("!BBB")  # Operations, instruments and flags
+SUBSCRIBE_TEAM = struct.Struct("!50s")  # Team name
+
+# Subscribe message bit mask with every operation or instrument set, and flags
+SUBSCRIBE_ALL = 0xFF
+SUBSCRIBE_TOP_OF_BOOK = 1  # Send top-of-book events every tick instead of the market's order events
 
 # Cumulative message sizes
 HEADER_SIZE: int = HEADER.size
@@ -91,9 +119,13 @@ CANCEL_MESSAGE_SIZE: int = HEADER.size + CANCEL_MESSAGE.size
 HEDGE_MESSAGE_SIZE: int = HEADER.size + HEDGE_MESSAGE.size
 INSERT_MESSAGE_SIZE: int = HEADER.size + INSERT_MESSAGE.size
 LOGIN_MESSAGE_SIZE: int = HEADER.size + LOGIN_MESSAGE.size
+REPLACE_MESSAGE_SIZE: int = HEADER.size + REPLACE_MESSAGE.size
 
 ERROR_MESSAGE_SIZE: int = HEADER.size + ERROR_MESSAGE.size
 HEDGE_FILLED_MESSAGE_SIZE: int = HEADER.size + HEDGE_FILLED_MESSAGE.size
+ORDER_BOOK_DELTA_HEADER_SIZE: int = HEADER.size + ORDER_BOOK_DELTA_HEADER.size
+ORDER_BOOK_DELTA_MAXIMUM_SIZE: int = (ORDER_BOOK_DELTA_HEADER_SIZE
+                                      + 2 * order_book.TOP_LEVEL_COUNT * ORDER_BOOK_DELTA_ENTRY.size)
 ORDER_BOOK_HEADER_SIZE: int = HEADER.size + ORDER_BOOK_HEADER.size
 ORDER_BOOK_MESSAGE_SIZE: int = ORDER_BOOK_HEADER_SIZE + ORDER_BOOK_MESSAGE.size
 ORDER_FILLED_MESSAGE_SIZE: int = HEADER.size + ORDER_FILLED_MESSAGE.size
@@ -107,6 +139,204 @@ INSERT_EVENT_MESSAGE_SIZE: int = HEADER.size + INSERT_EVENT_MESSAGE.size
 HEDGE_EVENT_MESSAGE_SIZE: int = HEADER.size + HEDGE_EVENT_MESSAGE.size
 TRADE_EVENT_MESSAGE_SIZE: int = HEADER.size + TRADE_EVENT_MESSAGE.size
 LOGIN_EVENT_MESSAGE_SIZE: int = HEADER.size + LOGIN_EVENT_MESSAGE.size
+REPLACE_EVENT_MESSAGE_SIZE: int = HEADER.size + REPLACE_EVENT_MESSAGE.size
+TOP_OF_BOOK_EVENT_HEADER_SIZE: int = HEADER.size + TOP_OF_BOOK_EVENT_HEADER.size
+TOP_OF_BOOK_EVENT_MESSAGE_SIZE: int = TOP_OF_BOOK_EVENT_HEADER_SIZE + TOP_OF_BOOK_EVENT_MESSAGE.size
+
+SUBSCRIBE_MESSAGE_SIZE: int = HEADER.size + SUBSCRIBE_MESSAGE.size
+
+
+class MessageDescriptor(NamedTuple):
+    """How to decode a message of a particular type and which method should handle it.
+
+    A message with a non-zero item size has a variable length: it must be at
+    least size bytes long and any extra bytes must be a whole number of
+    items. The unpack_from function of a variable length message is passed
+    the data, the start of the message body and the length of the message,
+    and its result is passed to the handler as a single argument. If a
+    variable length message has no unpack_from function, its handler
+    receives the data, start and length instead.
+    """
+    size: int
+    item_size: int
+    unpack_from: Optional[Callable[..., Tuple]]
+    handler: Union[str, Callable[..., None]]
+
+
+DispatchTable = Tuple[Optional[MessageDescriptor], ...]
+
+
+def build_dispatch_table(descriptors: Dict[int, MessageDescriptor]) -> DispatchTable:
+    """Return a table of the given message descriptors indexed by message type."""
+    return tuple(descriptors.get(typ) for typ in range(256))
+
+
+def bind_dispatch_table(table: DispatchTable, target: Any) -> DispatchTable:
+    """Return a copy of a dispatch table in which each handler name is replaced by that method of the target."""
+    return tuple(d if d is None else d._replace(handler=getattr(target, d.handler)) for d in table)
+
+
+def dispatch_message(table: DispatchTable, typ: int, data: bytes, start: int, length: int, *args: Any) -> bool:
+    """Pass a message to its handler in a bound dispatch table, return False if the type or length is invalid.
+
+    Any additional arguments are passed to the handler ahead of the message
+    fields.
+    """
+    descriptor = table[typ]
+    if descriptor is None:
+        return False
+
+    size, item_size, unpack_from, handler = descriptor
+    if length != size and (not item_size or length < size or (length - size) % item_size != 0):
+        return False
+
+    if unpack_from is None:
+        handler(*args, data, start, length)
+    elif item_size:
+        handler(*args, unpack_from(data, start, length))
+    else:
+        handler(*args, *unpack_from(data, start))
+    return True
+
+
+def batch_message_size(item: struct.Struct, count: int) -> int:
+    """Return the length of a batched message carrying count items."""
+    return HEADER.size + count * item.size
+
+
+def __make_batch_unpacker(item: struct.Struct) -> Callable[[bytes, int, int], Iterator[Tuple]]:
+    """Return a function that iterates over the items of a batched message in place."""
+    iter_unpack = item.iter_unpack
+
+    def unpack_from(data: bytes, start: int, length: int) -> Iterator[Tuple]:
+        return iter_unpack(memoryview(data)[start:start + length - HEADER.size])
+
+    return unpack_from
+
+
+def pack_subscribe_message(operations: int, instruments: int, flags: int, teams: List[str]) -> bytes:
+    """Return a subscribe message for the given bit masks, flags and team names."""
+    message = bytearray(SUBSCRIBE_MESSAGE_SIZE + len(teams) * SUBSCRIBE_TEAM.size)
+    HEADER.pack_into(message, 0, len(message), MessageType.SUBSCRIBE)
+    SUBSCRIBE_MESSAGE.pack_into(message, HEADER_SIZE, operations, instruments, flags)
+    for i, team in enumerate(teams):
+        SUBSCRIBE_TEAM.pack_into(message, SUBSCRIBE_MESSAGE_SIZE + i * SUBSCRIBE_TEAM.size, team.encode())
+    return bytes(message)
+
+
+def unpack_error_message(data: bytes, start: int = 0) -> Tuple[int, bytes]:
+    """Return the client order id and error message of an error message."""
+    client_order_id, error_message = ERROR_MESSAGE.unpack_from(data, start)
+    return client_order_id, error_message.rstrip(b"\x00")
+
+
+def unpack_login_event_message(data: bytes, start: int = 0) -> Tuple[str, int]:
+    """Return the team name and team id of a login event message."""
+    name, competitor_id = LOGIN_EVENT_MESSAGE.unpack_from(data, start)
+    return name.rstrip(b"\x00").decode(), competitor_id
+
+
+def unpack_login_message(data: bytes, start: int = 0) -> Tuple[str, str]:
+    """Return the name and secret of a login message."""
+    raw_name, raw_secret = LOGIN_MESSAGE.unpack_from(data, start)
+    return raw_name.rstrip(b"\x00").decode(), raw_secret.rstrip(b"\x00").decode()
+
+
+def unpack_subscribe_message(data: bytes, start: int, length: int) -> Tuple[int, int, int, List[str]]:
+    """Return the operations and instruments bit masks, the flags and the team names of a subscribe message."""
+    operations, instruments, flags = SUBSCRIBE_MESSAGE.unpack_from(data, start)
+    teams = [name.rstrip(b"\x00").decode() for name, in SUBSCRIBE_TEAM.iter_unpack(
+        memoryview(data)[start + SUBSCRIBE_MESSAGE.size:start + length - HEADER.size])]
+    return operations, instruments, flags, teams
+
+
+def unpack_top_of_book_event_message(data: bytes, start: int = 0) -> Tuple:
+    """Return the time, instrument, last traded price and the four parts of a top-of-book event message."""
+    levels = start + TOP_OF_BOOK_EVENT_HEADER.size
+    return (*TOP_OF_BOOK_EVENT_HEADER.unpack_from(data, start),
+            *(BOOK_PART.unpack_from(data, levels + i * BOOK_PART.size) for i in range(4)))
+
+
+def __make_levels_unpacker(header: struct.Struct, part: struct.Struct) -> Callable[[bytes, int], Tuple]:
+    """Return a function that unpacks the header and the four parts of a book or ticks message in place."""
+    header_unpack_from = header.unpack_from
+    part_unpack_from = part.unpack_from
+    ask_prices, ask_volumes, bid_prices, bid_volumes = (header.size + i * part.size for i in range(4))
+
+    def unpack_from(data: bytes, start: int = 0) -> Tuple:
+        instrument, sequence_number = header_unpack_from(data, start)
+        return (instrument, sequence_number, part_unpack_from(data, start + ask_prices),
+                part_unpack_from(data, start + ask_volumes), part_unpack_from(data, start + bid_prices),
+                part_unpack_from(data, start + bid_volumes))
+
+    return unpack_from
+
+
+unpack_order_book_message = __make_levels_unpacker(ORDER_BOOK_HEADER, BOOK_PART)
+unpack_trade_ticks_message = __make_levels_unpacker(TRADE_TICKS_HEADER, TICKS_PART)
+
+# Dispatch tables, indexed by message type, for messages received by each kind of connection
+EXECUTION_REQUEST_DISPATCH_TABLE: DispatchTable = build_dispatch_table({
+    MessageType.AMEND_ORDER: MessageDescriptor(AMEND_MESSAGE_SIZE, 0, AMEND_MESSAGE.unpack_from, "on_amend_message"),
+    MessageType.AMEND_ORDERS: MessageDescriptor(AMEND_MESSAGE_SIZE, AMEND_MESSAGE.size,
+                                                __make_batch_unpacker(AMEND_MESSAGE), "on_amend_messages"),
+    MessageType.CANCEL_ORDERS: MessageDescriptor(CANCEL_MESSAGE_SIZE, CANCEL_MESSAGE.size,
+                                                 __make_batch_unpacker(CANCEL_MESSAGE), "on_cancel_messages"),
+    MessageType.INSERT_ORDERS: MessageDescriptor(INSERT_MESSAGE_SIZE, INSERT_MESSAGE.size,
+                                                 __make_batch_unpacker(INSERT_MESSAGE), "on_insert_messages"),
+    MessageType.CANCEL_ORDER: MessageDescriptor(CANCEL_MESSAGE_SIZE, 0, CANCEL_MESSAGE.unpack_from,
+                                                "on_cancel_message"),
+    MessageType.HEDGE_ORDER: MessageDescriptor(HEDGE_MESSAGE_SIZE, 0, HEDGE_MESSAGE.unpack_from, "on_hedge_message"),
+    MessageType.INSERT_ORDER: MessageDescriptor(INSERT_MESSAGE_SIZE, 0, INSERT_MESSAGE.unpack_from,
+                                                "on_insert_message"),
+    MessageType.REPLACE_ORDER: MessageDescriptor(REPLACE_MESSAGE_SIZE, 0, REPLACE_MESSAGE.unpack_from,
+                                                 "on_replace_message"),
+})
+EXECUTION_RESPONSE_DISPATCH_TABLE: DispatchTable = build_dispatch_table({
+    MessageType.ERROR: MessageDescriptor(ERROR_MESSAGE_SIZE, 0, unpack_error_message, "on_error_message"),
+    MessageType.HEDGE_FILLED: MessageDescriptor(HEDGE_FILLED_MESSAGE_SIZE, 0, HEDGE_FILLED_MESSAGE.unpack_from,
+                                                "on_hedge_filled_message"),
+    MessageType.ORDER_FILLED: MessageDescriptor(ORDER_FILLED_MESSAGE_SIZE, 0, ORDER_FILLED_MESSAGE.unpack_from,
+                                                "on_order_filled_message"),
+    MessageType.ORDER_STATUS: MessageDescriptor(ORDER_STATUS_MESSAGE_SIZE, 0, ORDER_STATUS_MESSAGE.unpack_from,
+                                                "on_order_status_message"),
+})
+HUD_REQUEST_DISPATCH_TABLE: DispatchTable = build_dispatch_table({
+    typ: EXECUTION_REQUEST_DISPATCH_TABLE[typ]
+    for typ in (MessageType.AMEND_ORDER, MessageType.CANCEL_ORDER, MessageType.INSERT_ORDER,
+                MessageType.REPLACE_ORDER)
+})
+HUD_SUBSCRIBE_DISPATCH_TABLE: DispatchTable = build_dispatch_table({
+    MessageType.SUBSCRIBE: MessageDescriptor(SUBSCRIBE_MESSAGE_SIZE, SUBSCRIBE_TEAM.size, unpack_subscribe_message,
+                                             "on_subscribe_message"),
+})
+HUD_EVENT_DISPATCH_TABLE: DispatchTable = build_dispatch_table({
+    MessageType.AMEND_EVENT: MessageDescriptor(AMEND_EVENT_MESSAGE_SIZE, 0, AMEND_EVENT_MESSAGE.unpack_from,
+                                               "on_amend_event_message"),
+    MessageType.CANCEL_EVENT: MessageDescriptor(CANCEL_EVENT_MESSAGE_SIZE, 0, CANCEL_EVENT_MESSAGE.unpack_from,
+                                                "on_cancel_event_message"),
+    MessageType.ERROR: MessageDescriptor(ERROR_MESSAGE_SIZE, 0, unpack_error_message, "on_error_message"),
+    MessageType.HEDGE_EVENT: MessageDescriptor(HEDGE_EVENT_MESSAGE_SIZE, 0, HEDGE_EVENT_MESSAGE.unpack_from,
+                                               "on_hedge_event_message"),
+    MessageType.INSERT_EVENT: MessageDescriptor(INSERT_EVENT_MESSAGE_SIZE, 0, INSERT_EVENT_MESSAGE.unpack_from,
+                                                "on_insert_event_message"),
+    MessageType.LOGIN_EVENT: MessageDescriptor(LOGIN_EVENT_MESSAGE_SIZE, 0, unpack_login_event_message,
+                                               "on_login_event_message"),
+    MessageType.REPLACE_EVENT: MessageDescriptor(REPLACE_EVENT_MESSAGE_SIZE, 0, REPLACE_EVENT_MESSAGE.unpack_from,
+                                                 "on_replace_event_message"),
+    MessageType.TOP_OF_BOOK_EVENT: MessageDescriptor(TOP_OF_BOOK_EVENT_MESSAGE_SIZE, 0,
+                                                     unpack_top_of_book_event_message, "on_top_of_book_event_message"),
+    MessageType.TRADE_EVENT: MessageDescriptor(TRADE_EVENT_MESSAGE_SIZE, 0, TRADE_EVENT_MESSAGE.unpack_from,
+                                               "on_trade_event_message"),
+})
+INFORMATION_DISPATCH_TABLE: DispatchTable = build_dispatch_table({
+    MessageType.ORDER_BOOK_DELTA: MessageDescriptor(ORDER_BOOK_DELTA_HEADER_SIZE + ORDER_BOOK_DELTA_ENTRY.size,
+                                                    ORDER_BOOK_DELTA_ENTRY.size, None, "_on_order_book_delta"),
+    MessageType.ORDER_BOOK_UPDATE: MessageDescriptor(ORDER_BOOK_MESSAGE_SIZE, 0, unpack_order_book_message,
+                                                     "_on_order_book_update"),
+    MessageType.TRADE_TICKS: MessageDescriptor(TRADE_TICKS_MESSAGE_SIZE, 0, unpack_trade_ticks_message,
+                                               "on_trade_ticks_message"),
+})
 
 
 class Connection(asyncio.Protocol):
@@ -197,6 +427,10 @@ class Subscription(asyncio.DatagramProtocol):
         """Callback when the datagram receiver is established."""
         self._receiver_transport = transport
 
+    def datagrams_lost(self, count: int) -> None:
+        """Callback when the subscriber was overtaken and datagrams were missed."""
+        self.__logger.warning("information channel overrun: %d datagrams were missed", count)
+
     def datagram_received(self, data: bytes, address: Tuple[str, int]) -> None:
         """Callback when a datagram is received."""
         if len(data) < HEADER_SIZE:
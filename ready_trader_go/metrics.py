@@ -0,0 +1,233 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import asyncio
+import collections
+import logging
+import os
+import stat
+
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .competitor import CompetitorManager
+from .market_events import MarketEventsReader
+from .match_events import MatchEvent, MatchEvents, MatchEventsWriter
+from .order_book import OrderBook
+from .score_board import ScoreBoardWriter
+from .timer import Timer
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LAG_PROBE_INTERVAL = 0.1  # Seconds between event loop lag measurements
+REQUEST_TIMEOUT = 5.0  # Seconds to wait for a complete request
+
+
+def escape_label_value(value: str) -> str:
+    """Return the given label value escaped for the Prometheus text format."""
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class MetricsWriter:
+    """Build a page of metrics in the Prometheus text exposition format."""
+
+    def __init__(self):
+        """Initialise a new instance of the MetricsWriter class."""
+        self.__lines: List[str] = list()
+
+    def metric(self, name: str, typ: str, help_text: str, samples: Iterable[Tuple[Dict[str, str], float]]) -> None:
+        """Add a metric with the given samples, each of which is a dictionary of labels and a value."""
+        self.__lines.append("# HELP %s %s" % (name, help_text))
+        self.__lines.append("# TYPE %s %s" % (name, typ))
+        for labels, value in samples:
+            if labels:
+                self.__lines.append("%s{%s} %r" % (name, ",".join("%s=\"%s\"" % (k, escape_label_value(v))
+                                                                  for k, v in labels.items()), value))
+            else:
+                self.__lines.append("%s %r" % (name, value))
+
+    def text(self) -> str:
+        """Return the metrics page."""
+        return "\n".join(self.__lines) + "\n"
+
+
+class ExchangeMetrics:
+    """Counters and gauges describing the state of a running exchange simulator.
+
+    Most values are read from the exchange when the metrics are rendered, so
+    collecting them costs nothing between scrapes. Match events are counted
+    as they occur and the lag of the event loop is sampled periodically.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, competitor_manager: CompetitorManager,
+                 match_events: MatchEvents, books: Iterable[OrderBook], market_events_reader: MarketEventsReader,
+                 market_timer: Timer, match_events_writer: MatchEventsWriter, score_board_writer: ScoreBoardWriter):
+        """Initialise a new instance of the ExchangeMetrics class."""
+        self.event_loop_lag: float = 0.0
+        self.event_loop_lag_max: float = 0.0
+
+        self.__books: Tuple[OrderBook, ...] = tuple(books)
+        self.__competitor_manager: CompetitorManager = competitor_manager
+        self.__event_loop: asyncio.AbstractEventLoop = loop
+        self.__lag_probe_handle: Optional[asyncio.TimerHandle] = None
+        self.__market_events_reader: MarketEventsReader = market_events_reader
+        self.__market_timer: Timer = market_timer
+        self.__match_event_counts: Dict[Tuple[str, str], int] = collections.defaultdict(int)
+        self.__match_events_writer: MatchEventsWriter = match_events_writer
+        self.__score_board_writer: ScoreBoardWriter = score_board_writer
+
+        match_events.event_occurred.append(self.on_match_event)
+
+    def on_match_event(self, event: MatchEvent) -> None:
+        """Called when a match event occurs."""
+        self.__match_event_counts[(event.competitor, event.operation.name)] += 1
+
+    def __on_lag_probe(self, expected_time: float) -> None:
+        """Record how late this callback ran and schedule the next one."""
+        now = self.__event_loop.time()
+        self.event_loop_lag = max(now - expected_time, 0.0)
+        if self.event_loop_lag > self.event_loop_lag_max:
+            self.event_loop_lag_max = self.event_loop_lag
+        next_time = now + LAG_PROBE_INTERVAL
+        self.__lag_probe_handle = self.__event_loop.call_at(next_time, self.__on_lag_probe, next_time)
+
+    def render(self) -> str:
+        """Return the current metrics in the Prometheus text exposition format."""
+        writer = MetricsWriter()
+        competitors = sorted(self.__competitor_manager.get_competitors(), key=lambda c: c.name)
+        connected = [c for c in competitors if c.exec_connection is not None]
+
+        writer.metric("rtg_execution_messages_total", "counter",
+                      "Execution messages handled for each competitor.",
+                      (({"competitor": c.name}, c.message_count) for c in competitors))
+        writer.metric("rtg_competitor_connected", "gauge", "Whether each competitor is connected.",
+                      (({"competitor": c.name}, int(c.exec_connection is not None)) for c in competitors))
+        writer.metric("rtg_message_frequency", "gauge",
+                      "Messages counted against the message frequency limit as at each competitor's last message.",
+                      (({"competitor": c.name}, c.exec_connection.frequency_limiter.value) for c in connected))
+        writer.metric("rtg_message_frequency_headroom", "gauge",
+                      "Messages each competitor could send before breaching the message frequency limit.",
+                      (({"competitor": c.name}, max(c.exec_connection.frequency_limiter.limit
+                                                    - c.exec_connection.frequency_limiter.value, 0))
+                       for c in connected))
+        writer.metric("rtg_active_orders", "gauge", "Orders each competitor has in the order books.",
+                      (({"competitor": c.name}, len(c.orders)) for c in competitors))
+        writer.metric("rtg_active_volume", "gauge", "Volume of each competitor's orders in the order books.",
+                      (({"competitor": c.name}, c.active_volume) for c in competitors))
+        writer.metric("rtg_match_events_total", "counter",
+                      "Match events by competitor (empty for market events) and operation.",
+                      (({"competitor": name, "operation": operation}, count)
+                       for (name, operation), count in sorted(self.__match_event_counts.items())))
+
+        depths = [(book.instrument.name, book.depth()) for book in self.__books]
+        writer.metric("rtg_book_levels", "gauge", "Price levels in each order book.",
+                      (sample for instrument, (ask_levels, _, bid_levels, _) in depths
+                       for sample in (({"instrument": instrument, "side": "ask"}, ask_levels),
+                                      ({"instrument": instrument, "side": "bid"}, bid_levels))))
+        writer.metric("rtg_book_volume", "gauge", "Total volume in each order book.",
+                      (sample for instrument, (_, ask_volume, _, bid_volume) in depths
+                       for sample in (({"instrument": instrument, "side": "ask"}, ask_volume),
+                                      ({"instrument": instrument, "side": "bid"}, bid_volume))))
+
+        writer.metric("rtg_writer_queue_length", "gauge", "Records waiting to be written by each writer thread.",
+                      (({"writer": "match_events"}, self.__match_events_writer.queue.qsize()),
+                       ({"writer": "score_board"}, self.__score_board_writer.queue.qsize())))
+        writer.metric("rtg_market_events_queued", "gauge", "Market events read ahead by the market data reader.",
+                      (({}, self.__market_events_reader.queue.qsize()),))
+        next_event = self.__market_events_reader.next_event
+        backlog = max(self.__market_timer.advance() - next_event.time, 0.0) if next_event is not None else 0.0
+        writer.metric("rtg_market_events_backlog_seconds", "gauge",
+                      "Match time by which the next market event is overdue.", (({}, backlog),))
+
+        writer.metric("rtg_event_loop_lag_seconds", "gauge", "Most recently measured event loop scheduling lag.",
+                      (({}, self.event_loop_lag),))
+        writer.metric("rtg_event_loop_lag_max_seconds", "gauge", "Largest measured event loop scheduling lag.",
+                      (({}, self.event_loop_lag_max),))
+        return writer.text()
+
+    def start(self) -> None:
+        """Start measuring the lag of the event loop."""
+        expected_time = self.__event_loop.time() + LAG_PROBE_INTERVAL
+        self.__lag_probe_handle = self.__event_loop.call_at(expected_time, self.__on_lag_probe, expected_time)
+
+    def stop(self) -> None:
+        """Stop measuring the lag of the event loop."""
+        if self.__lag_probe_handle is not None:
+            self.__lag_probe_handle.cancel()
+            self.__lag_probe_handle = None
+
+
+class MetricsServer:
+    """An HTTP server for metrics in the Prometheus text exposition format.
+
+    The server listens on either a TCP host and port or, if a path is given,
+    a Unix domain socket, and answers every GET request for "/" or
+    "/metrics" with the text returned by the render callback.
+    """
+
+    def __init__(self, host: Optional[str], port: Optional[int], path: Optional[str], render: Callable[[], str]):
+        """Initialise a new instance of the MetricsServer class."""
+        self.host: Optional[str] = host
+        self.path: Optional[str] = path
+        self.port: Optional[int] = port
+
+        self.__logger: logging.Logger = logging.getLogger("METRICS")
+        self.__render: Callable[[], str] = render
+        self.__server: Optional[asyncio.AbstractServer] = None
+
+    def close(self) -> None:
+        """Close the server."""
+        if self.__server is not None:
+            self.__server.close()
+
+    async def __on_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer a single request from a client."""
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), REQUEST_TIMEOUT)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+            writer.close()
+            return
+
+        method, _, rest = request.partition(b" ")
+        target = rest.split(b" ", 1)[0].split(b"?", 1)[0]
+        if method not in (b"GET", b"HEAD"):
+            status, content_type, body = "405 Method Not Allowed", "text/plain", b"method not allowed\n"
+        elif target not in (b"/", b"/metrics"):
+            status, content_type, body = "404 Not Found", "text/plain", b"not found\n"
+        else:
+            status, content_type, body = "200 OK", CONTENT_TYPE, self.__render().encode()
+
+        writer.write(("HTTP/1.1 %s\r\nContent-Type: %s\r\nContent-Length: %d\r\nConnection: close\r\n\r\n"
+                      % (status, content_type, len(body))).encode())
+        if method != b"HEAD":
+            writer.write(body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def start(self) -> None:
+        """Start the server."""
+        if self.path is not None:
+            self.__logger.info("starting metrics server: path=%s", self.path)
+            # Remove a socket left behind by an earlier exchange
+            if os.path.exists(self.path) and stat.S_ISSOCK(os.stat(self.path).st_mode):
+                os.unlink(self.path)
+            self.__server = await asyncio.start_unix_server(self.__on_client, self.path)
+        else:
+            self.__logger.info("starting metrics server: host=%s port=%d", self.host, self.port)
+            self.__server = await asyncio.start_server(self.__on_client, self.host, self.port)
@@ -0,0 +1,142 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import asyncio
+import collections
+import json
+import logging
+import sys
+import threading
+import time
+
+from typing import Any, Counter, Dict, Optional, Tuple
+
+from .instrumentation import LatencyHistogram
+
+
+DEFAULT_MONITOR_INTERVAL = 0.05  # Seconds between event loop lag measurements
+DEFAULT_SLOW_CALLBACK_THRESHOLD = 0.1  # Seconds for which the event loop may be blocked before it is sampled
+MAXIMUM_REPORTED_STACKS = 50
+SAMPLES_PER_THRESHOLD = 4
+
+
+def _frame_stack(frame: Any) -> Tuple[str, ...]:
+    """Return the call stack ending at the given frame, outermost call first."""
+    stack = list()
+    while frame is not None:
+        code = frame.f_code
+        stack.append("%s (%s:%d)" % (code.co_name, code.co_filename, frame.f_lineno))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+class EventLoopMonitor:
+    """Measure the scheduling lag of an event loop and sample slow callbacks.
+
+    A probe scheduled on the event loop every interval records how late it
+    runs. A watchdog thread checks that the probe keeps running and, while
+    the event loop has been blocked for longer than the threshold, samples
+    the stack of the event loop thread so that the code responsible for the
+    delay can be found. The watchdog wakes a few times per threshold, but
+    while the event loop is healthy it only compares the time of the last
+    probe with the clock, so the monitor is cheap enough to leave running
+    during a match.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, filename: str,
+                 interval: float = DEFAULT_MONITOR_INTERVAL, threshold: float = DEFAULT_SLOW_CALLBACK_THRESHOLD):
+        """Initialise a new instance of the EventLoopMonitor class."""
+        self.filename: str = filename
+        self.interval: float = interval
+        self.lags: LatencyHistogram = LatencyHistogram()
+        self.slow_callback_count: int = 0
+        self.stack_samples: Counter[Tuple[str, ...]] = collections.Counter()
+        self.threshold: float = threshold
+
+        self.__event_loop: asyncio.AbstractEventLoop = loop
+        self.__heartbeat: float = 0.0
+        self.__logger: logging.Logger = logging.getLogger("MONITOR")
+        self.__probe_handle: Optional[asyncio.TimerHandle] = None
+        self.__samples_lock: threading.Lock = threading.Lock()
+        self.__stopping: threading.Event = threading.Event()
+        self.__thread_id: int = 0
+        self.__watchdog: Optional[threading.Thread] = None
+
+    def __on_probe(self, expected_time: float) -> None:
+        """Record how late this callback ran and schedule the next one."""
+        now = time.monotonic()
+        lag = now - expected_time
+        self.lags.record(int(lag * 1e9))
+        if lag > self.threshold:
+            self.slow_callback_count += 1
+            self.__logger.warning("event loop was blocked for %.3f seconds", lag)
+        self.__heartbeat = now
+        self.__probe_handle = self.__event_loop.call_later(self.interval, self.__on_probe, now + self.interval)
+
+    def report(self) -> Dict[str, Any]:
+        """Return the lag summary and the most common stack samples."""
+        with self.__samples_lock:
+            samples = self.stack_samples.most_common(MAXIMUM_REPORTED_STACKS)
+        return {"interval": self.interval,
+                "threshold": self.threshold,
+                "lag": self.lags.summary(),
+                "slow_callbacks": self.slow_callback_count,
+                "stack_samples": [{"count": count, "stack": list(stack)} for stack, count in samples]}
+
+    def start(self) -> None:
+        """Start monitoring the event loop, which must belong to the calling thread."""
+        self.__thread_id = threading.get_ident()
+        self.__heartbeat = time.monotonic()
+        self.__probe_handle = self.__event_loop.call_later(self.interval, self.__on_probe,
+                                                           self.__heartbeat + self.interval)
+        self.__watchdog = threading.Thread(target=self.__watch, daemon=True, name="monitor")
+        self.__watchdog.start()
+
+    def stop(self) -> None:
+        """Stop monitoring the event loop and write the profile file."""
+        if self.__probe_handle is not None:
+            self.__probe_handle.cancel()
+            self.__probe_handle = None
+        if self.__watchdog is not None:
+            self.__stopping.set()
+            self.__watchdog.join()
+            self.__watchdog = None
+        self.write_report(self.filename)
+
+    def __watch(self) -> None:
+        """Sample the stack of the event loop thread while it is blocked."""
+        sample_interval = self.threshold / SAMPLES_PER_THRESHOLD
+        while not self.__stopping.wait(sample_interval):
+            if time.monotonic() - self.__heartbeat - self.interval > self.threshold:
+                frame = sys._current_frames().get(self.__thread_id)
+                if frame is not None:
+                    stack = _frame_stack(frame)
+                    with self.__samples_lock:
+                        self.stack_samples[stack] += 1
+                del frame
+
+    def write_report(self, filename: str) -> None:
+        """Write the lag summary and the most common stack samples to the named file as JSON."""
+        try:
+            with open(filename, "w") as report_file:
+                json.dump(self.report(), report_file, indent=2)
+        except IOError as e:
+            self.__logger.error("failed to write event loop profile: filename=%s", filename, exc_info=e)
+        else:
+            self.__logger.info("event loop profile written to %s: slow_callbacks=%d", filename,
+                               self.slow_callback_count)
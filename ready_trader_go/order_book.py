@@ -45,6 +45,10 @@ class IOrderListener(object):
         """Called when the order is partially or completely filled."""
         pass
 
+    def on_order_replaced(self, now: float, order, old_price: int, old_remaining_volume: int) -> None:
+        """Called when the order's price or remaining volume is replaced."""
+        pass
+
 
 class Order(object):
     """A request to buy or sell at a given price."""
@@ -132,6 +136,12 @@ class OrderBook(object):
             if order.listener:
                 order.listener.on_order_cancelled(now, order, remaining)
 
+    def depth(self) -> Tuple[int, int, int, int]:
+        """Return the number of price levels and total volume of the asks, then of the bids."""
+        total_volumes = self.__total_volumes
+        return (len(self.__ask_prices), sum(total_volumes[-p] for p in self.__ask_prices),
+                len(self.__bid_prices), sum(total_volumes[p] for p in self.__bid_prices))
+
     def insert(self, now: float, order: Order) -> None:
         """Insert a new order into this order book."""
         if order.side == Side.SELL and self.__bid_prices and order.price <= self.__bid_prices[-1]:
@@ -160,6 +170,12 @@ class OrderBook(object):
 
     def place(self, now: float, order: Order) -> None:
         """Place an order that does not match any existing order in this order book."""
+        self.__add_to_level(order)
+        if order.listener:
+            order.listener.on_order_placed(now, order)
+
+    def __add_to_level(self, order: Order) -> None:
+        """Add an order to the back of the queue at its price level."""
         price = order.price
 
         if price not in self.__levels:
@@ -173,9 +189,6 @@ class OrderBook(object):
         self.__levels[price].append(order)
         self.__total_volumes[price] += order.remaining_volume
 
-        if order.listener:
-            order.listener.on_order_placed(now, order)
-
     def remove_volume_from_level(self, price: int, volume: int, side: Side) -> None:
         if self.__total_volumes[price] == volume:
             del self.__levels[price]
@@ -187,6 +200,49 @@ class OrderBook(object):
         else:
             self.__total_volumes[price] -= volume
 
+    def replace(self, now: float, order: Order, new_price: int, new_remaining_volume: int) -> None:
+        """Atomically move an order to a new price and/or change its remaining volume.
+
+        An order whose price is unchanged and whose remaining volume does not
+        increase keeps its queue position, otherwise it loses its priority
+        and may trade immediately if the new price crosses the spread.
+        """
+        if order.remaining_volume == 0:
+            return
+
+        old_price: int = order.price
+        old_remaining: int = order.remaining_volume
+
+        if new_price == old_price and new_remaining_volume <= old_remaining:
+            diff = old_remaining - new_remaining_volume
+            if diff:
+                self.remove_volume_from_level(old_price, diff, order.side)
+            order.volume -= diff
+            order.remaining_volume = new_remaining_volume
+            if order.listener:
+                order.listener.on_order_replaced(now, order, old_price, old_remaining)
+            return
+
+        # The order must leave its queue now since, unlike a cancelled order,
+        # it will be live again and so cannot be skipped lazily by trade_level
+        self.remove_volume_from_level(old_price, old_remaining, order.side)
+        if old_price in self.__levels:
+            self.__levels[old_price].remove(order)
+
+        order.volume += new_remaining_volume - old_remaining
+        order.price = new_price
+        order.remaining_volume = new_remaining_volume
+        if order.listener:
+            order.listener.on_order_replaced(now, order, old_price, old_remaining)
+
+        if order.side == Side.SELL and self.__bid_prices and new_price <= self.__bid_prices[-1]:
+            self.trade_ask(now, order)
+        elif order.side == Side.BUY and self.__ask_prices and new_price >= -self.__ask_prices[-1]:
+            self.trade_bid(now, order)
+
+        if order.remaining_volume > 0:
+            self.__add_to_level(order)
+
     def top_levels(self, ask_prices: List[int], ask_volumes: List[int], bid_prices: List[int],
                    bid_volumes: List[int]) -> None:
         """Populate the supplied lists with the top levels for this book."""
@@ -16,35 +16,98 @@
 #     License along with Ready Trader Go.  If not, see
 #     <https://www.gnu.org/licenses/>.
 import asyncio
+import ipaddress
 import mmap
 import os
 import struct
 
 from typing import Coroutine, Optional, Tuple, Union
 
+from .util import create_datagram_endpoint
+
 BUFFER_SIZE = 8192
-FRAME_HEADER_SIZE = 8
+FRAME_HEADER = struct.Struct("!III")  # Sequence number, generation and payload length
+FRAME_HEADER_SIZE = FRAME_HEADER.size
 FRAME_SIZE = 128
 MAXIMUM_PAYLOAD_LENGTH = FRAME_SIZE - FRAME_HEADER_SIZE
+SEQUENCE_NUMBER = struct.Struct("!I")
+SEQUENCE_NUMBER_SIZE = SEQUENCE_NUMBER.size
+
+# A memory mapped file starts with a layout header (padded to the size of a
+# frame) followed by the ring of frames. Readers must check the magic number
+# and layout version before reading any frames. The header starts with four
+# zero bytes so that a reader built for the old layout, which waits for a
+# non-zero first byte, stalls on it rather than reading it as a frame.
+LAYOUT_HEADER = struct.Struct("!4x4sIII")  # Magic number, layout version, frame size and ring size
+LAYOUT_MAGIC = b"RTGI"
+LAYOUT_VERSION = 2
+
+DEFAULT_INTERFACE = "0.0.0.0"
+DEFAULT_TIME_TO_LIVE = 1
+
+
+def validate_buffer_size(buffer_size: int) -> None:
+    """Raise a ValueError if the buffer size is unsuitable for a ring of frames."""
+    if buffer_size < 2 * FRAME_SIZE or buffer_size & (buffer_size - 1) != 0:
+        raise ValueError("buffer size must be a power of two and at least %d bytes" % (2 * FRAME_SIZE))
+
+
+def pack_layout_header(buffer_size: int) -> bytes:
+    """Return the layout header, padded to the size of a frame, for a ring of the given size."""
+    return LAYOUT_HEADER.pack(LAYOUT_MAGIC, LAYOUT_VERSION, FRAME_SIZE, buffer_size).ljust(FRAME_SIZE, b"\x00")
+
+
+def unpack_layout_header(buffer: Union[mmap.mmap, memoryview]) -> int:
+    """Return the size of the ring that follows the layout header, or raise a ValueError if it is unsupported."""
+    if len(buffer) < FRAME_SIZE:
+        raise ValueError("file is too small to hold a layout header")
+    magic, version, frame_size, buffer_size = LAYOUT_HEADER.unpack_from(buffer)
+    if magic != LAYOUT_MAGIC:
+        raise ValueError("file is not a Ready Trader Go information file (or uses a frame layout before version %d)"
+                         % LAYOUT_VERSION)
+    if version != LAYOUT_VERSION or frame_size != FRAME_SIZE:
+        raise ValueError("file uses frame layout version %d with %d byte frames, but version %d with %d byte frames"
+                         " is required" % (version, frame_size, LAYOUT_VERSION, FRAME_SIZE))
+    if buffer_size != len(buffer) - FRAME_SIZE:
+        raise ValueError("ring size in layout header does not match the size of the file")
+    return buffer_size
+
+
+def parse_multicast_address(name: str) -> Tuple[str, int]:
+    """Return the group and port of a multicast address of the form 'group:port'."""
+    group, sep, port = name.rpartition(":")
+    if not sep or not port.isdigit() or not 0 < int(port) < 65536:
+        raise ValueError("multicast address must be of the form 'group:port'")
+    if not ipaddress.ip_address(group).is_multicast:
+        raise ValueError("'%s' is not a multicast group address" % group)
+    return group, int(port)
 
 
 class Publisher(asyncio.WriteTransport):
     """Publisher side of a datagram transport based on shared memory.
 
     Transport is achieved through the use of memory mapped files or shared
-    memory blocks. There must be an interval between writes to permit
-    subscribers to read the data before it is overwritten.
+    memory blocks arranged as a ring of fixed size frames. Each frame carries
+    a sequence number and the generation (i.e. the number of times the
+    publisher has wrapped around the ring) so that subscribers which fall
+    more than a ring behind can detect that they have been overtaken.
     """
-    __slots__ = ("__pack_into", "_buffer", "_closed", "_pos")
+    __slots__ = ("__pack_sequence", "__pack_header", "_buffer", "_closed", "_generation", "_mask", "_pos",
+                 "_sequence")
 
     def __init__(self, buffer: Union[mmap.mmap, memoryview], protocol: asyncio.BaseProtocol):
         super().__init__()
+        validate_buffer_size(len(buffer))
         self._buffer: Optional[Union[mmap.mmap, memoryview]] = buffer
         self._closed: bool = False
+        self._generation: int = 1
+        self._mask: int = len(buffer) - 1
         self._pos: int = 0
+        self._sequence: int = 0
         asyncio.get_event_loop().call_soon(protocol.connection_made, self)
 
-        self.__pack_into = struct.Struct("!I").pack_into
+        self.__pack_header = FRAME_HEADER.pack_into
+        self.__pack_sequence = SEQUENCE_NUMBER.pack_into
 
     def __del__(self):
         if not self._closed:
@@ -70,31 +133,41 @@ class Publisher(asyncio.WriteTransport):
         if self._closed:
             return
 
-        # Each frame contains a spinlock (4 bytes), payload length (4 bytes)
-        # and payload (up to 120 bytes).
+        # Each frame contains a sequence number (4 bytes), generation (4
+        # bytes), payload length (4 bytes) and payload (up to 116 bytes). The
+        # sequence number is cleared while the frame is being written and
+        # set last, so it doubles as the spinlock for subscribers.
         pos = self._pos
-        self.__pack_into(self._buffer, pos + 4, len(data))
+        buffer = self._buffer
+        sequence = self._sequence = self._sequence + 1
+        self.__pack_header(buffer, pos, 0, self._generation, len(data))
         start: int = pos + FRAME_HEADER_SIZE
-        self._buffer[start:start + len(data)] = bytes(data)
-        self._pos = (pos + FRAME_SIZE) & (BUFFER_SIZE - 1)
-        self._buffer[self._pos] = 0
-        self._buffer[pos] = 1
+        buffer[start:start + len(data)] = bytes(data)
+        self.__pack_sequence(buffer, pos, sequence)
+        self._pos = (pos + FRAME_SIZE) & self._mask
+        if self._pos == 0:
+            self._generation += 1
 
 
 class MmapPublisher(Publisher):
-    """A publisher based on a memory mapped file."""
-    __slots__ = ("__fileno",)
+    """A publisher based on a memory mapped file that starts with a layout header."""
+    __slots__ = ("__fileno", "__mmap")
 
     def __init__(self, fileno: int, mm: mmap.mmap, protocol: asyncio.BaseProtocol):
-        super().__init__(mm, protocol)
+        super().__init__(memoryview(mm)[FRAME_SIZE:], protocol)
         self.__fileno: Optional[int] = fileno
+        self.__mmap: Optional[mmap.mmap] = mm
 
     def close(self) -> None:
         """Close the publisher."""
         super().close()
-        if self._buffer:
-            self._buffer.close()
+        # The view of the ring must be released before the mmap can be closed
+        if self._buffer is not None:
+            self._buffer.release()
             self._buffer = None
+        if self.__mmap:
+            self.__mmap.close()
+            self.__mmap = None
         if self.__fileno:
             os.close(self.__fileno)
             self.__fileno = None
@@ -104,41 +177,104 @@ class Subscriber(asyncio.DatagramTransport):
     """Subscriber side of a datagram transport based on shared memory.
 
     Transport is achieved through the use of memory mapped files or shared
-    memory blocks. An interval between writes gives subscribers time to read
-    the data before it is overwritten and the subscriber polls the shared
-    memory in order to pick up changes as soon as possible.
+    memory blocks. The subscriber polls the shared memory in order to pick up
+    changes as soon as possible.
+
+    If the publisher laps the subscriber, the subscriber resumes from the
+    oldest frame still in the ring and calls the protocol's datagrams_lost
+    method with the number of datagrams that were missed. If the protocol
+    has no such method, the connection is lost instead.
+
+    With zero_copy set, datagrams are delivered as a memoryview into the
+    shared memory rather than as a copy. The memoryview is released as soon
+    as datagram_received returns, so protocols must not keep a reference to
+    it. Zero copy is unsafe if the subscriber can be overrun: a frame that
+    the publisher overwrites while it is being handled is still handled,
+    and only afterwards is datagrams_lost called, so whatever the protocol
+    did with the torn frame cannot be undone. It is therefore off by default.
     """
-    __slots__ = ("_task", "_closed", "_protocol")
+    __slots__ = ("_task", "_closed", "_protocol", "_view")
 
     def __init__(self, buffer: Union[mmap.mmap, memoryview], from_addr: Tuple[str, int],
-                 protocol: asyncio.DatagramProtocol):
+                 protocol: asyncio.DatagramProtocol, zero_copy: bool = False):
         super().__init__()
+        validate_buffer_size(len(buffer))
         self._closed: bool = False
         self._protocol: asyncio.DatagramProtocol = protocol
+        self._view: Optional[memoryview] = memoryview(buffer) if zero_copy else None
 
-        coro: Coroutine = self._subscribe_worker(buffer, from_addr, protocol)
+        coro: Coroutine = self._subscribe_worker(buffer, from_addr, protocol, zero_copy)
         self._task: asyncio.Task = asyncio.ensure_future(coro)
 
     async def _subscribe_worker(self, buffer: Union[mmap.mmap, memoryview],
                                 from_addr: Tuple[str, int],
-                                protocol: asyncio.DatagramProtocol) -> None:
-        mask: int = BUFFER_SIZE - 1
-        unpack_from = struct.Struct("!I").unpack_from
+                                protocol: asyncio.DatagramProtocol, zero_copy: bool) -> None:
+        view: Optional[memoryview] = self._view
+        frame_count: int = len(buffer) // FRAME_SIZE
+        mask: int = len(buffer) - 1
+        unpack_header = FRAME_HEADER.unpack_from
+        unpack_sequence = SEQUENCE_NUMBER.unpack_from
+        datagrams_lost = getattr(protocol, "datagrams_lost", None)
         protocol.connection_made(self)
 
         try:
             pos: int = 0
+            expected: int = 1
             while not self._closed:
-                while buffer[pos] == 0:
+                sequence, = unpack_sequence(buffer, pos)
+                while sequence < expected:
                     await asyncio.sleep(0.0)
-                length, = unpack_from(buffer, pos + 4)
+                    sequence, = unpack_sequence(buffer, pos)
+
+                header_sequence, generation, length = unpack_header(buffer, pos)
                 start: int = pos + FRAME_HEADER_SIZE
-                protocol.datagram_received(buffer[start:start + length], from_addr)
+                data: Optional[bytes] = None if zero_copy else bytes(buffer[start:start + length])
+
+                # The frame is only intact if it was not overwritten while it
+                # was being copied, otherwise go around again and wait for
+                # the publisher to finish writing it.
+                if (header_sequence != sequence or generation != (sequence - 1) // frame_count + 1
+                        or unpack_sequence(buffer, pos)[0] != sequence):
+                    await asyncio.sleep(0.0)
+                    continue
+
+                if sequence != expected:
+                    # The publisher has lapped this subscriber, so resume from
+                    # the oldest frame in the ring (which follows this one).
+                    resume: int = sequence - frame_count + 1
+                    if datagrams_lost is None:
+                        raise BufferError("subscriber overrun: missed %d datagrams" % (resume - expected))
+                    datagrams_lost(resume - expected)
+                    pos = (pos + FRAME_SIZE) & mask
+                    expected = resume
+                    continue
+
+                if zero_copy:
+                    with view[start:start + length] as frame:
+                        protocol.datagram_received(frame, from_addr)
+                    # The protocol read the frame in place, so if it was
+                    # overwritten in the meantime what was read may be torn.
+                    if unpack_sequence(buffer, pos)[0] != sequence:
+                        if datagrams_lost is None:
+                            raise BufferError("subscriber overrun: frame overwritten while it was being read")
+                        datagrams_lost(1)
+                else:
+                    protocol.datagram_received(data, from_addr)
+
                 pos = (pos + FRAME_SIZE) & mask
+                expected += 1
         except asyncio.CancelledError:
             self._protocol.connection_lost(None)
         except Exception as e:
             self._protocol.connection_lost(e)
+        finally:
+            self._release_view()
+
+    def _release_view(self) -> None:
+        """Release the zero-copy view of the buffer so that the buffer can be closed."""
+        if self._view is not None:
+            self._view.release()
+            self._view = None
 
     def abort(self) -> None:
         """Close the transport immediately."""
@@ -165,20 +301,30 @@ class Subscriber(asyncio.DatagramTransport):
 
 
 class MmapSubscriber(Subscriber):
-    """A subscriber based on a memory mapped file."""
-    __slots__ = ("__fileno", "__mmap")
+    """A subscriber based on a memory mapped file that starts with a layout header."""
+    __slots__ = ("__fileno", "__mmap", "__ring")
 
     def __init__(self, fileno: int, buffer: mmap.mmap, from_addr: Tuple[str, int],
-                 protocol: Optional[asyncio.DatagramProtocol] = None):
-        super().__init__(buffer, from_addr, protocol)
+                 protocol: Optional[asyncio.DatagramProtocol] = None, zero_copy: bool = False):
+        unpack_layout_header(buffer)
+        ring = memoryview(buffer)[FRAME_SIZE:]
+        super().__init__(ring, from_addr, protocol, zero_copy)
         self.__fileno: Optional[int] = fileno
         self.__mmap: Optional[mmap.mmap] = buffer
+        self.__ring: Optional[memoryview] = ring
         self._task.add_done_callback(lambda _: self.__close_mmap())
 
     def __del__(self):
         self.__close_mmap()
 
     def __close_mmap(self):
+        # The view must be released first or the mmap cannot be closed. Do not
+        # rely on the worker to do it: it may never finish (for example, if
+        # the event loop is stopped while it is waiting for a frame).
+        self._release_view()
+        if self.__ring is not None:
+            self.__ring.release()
+            self.__ring = None
         if self.__mmap:
             self.__mmap.close()
             self.__mmap = None
@@ -187,14 +333,168 @@ class MmapSubscriber(Subscriber):
             self.__fileno = None
 
 
+class MulticastPublisher(asyncio.WriteTransport):
+    """Publisher side of a datagram transport based on UDP multicast.
+
+    Each datagram is prefixed with a sequence number so that subscribers can
+    detect datagrams that were dropped by the network.
+    """
+    __slots__ = ("_closed", "_sequence", "_transport")
+
+    def __init__(self, group_addr: Tuple[str, int], interface: str, ttl: int, protocol: asyncio.BaseProtocol):
+        super().__init__()
+        self._closed: bool = False
+        self._sequence: int = 0
+        self._transport: Optional[asyncio.DatagramTransport] = None
+
+        coro: Coroutine = self._create_endpoint(group_addr, interface, ttl, protocol)
+        asyncio.ensure_future(coro)
+
+    async def _create_endpoint(self, group_addr: Tuple[str, int], interface: str, ttl: int,
+                               protocol: asyncio.BaseProtocol) -> None:
+        transport, _ = await create_datagram_endpoint(asyncio.get_event_loop(), asyncio.DatagramProtocol,
+                                                      remote_addr=group_addr, interface=interface, ttl=ttl)
+        if self._closed:
+            transport.close()
+            return
+        self._transport = transport
+        protocol.connection_made(self)
+
+    def abort(self) -> None:
+        """Close the publisher immediately."""
+        self.close()
+
+    def can_write_eof(self) -> bool:
+        """Return False. Publisher's don't support writing EOF."""
+        return False
+
+    def close(self) -> None:
+        """Close the publisher."""
+        self._closed = True
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+
+    def write(self, data: Union[bytearray, bytes, memoryview]) -> None:
+        """Publish the provided data."""
+        if len(data) > MAXIMUM_PAYLOAD_LENGTH:
+            raise ValueError("payload is longer than maximum payload length")
+
+        if self._closed or self._transport is None:
+            return
+
+        self._sequence += 1
+        self._transport.sendto(SEQUENCE_NUMBER.pack(self._sequence) + data)
+
+
+class MulticastSubscriber(asyncio.DatagramTransport, asyncio.DatagramProtocol):
+    """Subscriber side of a datagram transport based on UDP multicast.
+
+    The subscriber is the protocol for the underlying multicast socket and
+    the transport for the subscribing protocol. Sequence numbers are
+    stripped from each datagram before it is passed on. When a gap in the
+    sequence is seen, the protocol's datagrams_lost method is called with
+    the number of datagrams that were missed (or, if the protocol has no
+    such method, the connection is lost). Datagrams that arrive after a
+    later one has been delivered are discarded.
+    """
+    __slots__ = ("_closed", "_error", "_expected", "_protocol", "_transport")
+
+    def __init__(self, group_addr: Tuple[str, int], interface: str, protocol: asyncio.DatagramProtocol):
+        super().__init__()
+        self._closed: bool = False
+        self._error: Optional[Exception] = None
+        self._expected: int = 0
+        self._protocol: asyncio.DatagramProtocol = protocol
+        self._transport: Optional[asyncio.DatagramTransport] = None
+
+        coro: Coroutine = create_datagram_endpoint(asyncio.get_event_loop(), lambda: self, local_addr=group_addr,
+                                                   interface=interface)
+        asyncio.ensure_future(coro)
+
+    def connection_made(self, transport: asyncio.DatagramTransport) -> None:
+        """Called when the multicast socket is established."""
+        if self._closed:
+            transport.close()
+            return
+        self._transport = transport
+        self._protocol.connection_made(self)
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        """Called when the multicast socket is closed."""
+        self._transport = None
+        self._closed = True
+        self._protocol.connection_lost(exc if exc is not None else self._error)
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        """Called when a datagram is received on the multicast socket."""
+        if self._closed or len(data) < SEQUENCE_NUMBER_SIZE:
+            return
+
+        sequence, = SEQUENCE_NUMBER.unpack_from(data)
+        if sequence < self._expected:
+            return
+
+        if self._expected and sequence != self._expected:
+            datagrams_lost = getattr(self._protocol, "datagrams_lost", None)
+            if datagrams_lost is None:
+                self._error = BufferError("subscriber overrun: missed %d datagrams" % (sequence - self._expected))
+                self._transport.close()
+                return
+            datagrams_lost(sequence - self._expected)
+
+        self._expected = sequence + 1
+        self._protocol.datagram_received(data[SEQUENCE_NUMBER_SIZE:], addr)
+
+    def error_received(self, exc: Exception) -> None:
+        """Called when a send or receive operation on the multicast socket fails."""
+        self._protocol.error_received(exc)
+
+    def abort(self) -> None:
+        """Close the transport immediately."""
+        self.close()
+
+    def is_closing(self):
+        """Return True if the subscriber is closing or is closed."""
+        return self._closed
+
+    def close(self) -> None:
+        """Close the subscriber."""
+        if not self._closed:
+            self._closed = True
+            if self._transport:
+                self._transport.close()
+
+    def get_protocol(self) -> asyncio.DatagramProtocol:
+        """Return the current protocol."""
+        return self._protocol
+
+    def sendto(self, data: Union[bytearray, bytes, memoryview],
+               addr: Optional[Tuple[str, int]] = None) -> None:
+        """Send data to the transport."""
+        raise RuntimeError("Attempt to write to a Subscriber (a read-only transport)")
+
+
 class PublisherFactory:
     """A factory class for Publisher instances."""
-    def __init__(self, typ: str, name: str):
-        if typ not in ("mmap", "shm"):
-            raise ValueError("type must be either 'mmap' or 'shm'")
+    def __init__(self, typ: str, name: str, buffer_size: int = BUFFER_SIZE, interface: str = DEFAULT_INTERFACE,
+                 ttl: int = DEFAULT_TIME_TO_LIVE):
+        if typ not in ("mmap", "multicast", "shm"):
+            raise ValueError("type must be one of 'mmap', 'multicast' or 'shm'")
+        if typ == "multicast":
+            parse_multicast_address(name)
+        validate_buffer_size(buffer_size)
+        self.__buffer_size: int = buffer_size
+        self.__interface: str = interface
+        self.__ttl: int = ttl
         self.__typ: str = typ
         self.__name: str = name
 
+    @property
+    def buffer_size(self):
+        """Return the size of the ring buffer for this publisher factory."""
+        return self.__buffer_size
+
     @property
     def name(self):
         """Return the name for this publisher factory."""
@@ -205,21 +505,30 @@ class PublisherFactory:
         """Return the type for this publisher factory."""
         return self.__typ
 
-    def create(self, protocol: asyncio.BaseProtocol) -> Publisher:
+    def create(self, protocol: asyncio.BaseProtocol) -> Union[Publisher, MulticastPublisher]:
         """Create a new Publisher instance."""
+        if self.__typ == "multicast":
+            return MulticastPublisher(parse_multicast_address(self.__name), self.__interface, self.__ttl, protocol)
         if self.__typ == "mmap":
+            # The layout header is written with the empty ring so that a
+            # subscriber never sees the file without it
+            file_size: int = FRAME_SIZE + self.__buffer_size
             fileno = os.open(self.__name, os.O_CREAT | os.O_RDWR)
-            os.write(fileno, b"\x00" * BUFFER_SIZE)
-            buffer = mmap.mmap(fileno, BUFFER_SIZE, access=mmap.ACCESS_WRITE)
+            os.write(fileno, pack_layout_header(self.__buffer_size) + b"\x00" * self.__buffer_size)
+            os.ftruncate(fileno, file_size)
+            buffer = mmap.mmap(fileno, file_size, access=mmap.ACCESS_WRITE)
             return MmapPublisher(fileno, buffer, protocol)
-        raise RuntimeError("PublisherFactory type was not 'mmap'")
+        raise RuntimeError("PublisherFactory type was not 'mmap' or 'multicast'")
 
 
 class SubscriberFactory:
     """A factory class for Subscribers."""
-    def __init__(self, typ: str, name: str):
-        if typ not in ("mmap", "shm"):
-            raise ValueError("type must be either 'mmap' or 'shm'")
+    def __init__(self, typ: str, name: str, interface: str = DEFAULT_INTERFACE):
+        if typ not in ("mmap", "multicast", "shm"):
+            raise ValueError("type must be one of 'mmap', 'multicast' or 'shm'")
+        if typ == "multicast":
+            parse_multicast_address(name)
+        self.__interface: str = interface
         self.__typ: str = typ
         self.__name: str = name
 
@@ -233,10 +542,26 @@ class SubscriberFactory:
         """Return the type for this subscriber factory."""
         return self.__typ
 
-    def create(self, protocol: Optional[asyncio.DatagramProtocol] = None) -> Subscriber:
-        """Return a new Subscriber instance."""
+    def create(self, protocol: Optional[asyncio.DatagramProtocol] = None,
+               zero_copy: bool = False) -> Union[Subscriber, MulticastSubscriber]:
+        """Return a new Subscriber instance.
+
+        The size of the ring buffer is taken from the size of the file, so it
+        always matches the size chosen by the publisher. A ValueError is
+        raised if the file does not start with a layout header for the
+        version of the frame layout that is supported. Multicast datagrams
+        are always copied, so zero_copy only applies to the ring buffer.
+        """
+        if self.__typ == "multicast":
+            return MulticastSubscriber(parse_multicast_address(self.__name), self.__interface, protocol)
         if self.__typ == "mmap":
             fileno = os.open(self.__name, os.O_RDONLY)
-            mm = mmap.mmap(fileno, BUFFER_SIZE, access=mmap.ACCESS_READ)
-            return MmapSubscriber(fileno, mm, (self.__name, fileno), protocol)
-        raise RuntimeError("SubscriberFactory type was not 'mmap'")
+            mm = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+            try:
+                unpack_layout_header(mm)
+            except ValueError as e:
+                mm.close()
+                os.close(fileno)
+                raise ValueError("'%s': %s" % (self.__name, e)) from None
+            return MmapSubscriber(fileno, mm, (self.__name, fileno), protocol, zero_copy)
+        raise RuntimeError("SubscriberFactory type was not 'mmap' or 'multicast'")
@@ -0,0 +1,290 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import csv
+import hashlib
+import json
+import math
+import pathlib
+import sqlite3
+import sys
+import time
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from .analysis import ScoreBoardAnalysis
+from .match_events import MatchEventOperation
+from .types import Lifespan, Side
+
+
+DEFAULT_DATABASE = "results.db"
+
+# Seconds that a writer waits for another writer to finish before giving up
+BUSY_TIMEOUT = 600.0
+HASH_BLOCK_SIZE = 1 << 20
+
+# Only these parts of the exchange configuration affect the outcome of a match
+CONFIG_SECTIONS = ("Engine", "Fees", "Instrument", "Limits")
+CONFIG_IGNORED_KEYS = ("MarketDataFile", "MatchEventsFile", "ScoreBoardFile")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    match_id INTEGER PRIMARY KEY,
+    ingested_at REAL NOT NULL,
+    score_board_hash TEXT NOT NULL UNIQUE,
+    data_file TEXT NOT NULL,
+    data_hash TEXT NOT NULL,
+    config_hash TEXT NOT NULL,
+    config TEXT NOT NULL,
+    team_count INTEGER NOT NULL,
+    has_events INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS matches_data_config ON matches (data_hash, config_hash);
+CREATE INDEX IF NOT EXISTS matches_config ON matches (config_hash);
+
+-- Profit or loss, drawdown and fees are in dollars and a status other than 'OK' is a breach or disconnection
+CREATE TABLE IF NOT EXISTS results (
+    match_id INTEGER NOT NULL REFERENCES matches (match_id),
+    team TEXT NOT NULL,
+    source_hash TEXT,
+    source_file TEXT,
+    rank INTEGER NOT NULL,
+    profit_or_loss REAL NOT NULL,
+    maximum_drawdown REAL NOT NULL,
+    buy_volume INTEGER NOT NULL,
+    sell_volume INTEGER NOT NULL,
+    etf_position INTEGER NOT NULL,
+    future_position INTEGER NOT NULL,
+    total_fees REAL NOT NULL,
+    status TEXT,
+    PRIMARY KEY (match_id, team)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_source ON results (source_hash, match_id);
+
+CREATE TABLE IF NOT EXISTS events (
+    match_id INTEGER NOT NULL REFERENCES matches (match_id),
+    time REAL NOT NULL,
+    team TEXT NOT NULL,
+    operation INTEGER NOT NULL,
+    order_id INTEGER NOT NULL,
+    instrument INTEGER,
+    side INTEGER,
+    volume INTEGER NOT NULL,
+    price REAL,
+    lifespan INTEGER,
+    fee INTEGER
+);
+CREATE INDEX IF NOT EXISTS events_match_team ON events (match_id, team, time);
+"""
+
+# The conditions are filled in by ResultsStore.compare so that the indexes on the matches table can be used
+COMPARE_QUERY = """
+SELECT r.source_hash, group_concat(DISTINCT r.team), count(*), sum(r.rank = 1), avg(r.rank),
+       avg(r.profit_or_loss), avg(r.profit_or_loss * r.profit_or_loss), min(r.profit_or_loss),
+       max(r.profit_or_loss), avg(r.maximum_drawdown), avg(r.total_fees),
+       sum(r.status IS NOT NULL AND r.status <> 'OK')
+FROM matches AS m JOIN results AS r ON r.match_id = m.match_id
+WHERE %s
+GROUP BY r.source_hash
+ORDER BY avg(r.profit_or_loss) DESC
+"""
+
+
+def hash_file(filename: pathlib.Path) -> str:
+    """Return the SHA-256 digest of a file's contents as a hexadecimal string."""
+    digest = hashlib.sha256()
+    with open(filename, "rb") as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def match_config(exchange_config: Dict[str, Any]) -> str:
+    """Return, as canonical JSON, the parts of an exchange configuration that affect the outcome of a match."""
+    config = {s: exchange_config[s] for s in CONFIG_SECTIONS if s in exchange_config}
+    if "Engine" in config:
+        config["Engine"] = {k: v for k, v in config["Engine"].items() if k not in CONFIG_IGNORED_KEYS}
+    return json.dumps(config, sort_keys=True, separators=(",", ":"))
+
+
+def auto_trader_sources(auto_traders: Iterable[pathlib.Path]) -> Dict[str, Tuple[str, str]]:
+    """Return the source file and its digest for the team name of each auto-trader."""
+    sources: Dict[str, Tuple[str, str]] = dict()
+    for auto_trader in auto_traders:
+        with open(auto_trader.with_suffix(".json")) as config:
+            team = json.load(config)["TeamName"]
+        sources[team] = (str(auto_trader), hash_file(auto_trader))
+    return sources
+
+
+def read_match_events(match_id: int, match_events: TextIO) -> Iterator[Tuple]:
+    """Yield a row of the events table for each row of a match events file."""
+    operations = {o.name.capitalize(): o.value for o in MatchEventOperation}
+    reader = csv.reader(match_events)
+    next(reader)  # Skip header
+    for row in reader:
+        yield (match_id, float(row[0]), row[1], operations[row[2]], int(row[3]),
+               int(row[4]) if row[4] else None,
+               Side[row[5]].value if row[5] else None,
+               int(row[6]),
+               float(row[7]) if row[7] else None,
+               Lifespan[row[8]].value if row[8] else None,
+               int(row[9]) if row[9] else None)
+
+
+class ResultsStore:
+    """A SQLite database of the results of many matches.
+
+    The database uses write-ahead logging, so any number of processes may
+    query it while a match is being ingested. Each match is ingested in a
+    single transaction, and a writer that finds the database busy waits for
+    the other writer to finish.
+    """
+
+    def __init__(self, filename: str = DEFAULT_DATABASE, timeout: float = BUSY_TIMEOUT):
+        """Initialise a new instance of the ResultsStore class."""
+        self.connection: sqlite3.Connection = sqlite3.connect(filename, timeout=timeout, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Close the database."""
+        self.connection.close()
+
+    def compare(self, data_hash: Optional[str] = None, config_hash: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return a summary of the results of each auto-trader source, optionally for one data file and config."""
+        conditions: List[str] = ["1"]
+        parameters: List[str] = list()
+        if data_hash is not None:
+            conditions.append("m.data_hash = ?")
+            parameters.append(data_hash)
+        if config_hash is not None:
+            conditions.append("m.config_hash = ?")
+            parameters.append(config_hash)
+
+        summaries: List[Dict[str, Any]] = list()
+        for (source_hash, teams, matches, wins, mean_rank, mean, mean_square, minimum, maximum, mean_drawdown,
+             mean_fees, breaches) in self.connection.execute(COMPARE_QUERY % " AND ".join(conditions), parameters):
+            summaries.append({"source_hash": source_hash, "teams": sorted(set(teams.split(","))),
+                              "matches": matches, "wins": wins, "mean_rank": mean_rank,
+                              "mean_profit_or_loss": mean,
+                              "stdev_profit_or_loss": math.sqrt(max(mean_square - mean * mean, 0.0)),
+                              "minimum_profit_or_loss": minimum, "maximum_profit_or_loss": maximum,
+                              "mean_maximum_drawdown": mean_drawdown, "mean_total_fees": mean_fees,
+                              "breaches": breaches})
+        return summaries
+
+    def ingest(self, score_board_filename: pathlib.Path, data_filename: pathlib.Path,
+               exchange_config: Dict[str, Any], sources: Dict[str, Tuple[str, str]],
+               match_events_filename: Optional[pathlib.Path] = None) -> Optional[int]:
+        """Add the results, and optionally the events, of a match and return its match id.
+
+        Nothing is added, and None is returned, if the match has been ingested before.
+        """
+        # Do the slow work before the transaction so that other writers are held up for as short a time as possible
+        score_board_hash = hash_file(score_board_filename)
+        data_hash = hash_file(data_filename)
+        config = match_config(exchange_config)
+        config_hash = hashlib.sha256(config.encode()).hexdigest()
+        with open(score_board_filename, "r", newline="") as score_board:
+            analysis = ScoreBoardAnalysis()
+            for record in csv.DictReader(score_board):
+                analysis.apply(record)
+        scores = analysis.report()
+        ranked = sorted(scores, key=lambda t: scores[t]["profit_or_loss"], reverse=True)
+
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = connection.execute("INSERT OR IGNORE INTO matches (ingested_at, score_board_hash, data_file,"
+                                        " data_hash, config_hash, config, team_count, has_events)"
+                                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                        (time.time(), score_board_hash, str(data_filename), data_hash, config_hash,
+                                         config, len(scores), match_events_filename is not None))
+            if cursor.rowcount == 0:
+                connection.execute("ROLLBACK")
+                return None
+            match_id = cursor.lastrowid
+
+            results: List[Tuple] = list()
+            for rank, team in enumerate(ranked, 1):
+                source_file, source_hash = sources.get(team, (None, None))
+                score = scores[team]
+                results.append((match_id, team, source_hash, source_file, rank, score["profit_or_loss"],
+                                score["maximum_drawdown"], score["buy_volume"], score["sell_volume"],
+                                score["etf_position"], score["future_position"], score["total_fees"],
+                                score["status"]))
+            connection.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", results)
+
+            if match_events_filename is not None:
+                with open(match_events_filename, "r", newline="") as match_events:
+                    connection.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                           read_match_events(match_id, match_events))
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return match_id
+
+
+def print_comparison(summaries: List[Dict[str, Any]], output: TextIO = sys.stdout) -> None:
+    """Print a table comparing the results of each auto-trader source.
+
+    Amounts are in dollars and breaches count the matches in which a limit was breached or the team disconnected.
+    """
+    print("%-12s %-20s %8s %6s %7s %12s %12s %12s %12s %12s %8s"
+          % ("Source", "Teams", "Matches", "Wins", "Rank", "MeanPnL($)", "StdevPnL($)", "MinPnL($)", "MaxPnL($)",
+             "Drawdown($)", "Breaches"), file=output)
+    for summary in summaries:
+        print("%-12s %-20s %8d %6d %7.2f %12.2f %12.2f %12.2f %12.2f %12.2f %8d"
+              % ((summary["source_hash"] or "-")[:12], ",".join(summary["teams"])[:20], summary["matches"],
+                 summary["wins"], summary["mean_rank"], summary["mean_profit_or_loss"],
+                 summary["stdev_profit_or_loss"], summary["minimum_profit_or_loss"],
+                 summary["maximum_profit_or_loss"], summary["mean_maximum_drawdown"], summary["breaches"]),
+              file=output)
+
+
+def compare(database: str, data_filename: Optional[pathlib.Path] = None,
+            exchange_config: Optional[Dict[str, Any]] = None, output: TextIO = sys.stdout) -> None:
+    """Print a comparison of the auto-trader sources in a results database."""
+    data_hash = hash_file(data_filename) if data_filename is not None else None
+    config_hash = (hashlib.sha256(match_config(exchange_config).encode()).hexdigest()
+                   if exchange_config is not None else None)
+    store = ResultsStore(database)
+    try:
+        print_comparison(store.compare(data_hash, config_hash), output)
+    finally:
+        store.close()
+
+
+def ingest(database: str, exchange_config: Dict[str, Any], auto_traders: Iterable[pathlib.Path],
+           include_events: bool = False, output: TextIO = sys.stdout) -> Optional[int]:
+    """Add the results of the match described by an exchange configuration to a results database."""
+    engine = exchange_config["Engine"]
+    store = ResultsStore(database)
+    try:
+        match_id = store.ingest(pathlib.Path(engine["ScoreBoardFile"]), pathlib.Path(engine["MarketDataFile"]),
+                                exchange_config, auto_trader_sources(auto_traders),
+                                pathlib.Path(engine["MatchEventsFile"]) if include_events else None)
+    finally:
+        store.close()
+    if match_id is None:
+        print("The match in '%s' has already been ingested" % engine["ScoreBoardFile"], file=output)
+    else:
+        print("Ingested the match in '%s' as match %d" % (engine["ScoreBoardFile"], match_id), file=output)
+    return match_id
@@ -0,0 +1,224 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import asyncio
+import json
+import multiprocessing
+import os
+import pathlib
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from typing import Iterable, List, Optional, TextIO, Tuple, Union
+
+from .benchmark import BENCHMARK_HOST, BenchmarkExchange, find_free_port
+from .instrumentation import LatencyHistogram
+from .messages import (HEADER, HEADER_SIZE, ORDER_BOOK_HEADER, ORDER_BOOK_HEADER_SIZE, ORDER_BOOK_MESSAGE,
+                       ORDER_BOOK_MESSAGE_SIZE, MessageType)
+from .order_book import TOP_LEVEL_COUNT
+from .pubsub import PublisherFactory
+from .types import Instrument
+
+
+DEFAULT_UPDATE_COUNT = 1000
+DEFAULT_UPDATE_INTERVAL = 0.02  # Seconds between order book updates
+LOGIN_TIMEOUT = 10.0  # Seconds to wait for the auto-trader to log in
+STOP_TIMEOUT = 5.0  # Seconds to wait for the auto-trader to stop
+TEAM_NAME = "TickToTrade"
+TEAM_SECRET = "secret"
+WARM_UP_UPDATE_COUNT = 50
+
+
+class SyntheticMarket:
+    """The top levels of the future and ETF order books, which follow a random walk."""
+
+    def __init__(self, seed: Optional[int] = None, tick_size: int = 100, price: int = 10000):
+        """Initialise a new instance of the SyntheticMarket class."""
+        self.future_price: int = price
+        self.etf_price: int = price
+        self.tick_size: int = tick_size
+
+        self.__random: random.Random = random.Random(seed)
+
+    def levels(self, instrument: Instrument) -> Tuple[List[int], List[int], List[int], List[int]]:
+        """Return the ask prices, ask volumes, bid prices and bid volumes of the given book."""
+        price = self.future_price if instrument == Instrument.FUTURE else self.etf_price
+        tick = self.tick_size
+        ask_prices = [price + (i + 1) * tick for i in range(TOP_LEVEL_COUNT)]
+        bid_prices = [price - (i + 1) * tick for i in range(TOP_LEVEL_COUNT)]
+        ask_volumes = [self.__random.randint(1, 100) for _ in range(TOP_LEVEL_COUNT)]
+        bid_volumes = [self.__random.randint(1, 100) for _ in range(TOP_LEVEL_COUNT)]
+        return ask_prices, ask_volumes, bid_prices, bid_volumes
+
+    def step(self) -> None:
+        """Move the future price by up to one tick and let the ETF price follow it."""
+        self.future_price += self.__random.choice((-1, 1)) * self.tick_size
+        self.etf_price = self.future_price + self.__random.randint(-2, 2) * self.tick_size
+
+
+def run_python_auto_trader(path: pathlib.Path, working_directory: str) -> None:
+    """Run the Python auto-trader at the given path in the given working directory."""
+    import ready_trader_go.trader
+
+    sys.path.insert(0, str(path.resolve().parent))
+    os.chdir(working_directory)
+    ready_trader_go.trader.main(path.stem)
+
+
+def start_auto_trader(path: pathlib.Path, working_directory: str) -> Union[multiprocessing.Process, subprocess.Popen]:
+    """Start the auto-trader at the given path, which may be a Python file or an executable."""
+    if path.suffix.lower() == ".py":
+        process = multiprocessing.get_context("spawn").Process(target=run_python_auto_trader,
+                                                               args=(path, working_directory), daemon=True)
+        process.start()
+        return process
+    return subprocess.Popen([str(path.resolve())], cwd=working_directory, stdout=subprocess.DEVNULL)
+
+
+def stop_auto_trader(process: Union[multiprocessing.Process, subprocess.Popen]) -> None:
+    """Stop an auto-trader started by start_auto_trader."""
+    process.terminate()
+    if isinstance(process, subprocess.Popen):
+        try:
+            process.wait(STOP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    else:
+        process.join(STOP_TIMEOUT)
+        if process.is_alive():
+            process.kill()
+
+
+class TickToTradeHarness:
+    """Measure how quickly an auto-trader reacts to order book updates.
+
+    The harness publishes order book updates from a synthetic market and
+    records the time from the first order book frame of each update being
+    written to the first insert order received after it. Updates that no
+    insert order follows before the next update are not counted.
+    """
+
+    def __init__(self, update_count: int = DEFAULT_UPDATE_COUNT, update_interval: float = DEFAULT_UPDATE_INTERVAL,
+                 seed: Optional[int] = None):
+        """Initialise a new instance of the TickToTradeHarness class."""
+        self.latencies: LatencyHistogram = LatencyHistogram()
+        self.update_count: int = update_count
+        self.update_interval: float = update_interval
+
+        self.__awaiting_reaction: bool = False
+        self.__book_message = bytearray(ORDER_BOOK_MESSAGE_SIZE)
+        self.__market: SyntheticMarket = SyntheticMarket(seed)
+        self.__recording: bool = False
+        self.__transport: Optional[asyncio.WriteTransport] = None
+        self.__write_time: int = 0
+
+        HEADER.pack_into(self.__book_message, 0, ORDER_BOOK_MESSAGE_SIZE, MessageType.ORDER_BOOK_UPDATE)
+
+    def connection_made(self, transport: asyncio.WriteTransport) -> None:
+        """Called when the information channel has been created."""
+        self.__transport = transport
+
+    def instrument_connection(self, connection) -> None:
+        """Watch an execution connection for the insert orders that follow each update."""
+        on_message = connection.on_message
+
+        def watched_on_message(typ: int, data: bytes, start: int, length: int) -> None:
+            if self.__awaiting_reaction and (typ == MessageType.INSERT_ORDER or typ == MessageType.INSERT_ORDERS):
+                self.__awaiting_reaction = False
+                if self.__recording:
+                    self.latencies.record(time.perf_counter_ns() - self.__write_time)
+            on_message(typ, data, start, length)
+
+        connection.on_message = watched_on_message
+
+    async def __publish_updates(self, count: int) -> None:
+        """Publish count order book updates for both instruments."""
+        message = self.__book_message
+        for sequence in range(1, count + 1):
+            self.__market.step()
+            for instrument in (Instrument.FUTURE, Instrument.ETF):
+                ORDER_BOOK_HEADER.pack_into(message, HEADER_SIZE, instrument, sequence)
+                ORDER_BOOK_MESSAGE.pack_into(message, ORDER_BOOK_HEADER_SIZE,
+                                             *(v for part in self.__market.levels(instrument) for v in part))
+                self.__transport.write(message)
+                if instrument == Instrument.FUTURE:
+                    self.__write_time = time.perf_counter_ns()
+                    self.__awaiting_reaction = True
+            await asyncio.sleep(self.update_interval)
+        self.__awaiting_reaction = False
+
+    async def run(self, auto_trader: pathlib.Path) -> None:
+        """Run the given auto-trader against a synthetic market and record its reaction times."""
+        loop = asyncio.get_running_loop()
+
+        with tempfile.TemporaryDirectory() as working_directory:
+            port = find_free_port(BENCHMARK_HOST)
+            info_name = os.path.join(working_directory, "info.dat")
+            config = {"Execution": {"Host": BENCHMARK_HOST, "Port": port},
+                      "Information": {"Type": "mmap", "Name": info_name},
+                      "TeamName": TEAM_NAME,
+                      "Secret": TEAM_SECRET}
+            with open(os.path.join(working_directory, auto_trader.stem + ".json"), "w") as config_file:
+                json.dump(config, config_file)
+
+            exchange = BenchmarkExchange(BENCHMARK_HOST, port, {TEAM_NAME: TEAM_SECRET})
+            logged_in: asyncio.Future = loop.create_future()
+            exchange.competitor_manager.competitor_logged_in.append(
+                lambda _: logged_in.done() or logged_in.set_result(True))
+            exchange.exec_server.connection_created.append(self.instrument_connection)
+            await exchange.start()
+            self.__transport = PublisherFactory("mmap", info_name).create(self)
+
+            process = start_auto_trader(auto_trader, working_directory)
+            try:
+                await asyncio.wait_for(logged_in, LOGIN_TIMEOUT)
+                await self.__publish_updates(WARM_UP_UPDATE_COUNT)
+                self.__recording = True
+                await self.__publish_updates(self.update_count)
+            finally:
+                self.__recording = False
+                stop_auto_trader(process)
+                await exchange.stop()
+                self.__transport.close()
+
+
+def measure_tick_to_trade(auto_trader: pathlib.Path, update_count: int = DEFAULT_UPDATE_COUNT,
+                          update_interval: float = DEFAULT_UPDATE_INTERVAL) -> LatencyHistogram:
+    """Return a histogram of the given auto-trader's tick-to-trade latencies in nanoseconds."""
+    harness = TickToTradeHarness(update_count, update_interval)
+    asyncio.run(harness.run(auto_trader))
+    return harness.latencies
+
+
+def main(auto_traders: Iterable[pathlib.Path], update_count: int = DEFAULT_UPDATE_COUNT,
+         update_interval: float = DEFAULT_UPDATE_INTERVAL, output: TextIO = sys.stdout) -> None:
+    """Measure the tick-to-trade latency of each auto-trader and print a report."""
+    print("%-30s %8s %10s %10s %10s %10s %10s %10s" % ("AutoTrader", "Updates", "Reactions", "Mean(us)", "P50(us)",
+                                                       "P90(us)", "P99(us)", "Max(us)"), file=output)
+    for auto_trader in auto_traders:
+        try:
+            latencies = measure_tick_to_trade(auto_trader, update_count, update_interval)
+        except asyncio.TimeoutError:
+            print("%-30s did not log in within %.0f seconds" % (auto_trader, LOGIN_TIMEOUT), file=output)
+            continue
+        print("%-30s %8d %10d %10.1f %10.1f %10.1f %10.1f %10.1f"
+              % (auto_trader, update_count, latencies.count, latencies.mean / 1000.0,
+                 latencies.value_at_percentile(50.0) / 1000.0, latencies.value_at_percentile(90.0) / 1000.0,
+                 latencies.value_at_percentile(99.0) / 1000.0, latencies.maximum / 1000.0), file=output)
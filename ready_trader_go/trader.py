@@ -26,7 +26,7 @@ from typing import Any, Dict
 
 from .application import Application
 from .base_auto_trader import BaseAutoTrader
-from .pubsub import SubscriberFactory
+from .pubsub import DEFAULT_INTERFACE, SubscriberFactory, parse_multicast_address
 
 
 # From Python 3.8, the proactor event loop is used by default on Windows
@@ -63,6 +63,18 @@ def __config_validator(config):
 
     __validate_hostname(config, "Execution", "Host")
 
+    config["Information"].setdefault("ZeroCopy", False)
+    __validate_json_object(config, "Information", ("ZeroCopy",), (bool,))
+
+    if config["Information"]["Type"] == "multicast":
+        try:
+            parse_multicast_address(config["Information"]["Name"])
+        except ValueError as e:
+            raise Exception("Invalid Name in Information configuration: %s" % e)
+        config["Information"].setdefault("Interface", DEFAULT_INTERFACE)
+        __validate_json_object(config, "Information", ("Interface",), (str,))
+        __validate_hostname(config, "Information", "Interface")
+
     if type(config["TeamName"]) is not str:
         raise Exception("TeamName has inappropriate type")
     if len(config["TeamName"]) < 1 or len(config["TeamName"]) > 50:
@@ -90,8 +102,8 @@ async def __start_autotrader(auto_trader: BaseAutoTrader, config: Dict[str, Any]
         return
 
     info = config["Information"]
-    sub_factory = SubscriberFactory(info["Type"], info["Name"])
-    sub_factory.create(auto_trader)
+    sub_factory = SubscriberFactory(info["Type"], info["Name"], info.get("Interface", DEFAULT_INTERFACE))
+    sub_factory.create(auto_trader, zero_copy=info["ZeroCopy"])
 
 
 def main(name: str = "autotrader") -> None:
@@ -17,6 +17,8 @@
 #     <https://www.gnu.org/licenses/>.
 import enum
 
+from typing import Iterable, Tuple
+
 
 class Instrument(enum.IntEnum):
     FUTURE = 0
@@ -52,10 +54,18 @@ class ICompetitor:
         """Called when an amend order request is received from the competitor."""
         raise NotImplementedError()
 
+    def on_amend_messages(self, now: float, amends: Iterable[Tuple[int, int]]) -> None:
+        """Called when a batch of amend order requests is received from the competitor."""
+        raise NotImplementedError()
+
     def on_cancel_message(self, now: float, client_order_id: int) -> None:
         """Called when a cancel order request is received from the competitor."""
         raise NotImplementedError()
 
+    def on_cancel_messages(self, now: float, cancels: Iterable[Tuple[int]]) -> None:
+        """Called when a batch of cancel order requests is received from the competitor."""
+        raise NotImplementedError()
+
     def on_hedge_message(self, now: float, client_order_id: int, side: int, price: int, volume: int) -> None:
         """Called when a hedge order request is received from the competitor."""
         raise NotImplementedError
@@ -65,6 +75,14 @@ class ICompetitor:
         """Called when an insert order request is received from the competitor."""
         raise NotImplementedError()
 
+    def on_insert_messages(self, now: float, inserts: Iterable[Tuple[int, int, int, int, int]]) -> None:
+        """Called when a batch of insert order requests is received from the competitor."""
+        raise NotImplementedError()
+
+    def on_replace_message(self, now: float, client_order_id: int, price: int, volume: int) -> None:
+        """Called when a replace order request is received from the competitor."""
+        raise NotImplementedError()
+
 
 class IController:
     def advance_time(self):
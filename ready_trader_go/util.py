@@ -29,12 +29,13 @@ async def create_datagram_endpoint(loop: asyncio.AbstractEventLoop,
                                    remote_addr: Optional[Tuple[str, int]] = None, *, family: int = 0, proto: int = 0,
                                    flags: int = 0, reuse_port: Optional[bool] = None,
                                    allow_broadcast: Optional[bool] = None, sock: Optional[socket.socket] = None,
-                                   interface: Optional[str] = None
+                                   interface: Optional[str] = None, ttl: int = 0
                                    ) -> Tuple[asyncio.BaseTransport, asyncio.BaseProtocol]:
     """Return a datagram endpoint.
 
     In the case that a multicast address is supplied, this function creates the
-    socket manually.
+    socket manually. The ttl sets how many hops outgoing multicast datagrams
+    may travel (zero keeps them on the local host).
     """
     if local_addr is not None and ipaddress.ip_address(local_addr[0]).is_multicast:
         sock = socket.socket(family if family else socket.AF_INET, socket.SOCK_DGRAM, proto)
@@ -47,7 +48,7 @@ async def create_datagram_endpoint(loop: asyncio.AbstractEventLoop,
         sock = socket.socket(family if family else socket.AF_INET, socket.SOCK_DGRAM, proto)
         sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface))
         sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
-        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 0)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
         sock.connect(remote_addr)
         return await loop.create_datagram_endpoint(protocol_factory, sock=sock)
 
@@ -16,6 +16,8 @@
 #     License along with Ready Trader Go.  If not, see
 #     <https://www.gnu.org/licenses/>.
 import argparse
+import enum
+import json
 import multiprocessing
 import pathlib
 import subprocess
@@ -23,15 +25,45 @@ import sys
 import time
 import traceback
 
+from typing import List, Optional, Type
+
+import ready_trader_go.analysis
+import ready_trader_go.benchmark
 import ready_trader_go.exchange
+import ready_trader_go.results
+import ready_trader_go.tick_to_trade
 import ready_trader_go.trader
 
+from ready_trader_go.analysis import DEFAULT_MARKOUT_HORIZONS
+from ready_trader_go.application import EVENT_LOOPS
+from ready_trader_go.match_events import MatchEventOperation
+from ready_trader_go.messages import SUBSCRIBE_ALL
+from ready_trader_go.types import Instrument
+
 try:
     from ready_trader_go.hud.__main__ import main as hud_main, replay as hud_replay
 except ImportError:
     hud_main = hud_replay = None
 
 
+def analyze(args) -> None:
+    """Print a report of the trading of each team in a match."""
+    if not args.match_events.is_file():
+        print("'%s' is not a regular file" % args.match_events, file=sys.stderr)
+        return
+    score_board: Optional[pathlib.Path] = args.score_board
+    if not score_board.is_file():
+        print("'%s' is not a regular file, the score board will not be analysed" % score_board, file=sys.stderr)
+        score_board = None
+    ready_trader_go.analysis.main(args.match_events, score_board, args.horizon or DEFAULT_MARKOUT_HORIZONS,
+                                  args.json)
+
+
+def bench(args) -> None:
+    """Benchmark execution message round trips with each event loop."""
+    ready_trader_go.benchmark.main(args.event_loop or EVENT_LOOPS, args.count)
+
+
 def no_heads_up_display() -> None:
     print("Cannot run the Ready Trader Go heads-up display. This could\n"
           "mean that the PySide6 module has not been installed. Please\n"
@@ -57,6 +89,52 @@ def on_error(name: str, error: Exception) -> None:
     traceback.print_exception(type(error), error, error.__traceback__, file=sys.stderr)
 
 
+def subscription_mask(enumeration: Type[enum.IntEnum], names: Optional[List[str]]) -> int:
+    """Return the subscription bit mask for the named members of an enumeration (all of them if None)."""
+    if not names:
+        return SUBSCRIBE_ALL
+    return sum(1 << enumeration[name.upper()] for name in set(names))
+
+
+def tick_to_trade(args) -> None:
+    """Measure the tick-to-trade latency of each auto-trader."""
+    for auto_trader in args.autotrader:
+        if not auto_trader.exists():
+            print("'%s' does not exist" % auto_trader, file=sys.stderr)
+            return
+    ready_trader_go.tick_to_trade.main(args.autotrader, args.count, args.interval)
+
+
+def results_compare(args) -> None:
+    """Compare the results of auto-traders across the matches in a results database."""
+    exchange_config = None
+    if args.config is not None:
+        with args.config.open() as config:
+            exchange_config = json.load(config)
+    ready_trader_go.results.compare(args.database, args.data_file, exchange_config)
+
+
+def results_ingest(args) -> None:
+    """Add the results of the last match to a results database."""
+    for auto_trader in args.autotrader:
+        if not auto_trader.with_suffix(".json").exists():
+            print("'%s': configuration file is missing: %s" % (auto_trader, auto_trader.with_suffix(".json")),
+                  file=sys.stderr)
+            return
+    if not args.config.is_file():
+        print("'%s' is not a regular file" % args.config, file=sys.stderr)
+        return
+    with args.config.open() as config:
+        exchange_config = json.load(config)
+    engine = exchange_config["Engine"]
+    for filename in (engine["ScoreBoardFile"], engine["MarketDataFile"]) + ((engine["MatchEventsFile"],)
+                                                                            if args.events else ()):
+        if not pathlib.Path(filename).is_file():
+            print("'%s' is not a regular file" % filename, file=sys.stderr)
+            return
+    ready_trader_go.results.ingest(args.database, exchange_config, args.autotrader, args.events)
+
+
 def run(args) -> None:
     """Run a match."""
     for auto_trader in args.autotrader:
@@ -90,7 +168,8 @@ def run(args) -> None:
             no_heads_up_display()
             exchange.get()
         else:
-            hud_main(args.host, args.port)
+            hud_main(args.host, args.port, args.team, subscription_mask(MatchEventOperation, args.operation),
+                     subscription_mask(Instrument, args.instrument), args.top_of_book)
 
 
 def main() -> None:
@@ -107,6 +186,16 @@ def main() -> None:
                             help="host name of the exchange simulator (default '127.0.0.1')")
     run_parser.add_argument("--port", default=12347,
                             help="port number of the exchange simulator (default 12347)")
+    run_parser.add_argument("--team", action="append",
+                            help="a team whose events the heads-up display receives, may be repeated (default all)")
+    run_parser.add_argument("--operation", action="append", choices=[o.name.lower() for o in MatchEventOperation],
+                            help="an operation the heads-up display receives events for, may be repeated "
+                                 "(default all)")
+    run_parser.add_argument("--instrument", action="append", choices=[i.name.lower() for i in Instrument],
+                            help="an instrument the heads-up display receives events for, may be repeated "
+                                 "(default all)")
+    run_parser.add_argument("--top-of-book", action="store_true",
+                            help="receive the top of the order books every tick instead of the market's orders")
     run_parser.add_argument("autotrader", nargs="*", type=pathlib.Path,
                             help="auto-traders to include in the match")
     run_parser.set_defaults(func=run)
@@ -120,6 +209,77 @@ def main() -> None:
                                type=pathlib.Path)
     replay_parser.set_defaults(func=replay)
 
+    bench_parser = subparsers.add_parser("bench", aliases=["be"],
+                                         description=("Compare the round-trip latency of execution messages "
+                                                      "with each event loop."),
+                                         help="benchmark the available event loops")
+    bench_parser.add_argument("--count", default=ready_trader_go.benchmark.DEFAULT_MESSAGE_COUNT, type=int,
+                              help="number of round trips to measure (default %d)"
+                                   % ready_trader_go.benchmark.DEFAULT_MESSAGE_COUNT)
+    bench_parser.add_argument("--event-loop", action="append", choices=EVENT_LOOPS,
+                              help="an event loop to benchmark, may be repeated (default all)")
+    bench_parser.set_defaults(func=bench)
+
+    ttt_parser = subparsers.add_parser("tick-to-trade", aliases=["ttt"],
+                                       description=("Measure the time each auto-trader takes to send an order "
+                                                    "after an order book update."),
+                                       help="measure the tick-to-trade latency of auto-traders")
+    ttt_parser.add_argument("--count", default=ready_trader_go.tick_to_trade.DEFAULT_UPDATE_COUNT, type=int,
+                            help="number of order book updates to publish (default %d)"
+                                 % ready_trader_go.tick_to_trade.DEFAULT_UPDATE_COUNT)
+    ttt_parser.add_argument("--interval", default=ready_trader_go.tick_to_trade.DEFAULT_UPDATE_INTERVAL, type=float,
+                            help="seconds between order book updates (default %g)"
+                                 % ready_trader_go.tick_to_trade.DEFAULT_UPDATE_INTERVAL)
+    ttt_parser.add_argument("autotrader", nargs="+", type=pathlib.Path,
+                            help="auto-traders to measure, either Python files or executables")
+    ttt_parser.set_defaults(func=tick_to_trade)
+
+    analyze_parser = subparsers.add_parser("analyze", aliases=["an"],
+                                           description=("Report the fills, markouts, inventory, hedges, fees "
+                                                        "and order lifetimes of each team in a match."),
+                                           help="analyse the trading of each team in a match")
+    analyze_parser.add_argument("--horizon", action="append", type=float,
+                                help="seconds after a trade at which to mark it to the midpoint price, may be "
+                                     "repeated (default %s)" % ", ".join("%g" % h for h in DEFAULT_MARKOUT_HORIZONS))
+    analyze_parser.add_argument("--json", type=pathlib.Path,
+                                help="name of a file to which the full report is also written as JSON")
+    analyze_parser.add_argument("match_events", nargs="?", default=pathlib.Path("match_events.csv"),
+                                help="name of the match events file (default 'match_events.csv')",
+                                type=pathlib.Path)
+    analyze_parser.add_argument("score_board", nargs="?", default=pathlib.Path("score_board.csv"),
+                                help="name of the score board file (default 'score_board.csv')",
+                                type=pathlib.Path)
+    analyze_parser.set_defaults(func=analyze)
+
+    results_parser = subparsers.add_parser("results", aliases=["rs"],
+                                           description="Store and compare the results of many matches.",
+                                           help="store and compare the results of many matches")
+    results_parser.add_argument("--database", default=ready_trader_go.results.DEFAULT_DATABASE,
+                                help="name of the results database (default '%s')"
+                                     % ready_trader_go.results.DEFAULT_DATABASE)
+    results_subparsers = results_parser.add_subparsers(title="results command", required=True)
+
+    ingest_parser = results_subparsers.add_parser("ingest", description=("Add the results of the last match to "
+                                                                         "the results database."),
+                                                  help="add the results of the last match to the database")
+    ingest_parser.add_argument("--config", default=pathlib.Path("exchange.json"), type=pathlib.Path,
+                               help="name of the exchange configuration file of the match "
+                                    "(default 'exchange.json')")
+    ingest_parser.add_argument("--events", action="store_true",
+                               help="also store every event in the match events file")
+    ingest_parser.add_argument("autotrader", nargs="*", type=pathlib.Path,
+                               help="auto-traders that took part in the match")
+    ingest_parser.set_defaults(func=results_ingest)
+
+    compare_parser = results_subparsers.add_parser("compare", description=("Compare the results of each "
+                                                                           "auto-trader across matches."),
+                                                   help="compare the results of each auto-trader across matches")
+    compare_parser.add_argument("--config", type=pathlib.Path,
+                                help="only include matches run with this exchange configuration file")
+    compare_parser.add_argument("--data-file", type=pathlib.Path,
+                                help="only include matches run with this market data file")
+    compare_parser.set_defaults(func=results_compare)
+
     args = parser.parse_args()
     args.func(args)
 
@@ -0,0 +1,77 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import random
+
+import pytest
+
+from ready_trader_go import account
+from ready_trader_go.account import AccountBook
+from ready_trader_go.types import Instrument, Side
+
+pytest.importorskip("numpy")
+
+ACCOUNT_COUNT = 10  # More than the initial capacity, so the columns grow
+TICK_COUNT = 200
+
+
+def book_pair(monkeypatch):
+    """Return a book that uses NumPy and an identical book that does not."""
+    vectorised = AccountBook(0.01, 0.002)
+    for _ in range(ACCOUNT_COUNT):
+        vectorised.create()
+    with monkeypatch.context() as m:
+        m.setattr(account, "numpy", None)
+        scalar = AccountBook(0.01, 0.002)
+        for _ in range(ACCOUNT_COUNT):
+            scalar.create()
+    return vectorised, scalar
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_vectorised_update_matches_update_account(seed, monkeypatch):
+    rng = random.Random(seed)
+    vectorised, scalar = book_pair(monkeypatch)
+    future_price = 10000
+    for _ in range(TICK_COUNT):
+        for _ in range(rng.randrange(4)):
+            index = rng.randrange(ACCOUNT_COUNT)
+            instrument = rng.choice((Instrument.ETF, Instrument.FUTURE))
+            side = rng.choice((Side.BUY, Side.SELL))
+            # Hedges trade at a volume weighted average price that need not be a whole number of cents
+            price = future_price + rng.randrange(-500, 501) + (rng.random() if instrument == Instrument.FUTURE else 0)
+            volume = rng.randrange(1, 50)
+            fee = rng.randrange(-5, 10)
+            vectorised.transact(index, instrument, side, price, volume, fee)
+            scalar.transact(index, instrument, side, price, volume, fee)
+
+        future_price = max(future_price + rng.randrange(-300, 301), 100)
+        etf_price = future_price + rng.randrange(-200, 201)
+        vectorised.update(future_price, etf_price)
+        for index in range(ACCOUNT_COUNT):
+            scalar.update_account(index, future_price, etf_price)
+
+        for name in ("profit_or_loss", "max_profit", "max_drawdown"):
+            assert [int(v) for v in getattr(vectorised, name)[:ACCOUNT_COUNT]] == getattr(scalar, name), name
+
+
+def test_vectorised_update_accepts_float_prices():
+    book = AccountBook(0.01, 0.002)
+    competitor = book.create()
+    competitor.transact(Instrument.ETF, Side.BUY, 10000, 3, 1)
+    book.update(10100.0, 10100.0)
+    assert competitor.profit_or_loss == 299
@@ -0,0 +1,65 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import io
+import json
+
+from ready_trader_go import analysis
+
+MATCH_EVENTS = """Time,Competitor,Operation,OrderId,Instrument,Side,Volume,Price,Lifespan,Fee
+1.0,,Insert,1,1,A,10,10100,G,
+1.0,,Insert,2,1,B,10,9900,G,
+2.0,T1,Insert,1,1,B,5,10100,F,
+2.0,T1,Trade,1,1,B,5,10100,,10
+3.0,T1,Insert,2,1,A,3,10000,G,
+4.0,T1,Trade,2,1,A,3,10000,,-3
+"""
+
+SCORE_BOARD = """Time,Team,Operation,BuyVolume,SellVolume,EtfPosition,FuturePosition,EtfPrice,FuturePrice,\
+TotalFees,AccountBalance,ProfitOrLoss,Status
+1.0,T1,Tick,0,0,0,0,10000,10000,0,0,0,OK
+2.0,T1,Tick,5,0,5,0,10100,10100,10,-50510,-10,OK
+3.0,T1,Tick,5,0,5,0,10000,10000,10,-50510,-510,OK
+4.0,T1,Tick,5,3,2,0,9900,9900,7,-20507,-707,OK
+"""
+
+
+def test_score_board_amounts_are_in_dollars(tmp_path):
+    match_events = tmp_path / "match_events.csv"
+    match_events.write_text(MATCH_EVENTS)
+    score_board = tmp_path / "score_board.csv"
+    score_board.write_text(SCORE_BOARD)
+    json_file = tmp_path / "report.json"
+    output = io.StringIO()
+
+    analysis.main(str(match_events), str(score_board), json_filename=str(json_file), output=output)
+
+    report = json.loads(json_file.read_text())
+    fees = report["teams"]["T1"]["fees"]
+    score = report["scores"]["T1"]
+    assert fees["maker_fees"] == -0.03
+    assert fees["taker_fees"] == 0.10
+    assert score["total_fees"] == fees["total_fees"] == 0.07
+    assert score["profit_or_loss"] == -7.07
+    assert score["maximum_drawdown"] == 7.07
+
+    lines = output.getvalue().splitlines()
+    fee_line = lines[lines.index(next(line for line in lines if line.startswith("Fees "))) + 1]
+    score_line = lines[lines.index(next(line for line in lines if line.startswith("Scores "))) + 1]
+    assert fee_line.split()[-1] == "0.07"
+    assert score_line.split()[1:3] == ["-7.07", "7.07"]
+    assert score_line.split()[5] == "0.07"
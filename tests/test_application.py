@@ -0,0 +1,35 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import pytest
+
+from ready_trader_go.application import _validate_monitor_config
+
+
+@pytest.mark.parametrize("interval, threshold", [(1, 2), (0.5, 1), (1, 0.25)])
+def test_monitor_config_accepts_numbers(interval, threshold):
+    config = {"Interval": interval, "Threshold": threshold}
+    _validate_monitor_config(config, "exchange")
+    assert config == {"Interval": float(interval), "Threshold": float(threshold),
+                      "ProfileFile": "exchange.profile.json"}
+    assert type(config["Interval"]) is float and type(config["Threshold"]) is float
+
+
+@pytest.mark.parametrize("interval, threshold", [(True, 0.1), (0.1, "1"), (0, 0.1), (0.1, -1)])
+def test_monitor_config_rejects_other_values(interval, threshold):
+    with pytest.raises(Exception):
+        _validate_monitor_config({"Interval": interval, "Threshold": threshold}, "exchange")
@@ -0,0 +1,49 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import json
+import pathlib
+
+import pytest
+
+from ready_trader_go import exchange
+
+CONFIG_FILE = pathlib.Path(__file__).parent.parent / "exchange.json"
+
+validate_config = getattr(exchange, "__exchange_config_validator")
+
+
+def load_config(**information):
+    """Return the example exchange configuration with the given Information elements replaced."""
+    with CONFIG_FILE.open() as f:
+        config = json.load(f)
+    config["Information"].update(information)
+    return config
+
+
+@pytest.mark.parametrize("interval, expected", [(0, 0.0), (1, 1.0), (0.25, 0.25)])
+def test_minimum_publish_interval_accepts_numbers(interval, expected):
+    config = load_config(PublishMode="change", MinimumPublishInterval=interval)
+    assert validate_config(config)
+    assert type(config["Information"]["MinimumPublishInterval"]) is float
+    assert config["Information"]["MinimumPublishInterval"] == expected
+
+
+@pytest.mark.parametrize("interval", [True, "0.01", -1, -0.5])
+def test_minimum_publish_interval_rejects_other_values(interval):
+    with pytest.raises(Exception):
+        validate_config(load_config(MinimumPublishInterval=interval))
@@ -0,0 +1,66 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import random
+
+import pytest
+
+from ready_trader_go.limiter import FrequencyLimiter, FrequencyLimiterFactory, RingFrequencyLimiter
+
+TRIAL_COUNT = 500
+
+
+def random_times(rng: random.Random, interval: float, count: int):
+    """Yield a non-decreasing sequence of times and event counts, with bursts, repeats and window-edge gaps."""
+    now = rng.uniform(0.0, 1000.0)
+    for _ in range(count):
+        choice = rng.random()
+        if choice < 0.2:
+            pass  # Same time as the previous event
+        elif choice < 0.3:
+            now += interval  # Exactly one interval later
+        elif choice < 0.4:
+            now += interval * rng.uniform(1.0, 3.0)
+        else:
+            now += interval * rng.expovariate(20.0)
+        yield now, 1 if rng.random() < 0.8 else rng.randint(1, 20)
+
+
+@pytest.mark.parametrize("seed", range(TRIAL_COUNT))
+def test_ring_limiter_agrees_with_deque_limiter(seed):
+    rng = random.Random(seed)
+    interval = rng.choice((0.1, 0.25, 1.0, rng.uniform(0.01, 5.0)))
+    limit = rng.randint(1, 60)
+    deque_limiter = FrequencyLimiter(interval, limit)
+    ring_limiter = RingFrequencyLimiter(interval, limit)
+
+    for now, count in random_times(rng, interval, 300):
+        if count == 1:
+            expected = deque_limiter.check_event(now)
+            actual = ring_limiter.check_event(now)
+        else:
+            expected = deque_limiter.check_events(now, count)
+            actual = ring_limiter.check_events(now, count)
+        assert actual == expected, (seed, now, count)
+        assert ring_limiter.value == min(deque_limiter.value, limit + 1), (seed, now, count)
+
+
+def test_factory_creates_requested_engine():
+    assert type(FrequencyLimiterFactory(1.0, 50).create()) is FrequencyLimiter
+    assert type(FrequencyLimiterFactory(1.0, 50, "ring").create()) is RingFrequencyLimiter
+    with pytest.raises(ValueError):
+        FrequencyLimiterFactory(1.0, 50, "list")
@@ -0,0 +1,150 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import asyncio
+import socket
+
+import pytest
+
+from ready_trader_go.pubsub import (FRAME_SIZE, LAYOUT_HEADER, LAYOUT_MAGIC, LAYOUT_VERSION, MulticastPublisher,
+                                     MulticastSubscriber, PublisherFactory, SubscriberFactory)
+
+GROUP = "239.255.42.99"
+INTERFACE = "127.0.0.1"
+
+
+class RecordingProtocol(asyncio.DatagramProtocol):
+    """A subscriber protocol that records what it receives."""
+
+    def __init__(self):
+        self.connected: asyncio.Event = asyncio.Event()
+        self.datagrams: list = list()
+        self.lost: list = list()
+        self.received: asyncio.Event = asyncio.Event()
+        self.expected_count: int = 0
+
+    def connection_made(self, transport):
+        self.connected.set()
+
+    def datagram_received(self, data, addr):
+        self.datagrams.append(bytes(data))
+        if len(self.datagrams) >= self.expected_count:
+            self.received.set()
+
+    def datagrams_lost(self, count):
+        self.lost.append(count)
+
+
+class PublisherProtocol(asyncio.BaseProtocol):
+    """A publisher protocol that records when the publisher is ready."""
+
+    def __init__(self):
+        self.connected: asyncio.Event = asyncio.Event()
+
+    def connection_made(self, transport):
+        self.connected.set()
+
+
+def free_port() -> int:
+    """Return a UDP port number that is not in use."""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind((INTERFACE, 0))
+        return sock.getsockname()[1]
+
+
+async def publish_and_receive(payloads, skip_before=None):
+    """Publish payloads over loopback multicast, skipping one sequence number before the given index."""
+    group_addr = (GROUP, free_port())
+    protocol = RecordingProtocol()
+    protocol.expected_count = len(payloads)
+    subscriber = MulticastSubscriber(group_addr, INTERFACE, protocol)
+    publisher_protocol = PublisherProtocol()
+    publisher = MulticastPublisher(group_addr, INTERFACE, 0, publisher_protocol)
+    try:
+        await asyncio.wait_for(asyncio.gather(protocol.connected.wait(), publisher_protocol.connected.wait()), 5.0)
+        for i, payload in enumerate(payloads):
+            if i == skip_before:
+                publisher._sequence += 1  # As if the network had dropped this datagram
+            publisher.write(payload)
+            await asyncio.sleep(0.001)
+        await asyncio.wait_for(protocol.received.wait(), 5.0)
+    finally:
+        publisher.close()
+        subscriber.close()
+    return protocol
+
+
+def run(coro):
+    try:
+        return asyncio.run(coro)
+    except OSError as e:
+        pytest.skip("loopback multicast is not available: %s" % e)
+
+
+def test_multicast_datagrams_arrive_in_order():
+    payloads = [b"datagram %d" % i for i in range(20)]
+    protocol = run(publish_and_receive(payloads))
+    assert protocol.datagrams == payloads
+    assert protocol.lost == []
+
+
+def test_multicast_gap_is_reported_as_lost():
+    payloads = [b"datagram %d" % i for i in range(10)]
+    protocol = run(publish_and_receive(payloads, skip_before=5))
+    assert protocol.datagrams == payloads
+    assert protocol.lost == [1]
+
+
+async def publish_and_receive_mmap(name, payloads):
+    """Publish payloads through a memory mapped file and return what the subscriber receives."""
+    protocol = RecordingProtocol()
+    protocol.expected_count = len(payloads)
+    publisher = PublisherFactory("mmap", name, 4096).create(PublisherProtocol())
+    subscriber = SubscriberFactory("mmap", name).create(protocol)
+    try:
+        await asyncio.wait_for(protocol.connected.wait(), 5.0)
+        for payload in payloads:
+            publisher.write(payload)
+        await asyncio.wait_for(protocol.received.wait(), 5.0)
+    finally:
+        subscriber.close()
+        publisher.close()
+    return protocol
+
+
+def test_mmap_round_trip(tmp_path):
+    name = str(tmp_path / "info.dat")
+    payloads = [b"frame %d" % i for i in range(10)]
+    protocol = asyncio.run(publish_and_receive_mmap(name, payloads))
+    assert protocol.datagrams == payloads
+    assert protocol.lost == []
+    with open(name, "rb") as f:
+        assert LAYOUT_HEADER.unpack_from(f.read(FRAME_SIZE)) == (LAYOUT_MAGIC, LAYOUT_VERSION, FRAME_SIZE, 4096)
+
+
+@pytest.mark.parametrize("header", [
+    b"\x00" * LAYOUT_HEADER.size,
+    b"\x01" * LAYOUT_HEADER.size,
+    LAYOUT_HEADER.pack(LAYOUT_MAGIC, LAYOUT_VERSION - 1, FRAME_SIZE, 4096),
+    LAYOUT_HEADER.pack(LAYOUT_MAGIC, LAYOUT_VERSION, FRAME_SIZE // 2, 4096),
+    LAYOUT_HEADER.pack(LAYOUT_MAGIC, LAYOUT_VERSION, FRAME_SIZE, 8192),
+])
+def test_mmap_subscriber_rejects_other_layouts(tmp_path, header):
+    name = tmp_path / "info.dat"
+    name.write_bytes(header.ljust(FRAME_SIZE, b"\x00") + b"\x00" * 4096)
+    with pytest.raises(ValueError):
+        SubscriberFactory("mmap", str(name)).create(RecordingProtocol())
@@ -0,0 +1,58 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import csv
+import pickle
+
+from ready_trader_go.account import AccountFactory
+from ready_trader_go.hud.replay import ReplayState
+
+# Market orders are filled by T1's aggressive orders, which leaves the market with no Cancel, Amend or Trade rows
+MATCH_EVENTS = """1.0,,Insert,1,1,A,10,10100,G,
+1.0,,Insert,2,1,B,10,9900,G,
+1.0,,Insert,3,1,A,5,10200,G,
+2.0,T1,Insert,1,1,B,10,10100,F,
+2.0,T1,Trade,1,1,B,10,10100,,20
+3.0,T1,Insert,2,1,A,4,9900,G,
+3.0,T1,Trade,2,1,A,4,9900,,8
+4.0,T1,Insert,3,1,B,2,9800,G,
+4.0,T1,Insert,4,1,A,6,9900,F,
+4.0,T1,Trade,4,1,A,6,9900,,12
+"""
+
+
+def replay(state):
+    """Apply the match events to the given replay state."""
+    events = list()
+    for row in csv.reader(MATCH_EVENTS.splitlines()):
+        state.apply(row, events)
+
+
+def test_replay_drops_orders_that_leave_the_book():
+    state = ReplayState(AccountFactory(0.002, 0.01))
+    replay(state)
+    assert set(state.open_orders[""].orders) == {3}
+    assert set(state.open_orders["T1"].orders) == {3}
+    assert all(o.remaining_volume > 0 for t in state.open_orders.values() for o in t.orders.values())
+
+
+def test_replay_state_survives_a_checkpoint():
+    state = ReplayState(AccountFactory(0.002, 0.01))
+    replay(state)
+    restored = pickle.loads(pickle.dumps(state, pickle.HIGHEST_PROTOCOL))
+    restored.apply(["5.0", "T1", "Cancel", "3", "", "", "0", "", "", ""], list())
+    assert restored.open_orders["T1"].orders == {}
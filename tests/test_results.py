@@ -0,0 +1,83 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import io
+
+from ready_trader_go.results import ResultsStore, print_comparison
+
+HEADER = ("Time,Team,Operation,BuyVolume,SellVolume,EtfPosition,FuturePosition,EtfPrice,FuturePrice,TotalFees,"
+          "AccountBalance,ProfitOrLoss,Status\n")
+
+# T1 makes $729.53 with a $300.00 drawdown; T2 loses $729.53 and breaches a limit, then carries on ticking
+FIRST_MATCH = HEADER + """1.0,T1,Tick,0,0,0,0,10000,10000,0,0,0,OK
+1.0,T2,Tick,0,0,0,0,10000,10000,0,0,0,OK
+2.0,T1,Tick,10,0,10,-10,10000,10000,-50,0,-30000,OK
+2.0,T2,Breach,0,10,-10,10,10000,10000,150,0,30000,
+3.0,T1,Tick,10,10,0,0,10000,10000,-100,0,72953,OK
+3.0,T2,Tick,10,10,0,0,10000,10000,300,0,-72953,BREACH
+"""
+
+# Both teams finish the match without a breach and T2 wins
+SECOND_MATCH = HEADER + """1.0,T1,Tick,0,0,0,0,10000,10000,0,0,0,OK
+1.0,T2,Tick,0,0,0,0,10000,10000,0,0,0,OK
+2.0,T1,Tick,10,10,0,0,10000,10000,100,0,-1000,OK
+2.0,T2,Tick,10,10,0,0,10000,10000,100,0,1000,OK
+"""
+
+SOURCES = {"T1": ("t1.py", "a" * 64), "T2": ("t2.py", "b" * 64)}
+
+
+def ingest_matches(tmp_path, *score_boards):
+    """Return a results store holding the given score boards."""
+    data_file = tmp_path / "data.csv"
+    data_file.write_text("Time\n")
+    store = ResultsStore(str(tmp_path / "results.db"))
+    for i, content in enumerate(score_boards):
+        score_board = tmp_path / ("score_board%d.csv" % i)
+        score_board.write_text(content)
+        assert store.ingest(score_board, data_file, {"Engine": {"Speed": 1.0}}, SOURCES) is not None
+    return store
+
+
+def test_ingest_ranks_teams_and_stores_dollars(tmp_path):
+    store = ingest_matches(tmp_path, FIRST_MATCH)
+    try:
+        rows = store.connection.execute("SELECT team, rank, profit_or_loss, maximum_drawdown, total_fees, status"
+                                        " FROM results ORDER BY team").fetchall()
+    finally:
+        store.close()
+    assert rows == [("T1", 1, 729.53, 300.0, -1.0, "OK"), ("T2", 2, -729.53, 1029.53, 3.0, "Breach")]
+
+
+def test_compare_counts_wins_and_breaches(tmp_path):
+    store = ingest_matches(tmp_path, FIRST_MATCH, SECOND_MATCH)
+    try:
+        summaries = {s["teams"][0]: s for s in store.compare()}
+    finally:
+        store.close()
+    assert summaries["T1"]["matches"] == summaries["T2"]["matches"] == 2
+    assert summaries["T1"]["wins"] == summaries["T2"]["wins"] == 1
+    assert summaries["T1"]["mean_rank"] == summaries["T2"]["mean_rank"] == 1.5
+    assert summaries["T1"]["breaches"] == 0
+    assert summaries["T2"]["breaches"] == 1
+    assert round(summaries["T1"]["mean_profit_or_loss"], 3) == 359.765
+
+    output = io.StringIO()
+    print_comparison(list(summaries.values()), output)
+    lines = {line.split()[1]: line.split() for line in output.getvalue().splitlines()[1:]}
+    assert lines["T1"][8:] == ["729.53", "155.00", "0"]
+    assert lines["T2"][7:] == ["-729.53", "10.00", "514.76", "1"]